@@ -30,13 +30,76 @@ It is intended to be used by test scripts and frameworks to ensure consistent re
 """
 
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 
+import atexit
+from contextlib import contextmanager
+import gzip as gzip_module
 import json
-from typing import Any, List, Optional, Dict
+import os
+import threading
+import warnings
+from collections import deque
+from itertools import chain, islice
+from typing import Any, Deque, Iterable, Iterator, List, Mapping, Optional, Dict, Tuple
+import weakref
 from pathlib import Path
 from html import escape
 
+from .result_binary import decode as decode_binary, encode as encode_binary, MAGIC as BINARY_MAGIC
+from .result_store import CompactMeasurements, CompactVerdicts, TrackedVerdicts, VerdictListener, overall_of
+from .result_journal import JournalList, JournalLog, JournalLogTail, JournalMap, ResultJournal, is_journal, journal_log, iter_log_entries, replay_journal, write_results_json
+from .result_events import EVENTS_ENV, EventPublisher
+
+
+# Set while loaders build a Result, so RULES_PACKAGER_EVENTS only applies to Results a script creates.
+_loading = threading.local()
+
+
+@contextmanager
+def _no_auto_events():
+    prev = getattr(_loading, "active", False)
+    _loading.active = True
+    try:
+        yield
+    finally:
+        _loading.active = prev
+
+
+def _restore(cls: type, state: Dict[str, Any]) -> "Result":
+    # Unpickling/copying must not open a new event channel.
+    with _no_auto_events():
+        return cls(**state)
+
+
+# Results still publishing, held weakly; the exit hook sends their "end" event with overall.
+_publishing: "weakref.WeakValueDictionary[int, Result]" = weakref.WeakValueDictionary()
+
+
+@atexit.register
+def _close_events_at_exit() -> None:
+    for res in list(_publishing.values()):
+        res.close_events()
+
+
+# Fields that stream_to()/publish_events() route through a sink, with their record kind.
+_SINK_KINDS = {"measurements": "m", "verdicts": "v", "criteria": "c", "evidence": "e", "log": "l"}
+
+
+def _rewrap(sink: Any, kind: str, old: Any, new: Any) -> Any:
+    # A whole field assigned while a sink is attached (e.g. res.criteria = build_criteria(RULES)):
+    # record what replaces the old content, then keep routing changes through the sink.
+    if kind == "e":
+        sink.write({"t": "e-"})
+        return JournalList(sink, "e", new)
+    if kind == "l":
+        sink.write({"t": "l-"})
+        return journal_log(sink, new, maxlen=getattr(old, "maxlen", None))
+    for k in list(old):
+        if k not in new:
+            sink.write({"t": kind + "-", "id": k})
+    return JournalMap(sink, kind, new)
+
 
 @dataclass
 class Result:
@@ -46,273 +109,609 @@ class Result:
     criteria: Dict[int, Dict[str, Any]] = field(default_factory=dict)
     log: List[str] = field(default_factory=list)
     evidence: List[Dict[str, Any]] = field(default_factory=list)  # unified
+    _journal: Optional[ResultJournal] = field(default=None, init=False, repr=False, compare=False)
+    _events: Optional[EventPublisher] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Opt-in live progress for GUI-launched scripts without changing them.
+        target = os.environ.get(EVENTS_ENV)
+        if target and not getattr(_loading, "active", False):
+            try:
+                self.publish_events(target)
+            except (OSError, ValueError) as e:
+                warnings.warn(f"Not publishing Result events to {target!r}: {e}")
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # verdicts is always a TrackedVerdicts or CompactVerdicts (or a JournalMap over
+        # one), so overall is O(1), and listeners see every change, including those
+        # made after a whole new verdicts dict is assigned.
+        if name == "verdicts":
+            if not hasattr(value, "add_listener"):
+                value = TrackedVerdicts(value)
+            old = self.__dict__.get("verdicts")
+            old_store, new_store = getattr(old, "backing", old), getattr(value, "backing", value)
+            if old_store is not None and old_store is not new_store:
+                for listener in getattr(old_store, "_listeners", ()):
+                    new_store.add_listener(listener)
+        kind = _SINK_KINDS.get(name)
+        if kind is not None and not isinstance(value, (JournalMap, JournalList, JournalLog, JournalLogTail)):
+            sink = self.__dict__.get("_journal")
+            if sink is None:
+                sink = self.__dict__.get("_events")
+            if sink is not None:
+                value = _rewrap(sink, kind, getattr(self, name), value)
+        object.__setattr__(self, name, value)
+
+    def __reduce__(self):
+        # Copies and pickles take the recorded data; the journal and event channel stay here.
+        state = {}
+        for f in fields(self):
+            if f.init:
+                value = getattr(self, f.name)
+                if isinstance(value, (JournalList, JournalLog, JournalLogTail)):
+                    value = list(value)
+                state[f.name] = getattr(value, "backing", value)
+        return (_restore, (self.__class__, state))
+
+    @classmethod
+    def compact(cls, test_name: str = "", **kwargs: Any) -> "Result":
+        """
+        Result whose measurements and verdicts use the compact array-backed stores
+        from result_store (for sweeps with 10^5+ IDs). They behave as mappings, so
+        test scripts do not change; overall is O(1).
+        """
+        return cls(test_name=test_name, measurements=CompactMeasurements(), verdicts=CompactVerdicts(), **kwargs)
 
     @property
     def overall(self) -> str:
-        vals = list(self.verdicts.values())
-        if not vals: return "SKIP"
-        if any(v == "FAIL" for v in vals): return "FAIL"
-        if all(v == "SKIP" for v in vals): return "SKIP"
-        if all(v == "PASS" for v in vals): return "PASS"
-        return "PARTIAL"
+        return overall_of(self.verdicts)
+
+    def verdict_counts(self) -> Tuple[int, int, int, int]:
+        """(n_pass, n_fail, n_skip, n_total), kept up to date on every verdict write."""
+        return self.verdicts.verdict_counts()
+
+    def set_verdict(self, meas_id: int, verdict: str) -> None:
+        """Same as res.verdicts[meas_id] = verdict."""
+        self.verdicts[meas_id] = verdict
+
+    def add_verdict_listener(self, listener: VerdictListener) -> None:
+        """
+        Call listener(meas_id, old, new) after every verdict change (old/new are
+        None when absent), e.g. to update a live GUI without re-serializing the
+        Result. Listeners run in the thread that sets the verdict.
+        """
+        self.verdicts.add_listener(listener)
+
+    def remove_verdict_listener(self, listener: VerdictListener) -> None:
+        self.verdicts.remove_listener(listener)
 
     def add_evidence(self, label: str, path: str, meas_id: Optional[int] = None):
         self.evidence.append({"label": label, "file": path, "meas_id": meas_id})
 
     def to_json(self) -> Dict[str, Any]:
+        # Streaming/compact containers are copied into plain dicts/lists for json.
         return {
             "test_name": self.test_name,
-            "measurements": self.measurements,
-            "verdicts": self.verdicts,
-            "criteria": self.criteria,
-            "evidence": self.evidence,
-            "log": self.log,
+            "measurements": self.measurements if type(self.measurements) is dict else dict(self.measurements),
+            "verdicts": self.verdicts if type(self.verdicts) is dict else dict(self.verdicts),
+            "criteria": self.criteria if type(self.criteria) is dict else dict(self.criteria),
+            "evidence": self.evidence if type(self.evidence) is list else list(self.evidence),
+            "log": self.log if type(self.log) is list else list(self.log),
             "overall": self.overall,
         }
 
+    def stream_to(self, path: str | Path, *, fsync_interval: float = 1.0, log_tail: Optional[int] = 1000) -> Path:
+        """
+        Switch to streaming mode: from now on every measurement, verdict, criterion,
+        log line and evidence entry is appended to the JSON Lines journal at 'path'
+        as it is recorded (flushed and fsynced at most every 'fsync_interval' s).
+
+        Only the log is bounded in memory: the last 'log_tail' lines are kept
+        (self.log.total counts all lines). Measurements, verdicts and criteria
+        keep the latest value per ID, so they grow with the number of IDs, not
+        with writes. Content recorded so far is written first. Call it before handing self.log to prompt()/helpers, and
+        finish with close_stream(). Rebuild results.json with Result.rebuild_json().
+        """
+        if self._journal is not None:
+            raise RuntimeError(f"Result is already streaming to {self._journal.path}")
+        journal = ResultJournal(path, test_name=self.test_name, fsync_interval=fsync_interval)
+        if self._events is not None:
+            self._detach()
+        self._attach(journal, log_tail=log_tail)
+        # Published events continue through the journal (after the replay above, so nothing is sent twice).
+        journal.mirror = self._events
+        self._journal = journal
+        return journal.path
+
+    def close_stream(self) -> Optional[Path]:
+        """End streaming mode; returns the journal path (None if not streaming)."""
+        journal = self._journal
+        if journal is None:
+            return None
+        journal.mirror = None
+        journal.close(test_name=self.test_name, overall=self.overall)
+        self._detach()
+        self._journal = None
+        if self._events is not None:
+            self._attach(self._events, log_tail=None, replay=False)
+        return journal.path
+
+    def publish_events(self, target: str | Path) -> EventPublisher:
+        """
+        Publish every measurement, verdict, criterion, evidence entry, log line and
+        prompt to 'target' as it happens, for a live GUI (see result_events for the
+        channels: an append-only file, tcp://host:port or unix:path). What is already
+        recorded is sent first. Setting RULES_PACKAGER_EVENTS=<target> in a script's
+        environment does this for every Result the script creates. Finish with
+        close_events(); it also runs at interpreter exit.
+        """
+        if self._events is not None:
+            raise RuntimeError(f"Result is already publishing events to {self._events.target}")
+        events = EventPublisher(target, test_name=self.test_name)
+        if self._journal is not None:
+            self._snapshot(events)
+            self._journal.mirror = events
+        else:
+            self._attach(events, log_tail=None)
+        self._events = events
+        _publishing[id(self)] = self
+        # A Result dropped without close_events() still ends its stream (without overall).
+        weakref.finalize(self, events.close).atexit = False
+        return events
+
+    def close_events(self) -> None:
+        """Send the final "end" event (with overall) and stop publishing."""
+        events = self._events
+        if events is None:
+            return
+        _publishing.pop(id(self), None)
+        if self._journal is not None:
+            self._journal.mirror = None
+        else:
+            self._detach()
+        self._events = None
+        events.close(test_name=self.test_name, overall=self.overall)
+
+    def _attach(self, sink: Any, *, log_tail: Optional[int], replay: bool = True) -> None:
+        # Route every change through 'sink' (a ResultJournal or EventPublisher).
+        self.measurements = JournalMap(sink, "m", self.measurements, replay=replay)
+        self.verdicts = JournalMap(sink, "v", self.verdicts, replay=replay)
+        self.criteria = JournalMap(sink, "c", self.criteria, replay=replay)
+        self.evidence = JournalList(sink, "e", self.evidence, replay=replay)
+        self.log = journal_log(sink, self.log, maxlen=log_tail, replay=replay)
+
+    def _detach(self) -> None:
+        # object.__setattr__: the sink is still set here, and these must not be rewrapped.
+        for name in ("measurements", "verdicts", "criteria"):
+            value = getattr(self, name)
+            object.__setattr__(self, name, getattr(value, "backing", value))
+        object.__setattr__(self, "evidence", list(self.evidence))
+        object.__setattr__(self, "log", list(self.log))
+
+    def _snapshot(self, sink: Any) -> None:
+        for kind, mapping in (("m", self.measurements), ("v", self.verdicts), ("c", self.criteria)):
+            for k, v in mapping.items():
+                sink.write({"t": kind, "id": k, "v": v})
+        for item in self.evidence:
+            sink.write({"t": "e", "v": item})
+        for line in self.log:
+            sink.write({"t": "l", "v": line})
+
+    @staticmethod
+    def rebuild_json(journal: str | Path, output: str | Path) -> Path:
+        """Write the final results.json for a journal, streaming its log."""
+        return write_results_json(journal, output)
+
     def print_json(self) -> None:
         print("\nRESULTS:")
         print(json.dumps(self.to_json(), indent=2))
 
 
-    def export_html(self, output: Optional[str | Path] = None) -> Path:
+    def export_html(
+        self,
+        output: Optional[str | Path] = None,
+        *,
+        gzip: Optional[bool] = None,
+        log_page_lines: Optional[int] = 5000,
+        max_log_lines: Optional[int] = None,
+    ) -> Path:
         """
         Export this Result as an HTML report.
 
         If 'output' is None, a file name is generated from test_name.
         Returns the Path to the written HTML file.
+
+        The report is written to the file as it is generated (table rows and log
+        lines come from generators), so memory does not grow with the log. Logs
+        longer than 'log_page_lines' are split into collapsed pages; with
+        'max_log_lines' only the first and last lines are kept and the number of
+        omitted lines is noted. With 'gzip' (default: output ends in ".gz") the
+        report is gzip-compressed. While streaming (stream_to) the full log is
+        read back from the journal.
         """
+        for name, value in (("log_page_lines", log_page_lines), ("max_log_lines", max_log_lines)):
+            if value is not None and value < 0:
+                raise ValueError(f"{name} must be >= 0 (got {value})")
+
         # Build file name if none is given
+        suffix = ".html.gz" if gzip else ".html"
         if output is None:
             base = (self.test_name or "result").strip().replace(" ", "_")
-            output_path = Path(f"{base}.html")
+            output_path = Path(f"{base}{suffix}")
         else:
             output_path = Path(output)
             if output_path.suffix == "":
-                output_path = output_path.with_suffix(".html")
+                output_path = output_path.with_suffix(suffix)
+        if gzip is None:
+            gzip = output_path.suffix == ".gz"
+
+        chunks = self._html_chunks(log_page_lines=log_page_lines, max_log_lines=max_log_lines)
+        if gzip:
+            f = gzip_module.open(output_path, "wt", encoding="utf-8", compresslevel=6)
+        else:
+            f = output_path.open("w", encoding="utf-8")
+        with f:
+            for chunk in chunks:
+                f.write(chunk)
+        return output_path
 
+    def _iter_log(self) -> Iterator[Any]:
+        if self._journal is not None:
+            # Streaming mode keeps only a tail in memory; the journal has every line.
+            self._journal.sync()
+            return iter_log_entries(self._journal.path)
+        return iter(self.log or [])
+
+    def _html_chunks(self, *, log_page_lines: Optional[int], max_log_lines: Optional[int]) -> Iterator[str]:
         # Convenience aliases
         test_name = self.test_name or "Unnamed test"
         overall = self.overall or "UNKNOWN"
-        criteria: Dict[str, Any] = self.criteria or {}
-        measurements: Dict[str, Any] = self.measurements or {}
-        verdicts: Dict[str, Any] = self.verdicts or {}
-        log_entries: List[Any] = self.log or []
-
-        # Extract "Step ..." entries as procedure
-        steps: List[str] = []
-        for entry in log_entries:
-            if isinstance(entry, str) and entry.startswith("Step"):
-                steps.append(entry)
-
-        # Build rows for the requirements table
-        rows_html: list[str] = []
-        for crit_id, crit in sorted(criteria.items(), key=lambda kv: kv[0]):
-            expr = crit.get("expr", "")
-            units = crit.get("units", "")
-
-            # measurement id: use ref if present, else criterion id
-            ref_id = crit.get("ref", crit_id)
-
-            meas_val = measurements.get(ref_id, measurements.get(crit_id, ""))
-
-            # verdict: prefer measurement-id verdict, else criterion-id verdict
-            verdict = verdicts.get(ref_id, verdicts.get(crit_id, ""))
-
-            verdict_class = ""
-            if isinstance(verdict, str):
-                v = verdict.upper()
-                if v == "PASS":
-                    verdict_class = "pass"
-                elif v == "FAIL":
-                    verdict_class = "fail"
-                elif v == "SKIP":
-                    verdict_class = "skip"
-
-            rows_html.append(
-                f"<tr>"
-                f"<td class='id'>{escape(str(crit_id))}</td>"
-                f"<td class='expr'>{escape(expr)}</td>"
-                f"<td class='meas'>{escape(str(meas_val))}</td>"
-                f"<td class='units'>{escape(units)}</td>"
-                f"<td class='verdict {verdict_class}'>{escape(str(verdict))}</td>"
-                f"</tr>"
-            )
+        criteria: Mapping[int, Any] = self.criteria or {}
+        measurements: Mapping[int, Any] = self.measurements or {}
+        verdicts: Mapping[int, Any] = self.verdicts or {}
+
+        yield f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="utf-8">
+  <title>{escape(test_name)} - Test Report</title>
+{_REPORT_STYLE}</head>
+<body>
+  <header>
+    <h1>{escape(test_name)}</h1>
+    <div class="overall {escape(overall)}">Overall: {escape(overall)}</div>
+  </header>
+
+  """
 
         # Procedure section (from "Step ..." lines)
-        steps_html = ""
-        if steps:
-            steps_items = "\n".join(f"<li>{escape(step)}</li>" for step in steps)
-            steps_html = f"""
+        steps = (entry for entry in self._iter_log() if isinstance(entry, str) and entry.startswith("Step"))
+        first_step = next(steps, None)
+        if first_step is not None:
+            yield """
         <section>
           <h2>Procedure</h2>
           <ol>
-            {steps_items}
+            """
+            yield f"<li>{escape(first_step)}</li>"
+            for step in steps:
+                yield f"\n<li>{escape(step)}</li>"
+            yield """
           </ol>
         </section>
         """
 
+        yield """
+
+  <section>
+    <h2>Requirements and Results</h2>
+    <table>
+      <thead>
+        <tr>
+          <th>ID</th>
+          <th>Requirement</th>
+          <th>Measurement</th>
+          <th>Units</th>
+          <th>Verdict</th>
+        </tr>
+      </thead>
+      <tbody>
+        """
+        for crit_id, crit in sorted(criteria.items(), key=lambda kv: kv[0]):
+            yield _requirement_row(crit_id, crit, measurements, verdicts)
+        yield """
+      </tbody>
+    </table>
+  </section>
+
+  """
+
         # Full logs section
-        logs_html = ""
-        if log_entries:
-            log_text = "\n".join(escape(str(entry)) for entry in log_entries)
-            logs_html = f"""
+        lines = _numbered_log(self._iter_log(), max_log_lines)
+        page = list(islice(lines, log_page_lines + 1)) if log_page_lines else []
+        if log_page_lines and len(page) > log_page_lines:
+            yield """
+        <section>
+          <h2>Logs</h2>
+          """
+            lines = chain(page, lines)
+            first = True
+            while True:
+                chunk = list(islice(lines, log_page_lines))
+                if not chunk:
+                    break
+                yield _log_page(chunk, first)
+                first = False
+            yield """
+        </section>
+        """
+        else:
+            head = iter(page) if log_page_lines else lines
+            first_line = next(head, None)
+            if first_line is not None:
+                yield """
         <section>
           <h2>Logs</h2>
-          <pre>{log_text}</pre>
+          <pre>"""
+                yield first_line[1]
+                for _n, text in head:
+                    yield "\n" + text
+                yield """</pre>
         </section>
         """
 
-        html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-  <meta charset="utf-8">
-  <title>{escape(test_name)} - Test Report</title>
-  <style>
-    body {{
+        yield """
+</body>
+</html>
+"""
+
+    @classmethod
+    def from_json_dict(cls, data: Dict[str, Any]) -> "Result":
+        # JSON keys are strings → convert to ints for our Dict[int, ...] fields
+        raw_meas = data.get("measurements", {}) or {}
+        raw_verdicts = data.get("verdicts", {}) or {}
+        raw_criteria = data.get("criteria", {}) or {}
+
+        measurements: Dict[int, Any] = {int(k): v for k, v in raw_meas.items()}
+        verdicts: Dict[int, str] = {int(k): v for k, v in raw_verdicts.items()}
+        criteria: Dict[int, Dict[str, Any]] = {int(k): v for k, v in raw_criteria.items()}
+
+        with _no_auto_events():
+            return cls(
+                test_name=data.get("test_name", ""),
+                measurements=measurements,
+                verdicts=verdicts,
+                criteria=criteria,
+                evidence=data.get("evidence", []) or [],
+                log=data.get("log", []) or [],
+            )
+
+    def save(self, path: str | Path, format: Optional[str] = None, *, level: Optional[int] = None) -> Path:
+        """
+        Save this Result. Formats:
+          "json"     same content as print_json / results.json (the interchange format)
+          "json.gz"  the same JSON, gzip-compressed
+          "binary"   compact container from result_binary: packed numeric arrays, zlib (level 0 = none)
+        Without 'format' it follows the suffix: ".gz" -> json.gz, ".rpb" -> binary, else json.
+        'level' is the zlib/gzip level of the compressed formats (default 6; 0 stores uncompressed).
+        Load any of them back with Result.load().
+        """
+        p = Path(path)
+        if level is None:
+            level = 6
+        if format is None:
+            format = {".gz": "json.gz", ".rpb": "binary"}.get(p.suffix, "json")
+        if format == "json":
+            p.write_text(json.dumps(self.to_json(), indent=2), encoding="utf-8")
+        elif format == "json.gz":
+            with gzip_module.open(p, "wt", encoding="utf-8", compresslevel=level) as f:
+                f.write(json.dumps(self.to_json(), indent=2))
+        elif format == "binary":
+            p.write_bytes(
+                encode_binary(
+                    test_name=self.test_name,
+                    measurements=self.measurements,
+                    verdicts=self.verdicts,
+                    criteria=self.criteria,
+                    evidence=self.evidence,
+                    log=self._iter_log(),
+                    compact=isinstance(self.measurements, CompactMeasurements),
+                    level=level,
+                )
+            )
+        else:
+            raise ValueError(f"Unknown Result format {format!r} (expected 'json', 'json.gz' or 'binary')")
+        return p
+
+    @classmethod
+    def load(cls, path: str | Path) -> "Result":
+        """Load a Result saved in any format (binary, gzip JSON, JSON or a stream_to() journal)."""
+        p = Path(path)
+        with p.open("rb") as f:
+            head = f.read(len(BINARY_MAGIC))
+        if head == BINARY_MAGIC:
+            data = decode_binary(p.read_bytes())
+            with _no_auto_events():
+                res = cls.compact(data["test_name"]) if data["compact"] else cls(test_name=data["test_name"])
+            res.measurements.update(data["measurements"])
+            res.verdicts.update(data["verdicts"])
+            res.criteria.update(data["criteria"])
+            res.evidence.extend(data["evidence"])
+            res.log.extend(data["log"])
+            return res
+        if head[:2] == b"\x1f\x8b":
+            with gzip_module.open(p, "rt", encoding="utf-8") as f:
+                return cls.from_json_dict(json.load(f))
+        return cls.from_json_file(str(p))
+
+    @classmethod
+    def from_journal(cls, path: str | Path) -> "Result":
+        return cls.from_json_dict(replay_journal(path))
+
+    @classmethod
+    def from_json_file(cls, path: str) -> "Result":
+        # Accepts results.json as well as a stream_to() journal.
+        p = Path(path)
+        if is_journal(p):
+            return cls.from_journal(p)
+        with p.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls.from_json_dict(data)
+
+
+_REPORT_STYLE = """  <style>
+    body {
       font-family: system-ui, -apple-system, BlinkMacSystemFont, "Segoe UI", sans-serif;
       margin: 1.5rem;
       background: #f7f7f7;
-    }}
-    h1 {{
+    }
+    h1 {
       margin-bottom: 0.2rem;
-    }}
-    .overall {{
+    }
+    .overall {
       font-weight: bold;
       padding: 0.3rem 0.6rem;
       border-radius: 4px;
       display: inline-block;
-    }}
-    .overall.PASS {{
+    }
+    .overall.PASS {
       background: #e4f7e4;
       color: #146314;
-    }}
-    .overall.FAIL {{
+    }
+    .overall.FAIL {
       background: #fde2e2;
       color: #8c1111;
-    }}
-    .overall.UNKNOWN {{
+    }
+    .overall.UNKNOWN {
       background: #eee;
       color: #555;
-    }}
-    table {{
+    }
+    table {
       border-collapse: collapse;
       width: 100%;
       margin-top: 1rem;
       background: white;
-    }}
-    th, td {{
+    }
+    th, td {
       border: 1px solid #ddd;
       padding: 0.4rem 0.6rem;
       font-size: 0.9rem;
-    }}
-    th {{
+    }
+    th {
       background: #f0f0f0;
       text-align: left;
-    }}
-    tr:nth-child(even) {{
+    }
+    tr:nth-child(even) {
       background: #fafafa;
-    }}
-    td.id {{
+    }
+    td.id {
       text-align: right;
       width: 3rem;
       white-space: nowrap;
-    }}
-    td.meas {{
+    }
+    td.meas {
       text-align: right;
       width: 8rem;
       white-space: nowrap;
-    }}
-    td.units {{
+    }
+    td.units {
       text-align: left;
       width: 4rem;
       white-space: nowrap;
-    }}
-    td.verdict {{
+    }
+    td.verdict {
       text-align: center;
       width: 6rem;
       font-weight: bold;
-    }}
-    td.verdict.pass {{
+    }
+    td.verdict.pass {
       color: #146314;
-    }}
-    td.verdict.fail {{
+    }
+    td.verdict.fail {
       color: #8c1111;
-    }}
-    td.verdict.skip {{
+    }
+    td.verdict.skip {
       color: #555555;
-    }}
-    section {{
+    }
+    section {
       margin-top: 1.5rem;
-    }}
-    pre {{
+    }
+    pre {
       background: #222;
       color: #eee;
       padding: 0.8rem;
       border-radius: 4px;
       overflow-x: auto;
       font-size: 0.8rem;
-    }}
+    }
+    details > summary {
+      cursor: pointer;
+      font-size: 0.85rem;
+      color: #555;
+    }
+    .log-note {
+      color: #f5c26b;
+    }
   </style>
-</head>
-<body>
-  <header>
-    <h1>{escape(test_name)}</h1>
-    <div class="overall {escape(overall)}">Overall: {escape(overall)}</div>
-  </header>
-
-  {steps_html}
-
-  <section>
-    <h2>Requirements and Results</h2>
-    <table>
-      <thead>
-        <tr>
-          <th>ID</th>
-          <th>Requirement</th>
-          <th>Measurement</th>
-          <th>Units</th>
-          <th>Verdict</th>
-        </tr>
-      </thead>
-      <tbody>
-        {"".join(rows_html)}
-      </tbody>
-    </table>
-  </section>
-
-  {logs_html}
-</body>
-</html>
 """
 
-        output_path.write_text(html, encoding="utf-8")
-        return output_path
 
-
-    @classmethod
-    def from_json_dict(cls, data: Dict[str, Any]) -> "Result":
-        # JSON keys are strings → convert to ints for our Dict[int, ...] fields
-        raw_meas = data.get("measurements", {}) or {}
-        raw_verdicts = data.get("verdicts", {}) or {}
-        raw_criteria = data.get("criteria", {}) or {}
-
-        measurements: Dict[int, Any] = {int(k): v for k, v in raw_meas.items()}
-        verdicts: Dict[int, str] = {int(k): v for k, v in raw_verdicts.items()}
-        criteria: Dict[int, Dict[str, Any]] = {int(k): v for k, v in raw_criteria.items()}
-
-        return cls(
-            test_name=data.get("test_name", ""),
-            measurements=measurements,
-            verdicts=verdicts,
-            criteria=criteria,
-            evidence=data.get("evidence", []) or [],
-            log=data.get("log", []) or [],
-        )
-
-    @classmethod
-    def from_json_file(cls, path: str) -> "Result":
-        p = Path(path)
-        with p.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        return cls.from_json_dict(data)
+def _requirement_row(crit_id: Any, crit: Dict[str, Any], measurements: Mapping[int, Any], verdicts: Mapping[int, Any]) -> str:
+    expr = crit.get("expr", "")
+    units = crit.get("units", "")
+
+    # measurement id: use ref if present, else criterion id
+    ref_id = crit.get("ref", crit_id)
+
+    meas_val = measurements.get(ref_id, measurements.get(crit_id, ""))
+
+    # verdict: prefer measurement-id verdict, else criterion-id verdict
+    verdict = verdicts.get(ref_id, verdicts.get(crit_id, ""))
+
+    verdict_class = ""
+    if isinstance(verdict, str):
+        v = verdict.upper()
+        if v == "PASS":
+            verdict_class = "pass"
+        elif v == "FAIL":
+            verdict_class = "fail"
+        elif v == "SKIP":
+            verdict_class = "skip"
+
+    return (
+        f"<tr>"
+        f"<td class='id'>{escape(str(crit_id))}</td>"
+        f"<td class='expr'>{escape(expr)}</td>"
+        f"<td class='meas'>{escape(str(meas_val))}</td>"
+        f"<td class='units'>{escape(units)}</td>"
+        f"<td class='verdict {verdict_class}'>{escape(str(verdict))}</td>"
+        f"</tr>"
+    )
+
+
+def _numbered_log(entries: Iterable[Any], max_lines: Optional[int]) -> Iterator[Tuple[Optional[int], str]]:
+    """(line number, escaped text) per log entry; with max_lines the middle is replaced by a note."""
+    if max_lines is None:
+        for n, entry in enumerate(entries, start=1):
+            yield n, escape(str(entry))
+        return
+    keep_head = (max_lines + 1) // 2
+    tail: Deque[Tuple[int, Any]] = deque(maxlen=max_lines - keep_head)
+    n = 0
+    for n, entry in enumerate(entries, start=1):
+        if n <= keep_head:
+            yield n, escape(str(entry))
+        else:
+            tail.append((n, entry))
+    omitted = n - keep_head - len(tail)
+    if omitted > 0:
+        yield None, f"<span class='log-note'>... {omitted} lines omitted ...</span>"
+    for n, entry in tail:
+        yield n, escape(str(entry))
+
+
+def _log_page(page: List[Tuple[Optional[int], str]], first: bool) -> str:
+    numbers = [n for n, _text in page if n is not None]
+    label = f"Lines {numbers[0]}-{numbers[-1]}" if numbers else "Omitted lines"
+    body = "\n".join(text for _n, text in page)
+    return f"<details{' open' if first else ''}><summary>{label}</summary><pre>{body}</pre></details>\n"
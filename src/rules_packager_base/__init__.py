@@ -3,6 +3,7 @@ from .test_helpers import (
     prompt,
     prompt_choice,
     parse_quantity,
+    parse_quantities,
     read_measurement,
     operator_judgment,
     read_logic_01,
@@ -13,6 +14,7 @@ __all__ = [
     "prompt",
     "prompt_choice",
     "parse_quantity",
+    "parse_quantities",
     "read_measurement",
     "operator_judgment",
     "read_logic_01",
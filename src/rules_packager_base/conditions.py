@@ -0,0 +1,405 @@
+"""
+conditions.py
+
+Compiles "Success conditions" lines (section 12 of test_rules_llm_ready.md) into
+criteria once, then evaluates all of them against a Result's measurements in a
+single batched pass. NumPy is used when it is installed; otherwise the same
+compiled tables are walked in plain Python.
+
+    from rules_packager_base import Result
+    from rules_packager_base.conditions import evaluate_conditions
+
+    res = Result(test_name="PSU-001")
+    ...
+    evaluate_conditions(res, '''
+        {1} = 3.30 V ± 50 mV
+        {2} < 50 mV pk-pk
+        {1} - {2} > 400 mV
+        {3..5} = 2.15V±2%
+        {6} = Ok with margin
+    ''', operator_ids={6})
+
+Criteria and verdicts are keyed by rule id (1..N in authored order), with the
+measurement id(s) under "ref"/"refs", as in the generated RULES blocks.
+"""
+
+from __future__ import annotations
+
+import copy
+import dataclasses
+import functools
+import math
+import re
+from typing import Any, Iterable, Mapping
+
+from .test_helpers import parse_quantity
+
+try:  # optional: batched evaluation
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when NumPy is absent
+    np = None  # type: ignore[assignment]
+
+
+class ConditionError(ValueError):
+    pass
+
+
+_NUM = r"[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?"
+# Quantity: number, optional unit (with optional subtype such as "Vpk-pk" or "mV pk-pk").
+_QTY = rf"(?:{_NUM})\s*(?:[A-Za-zµμΩ]+(?:-[A-Za-z]+)?)?(?:\s+(?:pk-pk|p-p|pk|rms|RMS))?"
+_QTY_RE = re.compile(rf"\s*(?P<num>{_NUM})\s*(?P<unit>[A-Za-zµμΩ]+(?:-[A-Za-z]+)?)?(?:\s+(?P<sub>pk-pk|p-p|pk|rms|RMS))?\s*")
+_UNIT_RE = re.compile(r"(?P<pre>[yzafpnuµμmkKMGTPEZY]?)(?P<base>Hz|V|A|s|W|Ω|[Oo]hms?)(?P<sub>.*)")
+
+_OP = r"<=|>=|==|!=|≤|≥|<|>|="
+_OPS = {"<": "lt", "<=": "le", "≤": "le", ">": "gt", ">=": "ge", "≥": "ge", "=": "eq", "==": "eq"}
+
+_RANGE_RE = re.compile(rf"^(?P<lo>{_QTY})\s*(?P<op1><=|≤|<)\s*\{{(?P<id>\d+)\}}\s*(?P<op2><=|≤|<)\s*(?P<hi>{_QTY})$")
+_DIFF_RE = re.compile(rf"^\{{(?P<a>\d+)\}}\s*[-−–]\s*\{{(?P<b>\d+)\}}\s*(?P<op>{_OP})\s*(?P<rhs>{_QTY})$")
+_SINGLE_RE = re.compile(rf"^\{{(?P<id>\d+)\}}\s*(?P<op>{_OP})\s*(?P<rhs>.*)$")
+_ID_RANGE_RE = re.compile(r"^\{\s*(\d+)\s*\.\.\s*(\d+)\s*\}")
+_TOL_RE = re.compile(rf"^(?P<target>{_QTY})\s*(?:±|\+/-|\+-)\s*(?:(?P<pct>{_NUM})\s*%|(?P<tol>{_QTY}))$")
+
+
+@dataclasses.dataclass(frozen=True)
+class _Quantity:
+    value: float
+    units: str  # base unit symbol ("V", "s", "Hz", ...) or ""
+    subtype: str  # "pk-pk", "rms", ... or ""
+
+
+def _quantity(text: str, default_unit: str) -> _Quantity:
+    m = _QTY_RE.fullmatch(text)
+    if not m:
+        raise ConditionError(f"Invalid quantity: {text.strip()!r}")
+    unit = m.group("unit") or ""
+    subtype = m.group("sub") or ""
+    base = ""
+    scaled = unit
+    if unit:
+        u = _UNIT_RE.fullmatch(unit)
+        if u:
+            base = "Ω" if u.group("base").lower().startswith("ohm") else u.group("base")
+            subtype = subtype or u.group("sub").lstrip("-")
+            scaled = u.group("pre") + base
+        elif unit == "%":
+            pass
+        else:
+            scaled = unit
+    try:
+        value = parse_quantity(m.group("num") + scaled, default_unit)
+    except ValueError as e:
+        raise ConditionError(f"Invalid quantity {text.strip()!r}: {e}")
+    return _Quantity(value, base, subtype.lower().replace("p-p", "pk-pk"))
+
+
+@dataclasses.dataclass(frozen=True)
+class _Numeric:
+    rule_id: int
+    ref_a: int
+    ref_b: int  # -1: single measurement; else the value is {a} - {b}
+    lo: float
+    hi: float
+    lo_incl: bool
+    hi_incl: bool
+
+
+@dataclasses.dataclass(frozen=True)
+class _Text:
+    rule_id: int
+    ref: int
+    kind: str  # "string_eq" | "regex" | "empty_or_timeout"
+    target: str
+
+
+# Inclusive bounds accept values this close (relative): target ± tol is float
+# arithmetic, e.g. 3.30 + 0.05 = 3.3499999999999996, and must still admit 3.35.
+_BOUND_REL_TOL = 1e-9
+
+
+def _widen(n: _Numeric) -> _Numeric:
+    lo = n.lo - _BOUND_REL_TOL * abs(n.lo) if n.lo_incl and math.isfinite(n.lo) else n.lo
+    hi = n.hi + _BOUND_REL_TOL * abs(n.hi) if n.hi_incl and math.isfinite(n.hi) else n.hi
+    return dataclasses.replace(n, lo=lo, hi=hi)
+
+
+def _limit(x: float) -> float:
+    # Reported limits at the precision of the spec (no 3.3499999999999996 in results.json).
+    return float(f"{x:.12g}")
+
+
+def _interval(op: str, limit: float) -> tuple[float, float, bool, bool]:
+    if op == "lt":
+        return -math.inf, limit, False, False
+    if op == "le":
+        return -math.inf, limit, False, True
+    if op == "gt":
+        return limit, math.inf, False, False
+    if op == "ge":
+        return limit, math.inf, True, False
+    return limit, limit, True, True  # eq
+
+
+def _split_id_range(line: str) -> list[str]:
+    # "{A..B} rhs" -> one line per ID with the same rhs.
+    m = _ID_RANGE_RE.match(line)
+    if not m:
+        return [line]
+    a, b = int(m.group(1)), int(m.group(2))
+    if a > b:
+        raise ConditionError(f"Invalid ID range {{{a}..{b}}}: start > end")
+    rest = line[m.end() :]
+    return [f"{{{i}}}{rest}" for i in range(a, b + 1)]
+
+
+class CompiledConditions:
+    """Success conditions compiled to criteria plus flat evaluation tables."""
+
+    def __init__(self, criteria: dict[int, dict[str, Any]], numeric: list[_Numeric], text: list[_Text]) -> None:
+        self._criteria = criteria
+        self._numeric = numeric = [_widen(n) for n in numeric]
+        self._text = text
+        self._needed = sorted({n.ref_a for n in numeric} | {n.ref_b for n in numeric if n.ref_b >= 0})
+        if np is not None and numeric:
+            pos = {mid: i for i, mid in enumerate(self._needed)}
+            self._np = {
+                "rule": [n.rule_id for n in numeric],
+                "a": np.array([pos[n.ref_a] for n in numeric], dtype=np.intp),
+                "b": np.array([pos.get(n.ref_b, -1) for n in numeric], dtype=np.intp),
+                "lo": np.array([n.lo for n in numeric], dtype=np.float64),
+                "hi": np.array([n.hi for n in numeric], dtype=np.float64),
+                "lo_incl": np.array([n.lo_incl for n in numeric], dtype=bool),
+                "hi_incl": np.array([n.hi_incl for n in numeric], dtype=bool),
+            }
+
+    @property
+    def criteria(self) -> dict[int, dict[str, Any]]:
+        """``{rule_id: criterion}``; a fresh copy each time, since compiles are cached and shared."""
+        return copy.deepcopy(self._criteria)
+
+    def evaluate(self, measurements: Mapping[int, Any]) -> dict[int, str]:
+        """Return ``{rule_id: "PASS"|"FAIL"}`` for every machine-checkable rule.
+
+        Missing or non-numeric measurements FAIL numeric rules. Operator
+        decisions are not evaluated here.
+        """
+        verdicts: dict[int, str] = {}
+        if self._numeric:
+            if np is not None:
+                verdicts.update(self._evaluate_np(measurements))
+            else:
+                verdicts.update(self._evaluate_py(measurements))
+        for t in self._text:
+            verdicts[t.rule_id] = _text_verdict(t, measurements)
+        return dict(sorted(verdicts.items()))
+
+    def _evaluate_np(self, measurements: Mapping[int, Any]) -> dict[int, str]:
+        t = self._np
+        vals = np.fromiter((_as_float(measurements.get(i)) for i in self._needed), dtype=np.float64, count=len(self._needed))
+        x = vals[t["a"]] - np.where(t["b"] >= 0, vals[t["b"]], 0.0)
+        with np.errstate(invalid="ignore"):
+            lo_ok = np.where(t["lo_incl"], x >= t["lo"], x > t["lo"])
+            hi_ok = np.where(t["hi_incl"], x <= t["hi"], x < t["hi"])
+        ok = lo_ok & hi_ok & ~np.isnan(x)
+        return dict(zip(t["rule"], np.where(ok, "PASS", "FAIL").tolist()))
+
+    def _evaluate_py(self, measurements: Mapping[int, Any]) -> dict[int, str]:
+        vals = {i: _as_float(measurements.get(i)) for i in self._needed}
+        out: dict[int, str] = {}
+        for n in self._numeric:
+            x = vals[n.ref_a] - (vals[n.ref_b] if n.ref_b >= 0 else 0.0)
+            ok = (
+                not math.isnan(x)
+                and (x >= n.lo if n.lo_incl else x > n.lo)
+                and (x <= n.hi if n.hi_incl else x < n.hi)
+            )
+            out[n.rule_id] = "PASS" if ok else "FAIL"
+        return out
+
+    def apply(self, result: Any) -> dict[int, str]:
+        """Store criteria and verdicts on a ``Result``; returns the new verdicts.
+
+        Verdicts already recorded for operator-decision rules are kept.
+        """
+        result.criteria.update(self.criteria)
+        verdicts = self.evaluate(result.measurements)
+        result.verdicts.update(verdicts)
+        return verdicts
+
+
+def _as_float(v: Any) -> float:
+    if isinstance(v, bool) or v is None:
+        return math.nan
+    if isinstance(v, (int, float)):
+        return float(v)
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _text_verdict(t: _Text, measurements: Mapping[int, Any]) -> str:
+    if t.ref not in measurements:
+        return "FAIL"
+    measured = measurements[t.ref]
+    if t.kind == "empty_or_timeout":
+        # None is how a timed-out read is recorded.
+        return "PASS" if measured is None or str(measured).strip() == "" else "FAIL"
+    if measured is None:
+        return "FAIL"
+    text = str(measured).strip()
+    if t.kind == "regex":
+        return "PASS" if re.search(t.target, text) else "FAIL"
+    return "PASS" if text == t.target.strip() else "FAIL"
+
+
+def _compile_line(
+    line: str,
+    rule_id: int,
+    *,
+    operator_ids: frozenset[int],
+    default_unit: str,
+) -> tuple[dict[str, Any], _Numeric | _Text | None]:
+    expr = line
+
+    m = _RANGE_RE.match(line)
+    if m:
+        lo = _quantity(m.group("lo"), default_unit)
+        hi = _quantity(m.group("hi"), default_unit)
+        ref = int(m.group("id"))
+        crit = {"type": "range_abs", "expr": expr, "ref": ref, "lower": lo.value, "upper": hi.value, "units": hi.units or lo.units}
+        lo_incl, hi_incl = m.group("op1") != "<", m.group("op2") != "<"
+        if lo_incl or hi_incl:
+            crit["inclusive"] = [lo_incl, hi_incl]
+        return crit, _Numeric(rule_id, ref, -1, lo.value, hi.value, lo_incl, hi_incl)
+
+    m = _DIFF_RE.match(line)
+    if m:
+        op = m.group("op")
+        if op == "!=":
+            raise ConditionError(f"Unsupported comparator '!=' in: {line!r}")
+        kind = _OPS[op]
+        q = _quantity(m.group("rhs"), default_unit)
+        a, b = int(m.group("a")), int(m.group("b"))
+        crit = {"type": f"{kind}_abs_expr", "expr": expr, "refs": [a, b], "limit": q.value, "units": q.units}
+        return crit, _Numeric(rule_id, a, b, *_interval(kind, q.value))
+
+    m = _SINGLE_RE.match(line)
+    if not m:
+        raise ConditionError(f"Unrecognized success condition: {line!r}")
+    ref = int(m.group("id"))
+    op = m.group("op")
+    rhs = m.group("rhs").strip()
+    if op == "!=":
+        raise ConditionError(f"Unsupported comparator '!=' in: {line!r}")
+    kind = _OPS[op]
+
+    if kind != "eq":
+        q = _quantity(rhs, default_unit)
+        crit = {"type": f"{kind}_abs", "expr": expr, "ref": ref, "limit": q.value, "units": q.units}
+        if q.subtype:
+            crit["subtype"] = q.subtype
+        return crit, _Numeric(rule_id, ref, -1, *_interval(kind, q.value))
+
+    tol = _TOL_RE.match(rhs)
+    if tol:
+        target = _quantity(tol.group("target"), default_unit)
+        if tol.group("pct") is not None:
+            pct = float(tol.group("pct"))
+            delta = abs(target.value) * pct / 100.0
+            crit = {
+                "type": "within_pct",
+                "expr": expr,
+                "ref": ref,
+                "target": target.value,
+                "tol_pct": pct,
+                "lower": _limit(target.value - delta),
+                "upper": _limit(target.value + delta),
+                "units": target.units,
+            }
+        else:
+            delta = abs(_quantity(tol.group("tol"), default_unit).value)
+            crit = {
+                "type": "within_abs",
+                "expr": expr,
+                "ref": ref,
+                "target": target.value,
+                "tolerance": delta,
+                "lower": _limit(target.value - delta),
+                "upper": _limit(target.value + delta),
+                "units": target.units,
+            }
+        if target.subtype:
+            crit["subtype"] = target.subtype
+        return crit, _Numeric(rule_id, ref, -1, crit["lower"], crit["upper"], True, True)
+
+    if _QTY_RE.fullmatch(rhs):
+        q = _quantity(rhs, default_unit)
+        crit = {"type": "eq_abs", "expr": expr, "ref": ref, "limit": q.value, "units": q.units}
+        return crit, _Numeric(rule_id, ref, -1, q.value, q.value, True, True)
+
+    # Text target.
+    if ref in operator_ids:
+        return {"type": "operator_decision", "expr": expr, "ref": ref, "target": rhs}, None
+    if rhs.lower() == "empty or timeout":
+        return {"type": "empty_or_timeout", "expr": expr, "ref": ref}, _Text(rule_id, ref, "empty_or_timeout", "")
+    if len(rhs) >= 2 and rhs.startswith("/") and rhs.endswith("/"):
+        pattern = rhs[1:-1]
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ConditionError(f"Invalid regex in {line!r}: {e}")
+        return {"type": "regex", "expr": expr, "ref": ref, "pattern": pattern}, _Text(rule_id, ref, "regex", pattern)
+    return {"type": "string_eq", "expr": expr, "ref": ref, "target": rhs}, _Text(rule_id, ref, "string_eq", rhs)
+
+
+@functools.lru_cache(maxsize=128)
+def _compile(lines: tuple[str, ...], operator_ids: frozenset[int], default_unit: str, first_rule_id: int) -> CompiledConditions:
+    criteria: dict[int, dict[str, Any]] = {}
+    numeric: list[_Numeric] = []
+    text: list[_Text] = []
+    rule_id = first_rule_id
+    for raw in lines:
+        line = raw.strip().rstrip(".").strip()
+        if not line or line.startswith("#"):
+            continue
+        for one in _split_id_range(line):
+            crit, ev = _compile_line(one, rule_id, operator_ids=operator_ids, default_unit=default_unit)
+            criteria[rule_id] = crit
+            if isinstance(ev, _Numeric):
+                numeric.append(ev)
+            elif isinstance(ev, _Text):
+                text.append(ev)
+            rule_id += 1
+    return CompiledConditions(criteria, numeric, text)
+
+
+def compile_conditions(
+    conditions: str | Iterable[Any],
+    *,
+    operator_ids: Iterable[int] = (),
+    default_unit: str = "V",
+    first_rule_id: int = 1,
+) -> CompiledConditions:
+    """Compile success-condition lines; cached, so repeated calls are free.
+
+    ``conditions`` is the section text or an iterable of lines (``str`` or
+    ``macro_dsl.ExpandedLine``; expand macro directives first). Text targets
+    (``{n} = <TEXT>``) are operator decisions for IDs in ``operator_ids``;
+    otherwise they are exact string matches, ``/regex/`` or ``empty or timeout``.
+    """
+    if isinstance(conditions, str):
+        lines = tuple(conditions.splitlines())
+    else:
+        lines = tuple(getattr(c, "text", c) for c in conditions)
+    return _compile(lines, frozenset(operator_ids), default_unit, first_rule_id)
+
+
+def evaluate_conditions(
+    result: Any,
+    conditions: str | Iterable[Any],
+    *,
+    operator_ids: Iterable[int] = (),
+    default_unit: str = "V",
+) -> dict[int, str]:
+    """Compile ``conditions`` and fill ``result.criteria`` / ``result.verdicts`` in one pass."""
+    return compile_conditions(conditions, operator_ids=operator_ids, default_unit=default_unit).apply(result)
@@ -1,15 +1,29 @@
 from __future__ import annotations
 
 import argparse
+import codecs
+import concurrent.futures
+import contextlib
 import dataclasses
+import functools
 import hashlib
 import importlib.resources
 from importlib.resources.abc import Traversable
 import json
 from pathlib import Path
-from typing import Any
+import threading
+from typing import Any, Callable, Iterator, Sequence
 import warnings
 
+from .rules_cache import DEFAULT_MAX_BYTES, CachedDoc, RuleDocCache
+from .search_index import search
+from .section_index import SectionIndexError, query_sections
+from .sections import estimate_tokens, split_sections
+
+
+# Lower priorities are packed first when trimming to a token budget.
+DEFAULT_PRIORITY = 100
+
 
 @dataclasses.dataclass(frozen=True)
 class RuleDoc:
@@ -20,6 +34,110 @@ class RuleDoc:
     content: str
     doc_id: str | None = None
     title: str | None = None
+    priority: int = DEFAULT_PRIORITY
+    # (heading, priority) overrides for "## " sections, from the rules index.
+    section_priorities: tuple[tuple[str, int], ...] = ()
+    # Headings kept when the doc was trimmed to a token budget; None = complete doc.
+    sections: tuple[str, ...] | None = None
+
+    @functools.cached_property
+    def n_bytes(self) -> int:
+        return len(self.content.encode("utf-8"))
+
+    @functools.cached_property
+    def n_tokens(self) -> int:
+        """Estimated LLM token count of ``content`` (see ``sections.estimate_tokens``)."""
+        return estimate_tokens(self.content)
+
+
+class LazyRuleDoc(RuleDoc):
+    """RuleDoc whose body is read on demand.
+
+    Only the frontmatter (``doc_id``/``title``) is read up front. The full file
+    is read, hashed and sha-checked on the first access to ``content`` or
+    ``sha256``, then kept. Compares and hashes like the equivalent ``RuleDoc``
+    (which forces a load); ``repr`` does not.
+    """
+
+    def __init__(
+        self,
+        *,
+        source: str,
+        origin: str,
+        relpath: str,
+        loader: Callable[[], tuple[str, str]],
+        sha256: str | None = None,
+        doc_id: str | None = None,
+        title: str | None = None,
+        priority: int = DEFAULT_PRIORITY,
+        section_priorities: tuple[tuple[str, int], ...] = (),
+    ) -> None:
+        object.__setattr__(self, "source", source)
+        object.__setattr__(self, "origin", origin)
+        object.__setattr__(self, "relpath", relpath)
+        object.__setattr__(self, "doc_id", doc_id)
+        object.__setattr__(self, "title", title)
+        object.__setattr__(self, "priority", priority)
+        object.__setattr__(self, "section_priorities", section_priorities)
+        object.__setattr__(self, "sections", None)
+        object.__setattr__(self, "_sha256", sha256)
+        object.__setattr__(self, "_content", None)
+        object.__setattr__(self, "_loader", loader)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _load(self) -> str:
+        with self._lock:
+            if self._content is None:
+                sha, content = self._loader()
+                if self._sha256 is None:
+                    object.__setattr__(self, "_sha256", sha)
+                object.__setattr__(self, "_content", content)
+                object.__setattr__(self, "_loader", None)
+        return self._content  # type: ignore[return-value]
+
+    @property  # type: ignore[override]
+    def content(self) -> str:
+        return self._load()
+
+    @property  # type: ignore[override]
+    def sha256(self) -> str:
+        if self._sha256 is None:
+            self._load()
+        return self._sha256  # type: ignore[return-value]
+
+    def _astuple(self) -> tuple[Any, ...]:
+        return tuple(getattr(self, f.name) for f in dataclasses.fields(RuleDoc))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RuleDoc):
+            return NotImplemented
+        return self._astuple() == LazyRuleDoc._astuple(other)  # type: ignore[arg-type]
+
+    def __hash__(self) -> int:
+        return hash(self._astuple())
+
+    def __repr__(self) -> str:
+        # Never force a load just to print the object.
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"LazyRuleDoc(source={self.source!r}, relpath={self.relpath!r}, doc_id={self.doc_id!r}, {state})"
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._content is not None
+
+    def materialize(self) -> RuleDoc:
+        """Return a plain ``RuleDoc`` with the body loaded."""
+        return RuleDoc(
+            source=self.source,
+            origin=self.origin,
+            relpath=self.relpath,
+            sha256=self.sha256,
+            content=self.content,
+            doc_id=self.doc_id,
+            title=self.title,
+            priority=self.priority,
+            section_priorities=self.section_priorities,
+        )
 
 
 class RulesLoadError(RuntimeError):
@@ -83,14 +201,39 @@ def _resource_base_for_package(package_name: str) -> Traversable:
         raise RulesLoadError(f"Failed to resolve package resources for {package_name!r}: {e}")
 
 
-def _load_pack_from_root(
+@dataclasses.dataclass(frozen=True)
+class _DocEntry:
+    md_path: Any
+    relpath: str
+    expected_sha: str | None
+    priority: int = DEFAULT_PRIORITY
+    section_priorities: tuple[tuple[str, int], ...] = ()
+
+
+@dataclasses.dataclass(frozen=True)
+class _LoadedDoc:
+    sha256: str | None  # None: lazy and not known yet
+    content: str | None  # None: lazy, read on first access
+    doc_id: str | None
+    title: str | None
+
+
+@dataclasses.dataclass(frozen=True)
+class _PackSource:
+    pack_id: str
+    root: Any
+    rules_index_rel: str
+    origin: str
+    rules_version: str | None = None
+
+
+def _resolve_pack_entries(
     *,
     pack_root: Any,
     rules_index_rel: str,
-    source_label: str,
     origin: str,
-    sha_check: str,
-) -> list[RuleDoc]:
+    rules_version: str | None = None,
+) -> list[_DocEntry]:
     idx_path = pack_root / rules_index_rel
     try:
         idx_raw = idx_path.read_text(encoding="utf-8")
@@ -101,67 +244,304 @@ def _load_pack_from_root(
         idx = json.loads(idx_raw)
     except Exception as e:
         raise RulesLoadError(f"Invalid rules index JSON: {origin}:{rules_index_rel}: {e}")
+    if not isinstance(idx, dict):
+        raise RulesLoadError(f"rules_index.json must be an object: {origin}:{rules_index_rel}")
+
+    base_dir = idx_path.parent
+    index_dir = Path(rules_index_rel).parent
+
+    versions = idx.get("versions")
+    if versions is not None:
+        # v2 index: every version folder is listed, so the folder is known up
+        # front and no per-file probing is needed.
+        if not isinstance(versions, dict):
+            raise RulesLoadError(f"rules_index.json 'versions' must be an object: {origin}:{rules_index_rel}")
+        ver = rules_version or idx.get("default_version") or idx.get("rules_version")
+        if not isinstance(ver, str) or ver not in versions:
+            raise RulesLoadError(
+                f"Rules version {ver!r} not found in {origin}:{rules_index_rel} "
+                f"(available: {sorted(versions)})"
+            )
+        ver_ent = versions[ver]
+        if not isinstance(ver_ent, dict):
+            raise RulesLoadError(
+                f"rules_index.json version {ver!r} must be an object: {origin}:{rules_index_rel}: {ver_ent!r}"
+            )
+        files = ver_ent.get("files")
+        if not isinstance(files, list):
+            raise RulesLoadError(f"rules_index.json version {ver!r} missing 'files' list: {origin}:{rules_index_rel}")
+        return [
+            _DocEntry(
+                md_path=base_dir / ver / name,
+                relpath=str(index_dir / ver / name),
+                expected_sha=ent.get("sha256"),
+                **_entry_priorities(ent, origin=origin, rules_index_rel=rules_index_rel),
+            )
+            for name, ent in _iter_index_files(files, origin=origin, rules_index_rel=rules_index_rel)
+        ]
 
     files = idx.get("files")
     if not isinstance(files, list):
         raise RulesLoadError(f"rules_index.json missing 'files' list: {origin}:{rules_index_rel}")
 
-    base_dir = idx_path.parent
-    rules_version = idx.get("rules_version") or idx.get("driver_version")
-    docs: list[RuleDoc] = []
+    index_version = idx.get("rules_version") or idx.get("driver_version")
+    if rules_version and rules_version != index_version:
+        raise RulesLoadError(
+            f"Rules version {rules_version!r} requested but {origin}:{rules_index_rel} "
+            f"only describes {index_version!r}"
+        )
 
-    for ent in files:
-        if not isinstance(ent, dict) or "name" not in ent:
-            raise RulesLoadError(f"Invalid file entry in rules index: {origin}:{rules_index_rel}: {ent!r}")
-        name = ent["name"]
-        expected_sha = ent.get("sha256")
+    entries: list[_DocEntry] = []
 
+    for name, ent in _iter_index_files(files, origin=origin, rules_index_rel=rules_index_rel):
         # Some packs store docs in a versioned subdirectory (e.g. rules/0.5.0/*.md)
         # while keeping rules_index.json at rules/rules_index.json.
         md_path = base_dir / name
-        relpath = Path(rules_index_rel).parent / name
-        if rules_version:
-            candidate = base_dir / str(rules_version) / name
+        relpath = index_dir / name
+        if index_version:
+            candidate = base_dir / str(index_version) / name
             if getattr(candidate, "exists", None) and candidate.exists():
                 md_path = candidate
-                relpath = Path(rules_index_rel).parent / str(rules_version) / name
+                relpath = index_dir / str(index_version) / name
+
+        entries.append(
+            _DocEntry(
+                md_path=md_path,
+                relpath=str(relpath),
+                expected_sha=ent.get("sha256"),
+                **_entry_priorities(ent, origin=origin, rules_index_rel=rules_index_rel),
+            )
+        )
+
+    return entries
+
+
+def _iter_index_files(files: list[Any], *, origin: str, rules_index_rel: str) -> Iterator[tuple[str, dict[str, Any]]]:
+    for ent in files:
+        if not isinstance(ent, dict) or "name" not in ent:
+            raise RulesLoadError(f"Invalid file entry in rules index: {origin}:{rules_index_rel}: {ent!r}")
+        yield ent["name"], ent
 
+
+def _entry_priorities(ent: dict[str, Any], *, origin: str, rules_index_rel: str) -> dict[str, Any]:
+    # Optional per-file keys: "priority": int and "section_priorities": {heading: int}.
+    priority = ent.get("priority", DEFAULT_PRIORITY)
+    if not isinstance(priority, int) or isinstance(priority, bool):
+        raise RulesLoadError(f"Invalid priority for {ent['name']!r} in rules index: {origin}:{rules_index_rel}: {priority!r}")
+
+    raw = ent.get("section_priorities") or {}
+    if not isinstance(raw, dict) or not all(
+        isinstance(k, str) and isinstance(v, int) and not isinstance(v, bool) for k, v in raw.items()
+    ):
+        raise RulesLoadError(
+            f"Invalid section_priorities for {ent['name']!r} in rules index: {origin}:{rules_index_rel}: {raw!r}"
+        )
+    return {"priority": priority, "section_priorities": tuple(sorted(raw.items()))}
+
+
+_HEAD_CHUNK = 4096
+
+
+def _read_body(entry: _DocEntry, origin: str) -> tuple[str, str]:
+    try:
+        md_bytes = entry.md_path.read_bytes()
+    except Exception as e:
+        raise RulesLoadError(f"Failed to read rule doc: {origin}:{entry.md_path}: {e}")
+    return hashlib.sha256(md_bytes).hexdigest(), md_bytes.decode("utf-8")
+
+
+def _read_frontmatter(entry: _DocEntry, origin: str) -> tuple[str | None, str | None]:
+    # Reads only as far as _parse_frontmatter looks: up to the closing '\n---'
+    # of a frontmatter block, or the first non-blank text when there is none.
+    # Docs with an unterminated block are read to the end, as the parser would.
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    text = ""
+    try:
+        with entry.md_path.open("rb") as f:
+            while True:
+                chunk = f.read(_HEAD_CHUNK)
+                text += decoder.decode(chunk, final=not chunk)
+                if not chunk:
+                    break
+                head = text.lstrip("\ufeff").lstrip()
+                if len(head) >= 3 and not head.startswith("---"):
+                    break
+                if head.find("\n---", 3) != -1:
+                    break
+    except Exception as e:
+        raise RulesLoadError(f"Failed to read rule doc: {origin}:{entry.md_path}: {e}")
+    return _parse_frontmatter(text)
+
+
+def _read_doc(
+    entry: _DocEntry,
+    origin: str,
+    cache: RuleDocCache | None = None,
+    *,
+    lazy: bool = False,
+) -> _LoadedDoc:
+    # Pure I/O + CPU work with no shared state (the cache locks itself), so it is
+    # safe to run on worker threads.
+    st = None
+    if cache is not None and isinstance(entry.md_path, Path):
         try:
-            md_bytes = md_path.read_bytes()
-        except Exception as e:
-            raise RulesLoadError(f"Failed to read rule doc: {origin}:{md_path}: {e}")
-
-        actual_sha = hashlib.sha256(md_bytes).hexdigest()
-        md = md_bytes.decode("utf-8")
-        if expected_sha and expected_sha != actual_sha:
-            if sha_check not in _SHA_CHECK_MODES:
-                raise RulesLoadError(
-                    f"Invalid sha_check mode: {sha_check!r} (expected one of: {sorted(_SHA_CHECK_MODES)})"
-                )
+            st = entry.md_path.stat()
+        except OSError:
+            st = None  # let the read below report the error
+        else:
+            if lazy:
+                meta = cache.get_meta(str(entry.md_path), st.st_size, st.st_mtime_ns)
+                if meta is not None:
+                    return _LoadedDoc(sha256=meta[0], content=None, doc_id=meta[1], title=meta[2])
+            else:
+                hit = cache.get(str(entry.md_path), st.st_size, st.st_mtime_ns)
+                if hit is not None:
+                    return _LoadedDoc(sha256=hit.sha256, content=hit.content, doc_id=hit.doc_id, title=hit.title)
+
+    if lazy:
+        doc_id, title = _read_frontmatter(entry, origin)
+        return _LoadedDoc(sha256=None, content=None, doc_id=doc_id, title=title)
+
+    sha, md = _read_body(entry, origin)
+    doc_id, title = _parse_frontmatter(md)
+    loaded = _LoadedDoc(sha256=sha, content=md, doc_id=doc_id, title=title)
+
+    if cache is not None and st is not None:
+        # Keyed by the stat taken *before* the read: if the file changed in
+        # between, the next run sees a new signature and simply misses.
+        cache.put(
+            str(entry.md_path),
+            st.st_size,
+            st.st_mtime_ns,
+            CachedDoc(sha256=loaded.sha256, content=loaded.content, doc_id=loaded.doc_id, title=loaded.title),
+        )
+    return loaded
 
-            msg = (
-                "Rule doc sha256 mismatch: "
-                f"{origin}:{md_path} expected={expected_sha} actual={actual_sha}"
-            )
-            if sha_check == "error":
-                raise RulesLoadError(msg)
-            if sha_check == "warn":
-                warnings.warn(msg)
 
-        doc_id, title = _parse_frontmatter(md)
-        docs.append(
-            RuleDoc(
-                source=source_label,
-                origin=origin,
-                relpath=str(relpath),
-                sha256=actual_sha,
-                content=md,
-                doc_id=doc_id,
-                title=title,
+def _check_sha(entry: _DocEntry, actual_sha: str, *, origin: str, sha_check: str) -> None:
+    expected_sha = entry.expected_sha
+    if expected_sha and expected_sha != actual_sha:
+        if sha_check not in _SHA_CHECK_MODES:
+            raise RulesLoadError(
+                f"Invalid sha_check mode: {sha_check!r} (expected one of: {sorted(_SHA_CHECK_MODES)})"
             )
+
+        msg = (
+            "Rule doc sha256 mismatch: "
+            f"{origin}:{entry.md_path} expected={expected_sha} actual={actual_sha}"
         )
+        if sha_check == "error":
+            raise RulesLoadError(msg)
+        if sha_check == "warn":
+            warnings.warn(msg)
+
+
+def _finish_doc(
+    entry: _DocEntry,
+    loaded: _LoadedDoc,
+    *,
+    source_label: str,
+    origin: str,
+    sha_check: str,
+    interned: dict[str, str] | None = None,
+) -> RuleDoc:
+    # Runs on the calling thread, in index order, so warnings stay deterministic.
+    if loaded.content is None:
+        return _lazy_doc(
+            entry,
+            loaded,
+            source_label=source_label,
+            origin=origin,
+            sha_check=sha_check,
+            interned=interned,
+        )
+
+    actual_sha = loaded.sha256
+    assert actual_sha is not None
+    _check_sha(entry, actual_sha, origin=origin, sha_check=sha_check)
+
+    content = loaded.content
+    if interned is not None:
+        # Byte-identical docs (same file in several versions/packs) share one string.
+        content = interned.setdefault(actual_sha, content)
+
+    return RuleDoc(
+        source=source_label,
+        origin=origin,
+        relpath=entry.relpath,
+        sha256=actual_sha,
+        content=content,
+        doc_id=loaded.doc_id,
+        title=loaded.title,
+        priority=entry.priority,
+        section_priorities=entry.section_priorities,
+    )
+
+
+def _lazy_doc(
+    entry: _DocEntry,
+    loaded: _LoadedDoc,
+    *,
+    source_label: str,
+    origin: str,
+    sha_check: str,
+    interned: dict[str, str] | None,
+) -> LazyRuleDoc:
+    known_sha = loaded.sha256
+    if known_sha is not None:
+        # From the cache: checkable now, without touching the body.
+        _check_sha(entry, known_sha, origin=origin, sha_check=sha_check)
+
+    def load() -> tuple[str, str]:
+        sha, content = _read_body(entry, origin)
+        if known_sha is None:
+            _check_sha(entry, sha, origin=origin, sha_check=sha_check)
+        if interned is not None:
+            content = interned.setdefault(sha, content)
+        return sha, content
+
+    return LazyRuleDoc(
+        source=source_label,
+        origin=origin,
+        relpath=entry.relpath,
+        loader=load,
+        sha256=known_sha,
+        doc_id=loaded.doc_id,
+        title=loaded.title,
+        priority=entry.priority,
+        section_priorities=entry.section_priorities,
+    )
 
-    return docs
+
+def _load_pack_from_root(
+    *,
+    pack_root: Any,
+    rules_index_rel: str,
+    source_label: str,
+    origin: str,
+    sha_check: str,
+    cache: RuleDocCache | None = None,
+    rules_version: str | None = None,
+    interned: dict[str, str] | None = None,
+    lazy: bool = False,
+) -> list[RuleDoc]:
+    entries = _resolve_pack_entries(
+        pack_root=pack_root,
+        rules_index_rel=rules_index_rel,
+        origin=origin,
+        rules_version=rules_version,
+    )
+    return [
+        _finish_doc(
+            e,
+            _read_doc(e, origin, cache, lazy=lazy),
+            source_label=source_label,
+            origin=origin,
+            sha_check=sha_check,
+            interned=interned,
+        )
+        for e in entries
+    ]
 
 
 def _deep_merge_dict(base: dict[str, Any], override: dict[str, Any]) -> dict[str, Any]:
@@ -232,19 +612,15 @@ def load_registry(registry_path: Path, registry_local_path: Path | None = None)
     return {"packs": merged}
 
 
-def build_llm_context(*, registry_path: Path, sha_check: str = "off") -> list[RuleDoc]:
-    """Build a deterministic list of rule documents for LLM context.
-
-    The registry is type-agnostic: it is a list of independently enabled "packs".
-    Each pack may contain only rules (docs) or rules + python code.
-    """
-
+def _iter_pack_sources(
+    registry_path: Path,
+    rules_versions: dict[str, str] | None = None,
+) -> Iterator[_PackSource]:
     reg = load_registry(registry_path)
     packs = reg.get("packs")
     if not isinstance(packs, list):
         raise RulesLoadError("Registry missing 'packs' list")
 
-    out: list[RuleDoc] = []
     seen_ids: set[str] = set()
 
     for pack in packs:
@@ -273,19 +649,21 @@ def build_llm_context(*, registry_path: Path, sha_check: str = "off") -> list[Ru
         if not isinstance(src, dict) or "type" not in src:
             raise RulesLoadError(f"Enabled pack {pack_id!r} missing rules.source")
 
+        # Caller overrides win over the registry's optional rules.version pin.
+        rules_version = (rules_versions or {}).get(pack_id) or rules.get("version")
+        if rules_version is not None and (not isinstance(rules_version, str) or not rules_version):
+            raise RulesLoadError(f"Pack {pack_id!r} has invalid rules.version: {rules_version!r}")
+
         if src["type"] == "package":
             pkg = src.get("name")
             if not isinstance(pkg, str) or not pkg:
                 raise RulesLoadError(f"Pack {pack_id!r} has invalid package name")
-            root = _resource_base_for_package(pkg)
-            out.extend(
-                _load_pack_from_root(
-                    pack_root=root,
-                    rules_index_rel=rules_index_rel,
-                    source_label=f"pack:{pack_id}",
-                    origin=pkg,
-                    sha_check=sha_check,
-                )
+            yield _PackSource(
+                pack_id=pack_id,
+                root=_resource_base_for_package(pkg),
+                rules_index_rel=rules_index_rel,
+                origin=pkg,
+                rules_version=rules_version,
             )
         elif src["type"] == "path":
             p = src.get("path")
@@ -294,18 +672,243 @@ def build_llm_context(*, registry_path: Path, sha_check: str = "off") -> list[Ru
             root = Path(p)
             if not root.is_absolute():
                 root = registry_path.parent / root
-            out.extend(
-                _load_pack_from_root(
-                    pack_root=root,
-                    rules_index_rel=rules_index_rel,
-                    source_label=f"pack:{pack_id}",
-                    origin=str(root),
-                    sha_check=sha_check,
-                )
+            yield _PackSource(
+                pack_id=pack_id,
+                root=root,
+                rules_index_rel=rules_index_rel,
+                origin=str(root),
+                rules_version=rules_version,
             )
         else:
             raise RulesLoadError(f"Unsupported pack source type: {src['type']!r}")
 
+    unknown = sorted(set(rules_versions or {}) - seen_ids)
+    if unknown:
+        raise RulesLoadError(f"Rules version requested for unknown pack(s): {unknown}")
+
+
+def _load_packs_concurrently(
+    sources: list[_PackSource],
+    *,
+    sha_check: str,
+    executor: concurrent.futures.Executor,
+    cache: RuleDocCache | None = None,
+    lazy: bool = False,
+) -> list[RuleDoc]:
+    # Phase 1: read every pack's rules_index.json in parallel.
+    resolved = [
+        executor.submit(
+            _resolve_pack_entries,
+            pack_root=s.root,
+            rules_index_rel=s.rules_index_rel,
+            origin=s.origin,
+            rules_version=s.rules_version,
+        )
+        for s in sources
+    ]
+
+    # Phase 2: read + hash + parse every doc of every pack in one flat batch so a
+    # large pack cannot starve the pool while small packs wait behind it. A bad
+    # index is only raised once the docs of the packs before it loaded cleanly,
+    # so the error matches the serial path's.
+    flat: list[tuple[_PackSource, _DocEntry]] = []
+    index_error: Exception | None = None
+    for s, fut in zip(sources, resolved):
+        try:
+            entries = fut.result()
+        except Exception as e:
+            index_error = e
+            break
+        flat.extend((s, e) for e in entries)
+    loaded = executor.map(lambda se: _read_doc(se[1], se[0].origin, cache, lazy=lazy), flat)
+
+    interned: dict[str, str] = {}
+    docs = [
+        _finish_doc(
+            e,
+            ld,
+            source_label=f"pack:{s.pack_id}",
+            origin=s.origin,
+            sha_check=sha_check,
+            interned=interned,
+        )
+        for (s, e), ld in zip(flat, loaded)
+    ]
+    if index_error is not None:
+        raise index_error
+    return docs
+
+
+def fit_to_budget(docs: Sequence[RuleDoc], max_tokens: int) -> list[RuleDoc]:
+    """Keep the docs, or "## " sections of docs, that fit in ``max_tokens``.
+
+    Every doc is cut into a head (frontmatter, title and intro up to the first
+    "## " heading) and its "## " sections. Sections are packed greedily across
+    all docs in ``(priority, doc position, section position)`` order, where a
+    section's priority is its ``section_priorities`` entry or else the doc's
+    ``priority``. A section that does not fit is skipped and smaller ones are
+    still tried. The first section taken from a doc also pays for its head.
+    Docs without sections are packed whole.
+
+    Docs keep their original order. A doc with every section kept is returned
+    unchanged. A trimmed doc is a plain ``RuleDoc`` with ``sections`` set to
+    the kept headings and ``sha256`` of the trimmed content. Docs with nothing
+    kept are dropped. The result depends only on the input.
+    """
+    if max_tokens < 0:
+        raise RulesLoadError(f"max_tokens must be >= 0 (got {max_tokens})")
+    if sum(d.n_tokens for d in docs) <= max_tokens:
+        return list(docs)
+
+    # (priority, doc index, section index, tokens)
+    units: list[tuple[int, int, int, int]] = []
+    heads: dict[int, int] = {}  # doc index -> head end offset
+    parts: dict[int, list[tuple[str | None, int, int]]] = {}  # doc index -> (heading, start, end)
+    for i, d in enumerate(docs):
+        text = d.content
+        secs = split_sections(text, level=2)
+        first = next((k for k, sec in enumerate(secs) if sec.level == 2), len(secs))
+        if first == len(secs):
+            heads[i] = len(text)
+            parts[i] = []
+            units.append((d.priority, i, -1, d.n_tokens))
+            continue
+        heads[i] = secs[first].start
+        parts[i] = [(sec.heading, sec.start, sec.end) for sec in secs[first:]]
+        overrides = dict(d.section_priorities)
+        for k, (heading, start, end) in enumerate(parts[i]):
+            units.append((overrides.get(heading or "", d.priority), i, k, estimate_tokens(text[start:end])))
+
+    remaining = max_tokens
+    kept: dict[int, list[int]] = {}
+    for _prio, i, k, tokens in sorted(units):
+        cost = tokens
+        if i not in kept and k >= 0:
+            cost += estimate_tokens(docs[i].content[: heads[i]])
+        if cost > remaining:
+            continue
+        remaining -= cost
+        kept.setdefault(i, []).append(k)
+
+    out: list[RuleDoc] = []
+    for i in sorted(kept):
+        d = docs[i]
+        ks = sorted(kept[i])
+        if ks == [-1] or len(ks) == len(parts[i]):
+            out.append(d)
+            continue
+        text = d.content
+        content = text[: heads[i]] + "".join(text[parts[i][k][1] : parts[i][k][2]] for k in ks)
+        out.append(
+            RuleDoc(
+                source=d.source,
+                origin=d.origin,
+                relpath=d.relpath,
+                sha256=hashlib.sha256(content.encode("utf-8")).hexdigest(),
+                content=content,
+                doc_id=d.doc_id,
+                title=d.title,
+                priority=d.priority,
+                section_priorities=d.section_priorities,
+                sections=tuple(parts[i][k][0] or "" for k in ks),
+            )
+        )
+    return out
+
+
+def build_llm_context(
+    *,
+    registry_path: Path,
+    sha_check: str = "off",
+    workers: int | None = None,
+    cache_path: Path | None = None,
+    cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    rules_versions: dict[str, str] | None = None,
+    lazy: bool = False,
+    max_tokens: int | None = None,
+) -> list[RuleDoc]:
+    """Build a deterministic list of rule documents for LLM context.
+
+    The registry is type-agnostic: it is a list of independently enabled "packs".
+    Each pack may contain only rules (docs) or rules + python code.
+
+    ``workers`` enables concurrent loading: rules indexes and docs are read,
+    hashed and parsed on a bounded thread pool (``0`` lets the pool pick its
+    own size). The returned list is identical to the serial path.
+
+    ``cache_path`` enables a persistent SQLite cache (see ``RuleDocCache``):
+    docs whose ``(path, size, mtime_ns)`` did not change are served from it
+    without being read, hashed or parsed again.
+
+    ``rules_versions`` maps pack id -> rules version folder to load, overriding
+    the pack's ``rules.version`` and the index's ``default_version``.
+
+    Docs with the same sha256 share a single ``content`` string object.
+
+    ``lazy`` returns ``LazyRuleDoc`` objects: only each doc's frontmatter is
+    read here, the body is read, hashed and sha-checked on first access to
+    ``content``/``sha256``. Suits metadata-only work (listing, filtering).
+
+    ``max_tokens`` trims the result to an estimated token budget, packing by
+    the ``priority``/``section_priorities`` declared in each pack's rules
+    index (see ``fit_to_budget``).
+    """
+
+    if workers is not None and workers < 0:
+        raise RulesLoadError(f"workers must be >= 0 (got {workers})")
+    if max_tokens is not None and max_tokens < 0:
+        raise RulesLoadError(f"max_tokens must be >= 0 (got {max_tokens})")
+
+    with contextlib.ExitStack() as stack:
+        cache: RuleDocCache | None = None
+        if cache_path is not None:
+            cache = stack.enter_context(RuleDocCache(cache_path, max_bytes=cache_max_bytes))
+
+        out: list[RuleDoc] = []
+        if workers is None or workers == 1:
+            interned: dict[str, str] = {}
+            for s in _iter_pack_sources(registry_path, rules_versions):
+                out.extend(
+                    _load_pack_from_root(
+                        pack_root=s.root,
+                        rules_index_rel=s.rules_index_rel,
+                        source_label=f"pack:{s.pack_id}",
+                        origin=s.origin,
+                        sha_check=sha_check,
+                        cache=cache,
+                        rules_version=s.rules_version,
+                        interned=interned,
+                        lazy=lazy,
+                    )
+                )
+        else:
+            # The serial path loads each pack before validating the next registry
+            # entry, so a registry error only wins once the packs before it loaded.
+            sources: list[_PackSource] = []
+            registry_error: RulesLoadError | None = None
+            try:
+                for s in _iter_pack_sources(registry_path, rules_versions):
+                    sources.append(s)
+            except RulesLoadError as e:
+                registry_error = e
+            executor = stack.enter_context(concurrent.futures.ThreadPoolExecutor(max_workers=workers or None))
+            out = _load_packs_concurrently(sources, sha_check=sha_check, executor=executor, cache=cache, lazy=lazy)
+            if registry_error is not None:
+                raise registry_error
+
+    if max_tokens is not None:
+        out = fit_to_budget(out, max_tokens)
+    return out
+
+
+def parse_rules_version_args(values: list[str]) -> dict[str, str]:
+    """Parse repeated ``PACK=VERSION`` CLI values into a pack id -> version map."""
+    out: dict[str, str] = {}
+    for v in values:
+        pack_id, sep, ver = v.partition("=")
+        if not sep or not pack_id.strip() or not ver.strip():
+            raise RulesLoadError(f"Invalid rules version selector (expected PACK=VERSION): {v!r}")
+        out[pack_id.strip()] = ver.strip()
     return out
 
 
@@ -314,6 +917,44 @@ def _default_registry_path() -> Path:
     return Path.cwd() / "drivers_registry.json"
 
 
+def _sections_main(args: argparse.Namespace) -> int:
+    try:
+        hits = query_sections(
+            Path(args.rules_dir),
+            doc_id=args.doc_id,
+            heading=args.heading,
+            include_subsections=not args.no_subsections,
+        )
+    except SectionIndexError as e:
+        raise SystemExit(f"Error: {e}")
+
+    for h in hits:
+        if args.list:
+            print(f"{h.doc_id or '(no doc_id)'}: {' > '.join(h.heading_path) or '(whole doc)'} [{h.filename}:{h.start}-{h.end}]")
+        else:
+            print(h.text, end="" if h.text.endswith("\n") else "\n")
+    return 0 if hits else 1
+
+
+def _search_main(args: argparse.Namespace) -> int:
+    try:
+        hits = search(
+            Path(args.rules_dir),
+            " ".join(args.query),
+            limit=args.limit,
+            doc_id=args.doc_id,
+            with_text=args.text,
+        )
+    except SectionIndexError as e:
+        raise SystemExit(f"Error: {e}")
+
+    for h in hits:
+        print(f"{h.score:8.3f}  {h.doc_id or '(no doc_id)'}: {' > '.join(h.heading_path) or '(preamble)'} [{h.filename}:{h.start}-{h.end}]")
+        if h.text is not None:
+            print(h.text, end="" if h.text.endswith("\n") else "\n")
+    return 0 if hits else 1
+
+
 def main(argv: list[str] | None = None) -> int:
     ap = argparse.ArgumentParser(description="Load driver rule packs for LLM context")
     ap.add_argument(
@@ -333,17 +974,78 @@ def main(argv: list[str] | None = None) -> int:
         default="off",
         help="Rule doc sha256 verification mode (default: off)",
     )
+    ap.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Load packs and docs on N worker threads (default: 1 = serial, 0 = auto)",
+    )
+    ap.add_argument(
+        "--cache",
+        type=str,
+        default=None,
+        help="Persistent rule doc cache file (SQLite); unchanged docs skip read/hash/parse (default: disabled)",
+    )
+
+    ap.add_argument(
+        "--rules-version",
+        action="append",
+        default=[],
+        metavar="PACK=VERSION",
+        help="Load a specific rules version for a pack (repeatable)",
+    )
+    ap.add_argument(
+        "--max-tokens",
+        type=int,
+        default=None,
+        help="Trim docs (or their '## ' sections) by index priority to fit an estimated token budget",
+    )
+
+    sub = ap.add_subparsers(dest="command")
+    sp = sub.add_parser("sections", help="Print sections of collected rules (uses <rules_dir>/sections.json)")
+    sp.add_argument("rules_dir", help="Collected rules folder (e.g. output/config/rules)")
+    sp.add_argument("--doc-id", default=None, help="Only this doc_id")
+    sp.add_argument("--heading", default=None, help="Sections whose heading contains this text (case-insensitive)")
+    sp.add_argument("--no-subsections", action="store_true", help="Stop each section at its first subheading")
+    sp.add_argument("--list", action="store_true", help="List matching sections instead of printing them")
+
+    sp = sub.add_parser("search", help="Ranked full-text search over collected rules (uses <rules_dir>/search_index.json)")
+    sp.add_argument("rules_dir", help="Collected rules folder (e.g. output/config/rules)")
+    sp.add_argument("query", nargs="+", help="Search terms")
+    sp.add_argument("--limit", type=int, default=10, help="Maximum number of sections (default: 10)")
+    sp.add_argument("--doc-id", default=None, help="Only search this doc_id")
+    sp.add_argument("--text", action="store_true", help="Also print each matching section")
 
     args = ap.parse_args(argv)
-    docs = build_llm_context(registry_path=Path(args.registry), sha_check=str(args.sha_check))
+    if args.command == "sections":
+        return _sections_main(args)
+    if args.command == "search":
+        return _search_main(args)
+
+    docs = build_llm_context(
+        registry_path=Path(args.registry),
+        sha_check=str(args.sha_check),
+        workers=int(args.jobs),
+        cache_path=Path(args.cache) if args.cache else None,
+        rules_versions=parse_rules_version_args(args.rules_version),
+        # --dump only prints frontmatter fields, so skip reading the bodies
+        # unless they have to be hashed for --sha-check.
+        lazy=bool(args.dump) and args.max_tokens is None and args.sha_check == "off",
+        max_tokens=args.max_tokens,
+    )
 
     if args.dump:
         for d in docs:
             ident = d.doc_id or "(no doc_id)"
             title = d.title or "(no title)"
             print(f"{d.source}: {ident} — {title} ({d.origin}:{d.relpath})")
+            if d.sections is not None:
+                print(f"  trimmed to: {', '.join(d.sections)}")
         return 0
 
+    if args.max_tokens is not None:
+        print(f"Loaded {len(docs)} documents (~{sum(d.n_tokens for d in docs)} tokens)")
+        return 0
     print(f"Loaded {len(docs)} documents")
     return 0
 
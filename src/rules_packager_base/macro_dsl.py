@@ -0,0 +1,893 @@
+"""
+Compile-time macro DSL for authored test procedures.
+
+Implements the procedure macro layer of ``test_rules_llm_ready.md`` (section 5A)
+and the range shorthands of section 5:
+
+- ``@LET NAME = EXPR``
+- ``@TABLE NAME`` / ``@ROW NAME key=value ...`` / ``@ENDTABLE``
+- ``@FOR i, row IN TABLE`` and ``@FOR i IN A..B`` (inclusive, 0-based index) / ``@ENDFOR``
+- ``@IF EXPR`` / ``@ELSE`` / ``@ENDIF``
+- ``@ALLOC BASE = K`` and ``@ALLOC BASE START=S COUNT=K``
+- ``${EXPR}`` substitution, ``COUNT(TABLE)``, ``{ID_EXPR}`` measurement IDs
+- ``TOKEN[A..B]`` and ``{A..B}`` range shorthands (zipped when both appear)
+
+Usage:
+
+    from rules_packager_base.macro_dsl import expand_procedure
+
+    proc = expand_procedure(test_steps_text, success_conditions_text)
+    for line in proc.steps:
+        print(line.text)
+
+Sources are parsed once into an AST (cached by source text) and expansion
+costs time linear in the size of the expanded procedure.
+"""
+
+from __future__ import annotations
+
+import bisect
+import collections
+import dataclasses
+import functools
+import re
+from typing import Any, Callable
+
+
+class MacroError(ValueError):
+    """A procedure violates the macro DSL rules; ``line`` is 1-based in its section."""
+
+    def __init__(self, message: str, line: int | None = None, section: str | None = None) -> None:
+        self.message = message
+        self.line = line
+        self.section = section
+        where = ""
+        if section is not None:
+            where += f"{section} "
+        if line is not None:
+            where += f"line {line}"
+        super().__init__(f"{where.strip()}: {message}" if where else message)
+
+
+@dataclasses.dataclass(frozen=True)
+class ExpandedLine:
+    text: str
+    source_line: int  # 1-based line of the authored section this came from
+    ids: tuple[int, ...] = ()  # measurement IDs on this line, in order
+
+
+@dataclasses.dataclass(frozen=True)
+class Allocation:
+    name: str
+    start: int
+    count: int
+
+    @property
+    def end(self) -> int:
+        """Last reserved ID (inclusive)."""
+        return self.start + self.count - 1
+
+
+@dataclasses.dataclass(frozen=True)
+class ExpandedProcedure:
+    steps: tuple[ExpandedLine, ...]
+    conditions: tuple[ExpandedLine, ...]
+    measurement_ids: tuple[int, ...]  # introduced by "as {ID}" in the steps, in order
+    allocations: tuple[Allocation, ...]
+
+
+# ---------------------------------------------------------------------------
+# Expressions
+# ---------------------------------------------------------------------------
+
+_NAME = r"[A-Za-z_][A-Za-z0-9_]*"
+_NAME_RE = re.compile(_NAME)
+_KEYWORDS = frozenset({"AND", "OR", "NOT", "IN", "COUNT"})
+
+_EXPR_TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<num>(?:\d+\.\d*|\.\d+)(?:[eE][+-]?\d+)?|\d+(?:[eE][+-]?\d+)?)
+      | (?P<str>"(?:[^"\\]|\\.)*")
+      | (?P<name>""" + _NAME + r"""(?:\.""" + _NAME + r""")?)
+      | (?P<op>==|!=|<=|>=|[-+*/%()<>=])
+    )""",
+    re.X,
+)
+
+Env = collections.ChainMap
+
+
+@dataclasses.dataclass(frozen=True)
+class _Table:
+    name: str
+    rows: tuple[dict[str, Any], ...]
+
+
+@dataclasses.dataclass(frozen=True)
+class _Expr:
+    src: str
+    fn: Callable[[Env], Any]
+    names: frozenset[str]  # root names referenced (row.key -> row)
+    bare_name: str | None = None  # set when the expression is a single plain name
+
+    def __call__(self, env: Env) -> Any:
+        return self.fn(env)
+
+
+def _unquote(tok: str) -> str:
+    return re.sub(r"\\(.)", r"\1", tok[1:-1])
+
+
+def _number(tok: str) -> int | float:
+    return float(tok) if any(c in tok for c in ".eE") else int(tok)
+
+
+def _is_num(v: Any) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _lookup(env: Env, name: str) -> Any:
+    root, _, key = name.partition(".")
+    try:
+        v = env[root]
+    except KeyError:
+        raise MacroError(f"Unknown variable: {root!r}")
+    if key:
+        if not isinstance(v, dict):
+            raise MacroError(f"{root!r} is not a table row (in {name!r})")
+        if key not in v:
+            raise MacroError(f"Row {root!r} has no field {key!r}")
+        return v[key]
+    if isinstance(v, _Table):
+        raise MacroError(f"Table {root!r} can only be used in COUNT() or @FOR")
+    return v
+
+
+def _arith(op: str, a: Any, b: Any) -> Any:
+    if not (_is_num(a) and _is_num(b)):
+        raise MacroError(f"Operator {op!r} needs numbers (got {a!r} and {b!r})")
+    if op == "+":
+        return a + b
+    if op == "-":
+        return a - b
+    if op == "*":
+        return a * b
+    if b == 0:
+        raise MacroError(f"Division by zero ({a!r} {op} {b!r})")
+    if op == "%":
+        return a % b
+    q = a / b
+    # Exact integer division stays an integer so it can be used as an ID.
+    return int(q) if isinstance(a, int) and isinstance(b, int) and a % b == 0 else q
+
+
+_CMP: dict[str, Callable[[Any, Any], bool]] = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+def _compare(op: str, a: Any, b: Any) -> bool:
+    if op in ("==", "!="):
+        return _CMP[op](a, b)
+    if (_is_num(a) and _is_num(b)) or (isinstance(a, str) and isinstance(b, str)):
+        return _CMP[op](a, b)
+    raise MacroError(f"Cannot compare {a!r} {op} {b!r}")
+
+
+class _ExprParser:
+    """Recursive-descent parser; compiles straight to closures."""
+
+    def __init__(self, src: str) -> None:
+        self.src = src
+        self.toks: list[tuple[str, str]] = []
+        pos = 0
+        src_r = src.rstrip()
+        while pos < len(src_r):
+            m = _EXPR_TOKEN_RE.match(src_r, pos)
+            if not m or m.end() == pos:
+                raise MacroError(f"Invalid expression: {src.strip()!r}")
+            kind = m.lastgroup
+            assert kind is not None
+            self.toks.append((kind, m.group(kind)))
+            pos = m.end()
+        self.i = 0
+        self.names: set[str] = set()
+
+    def peek(self) -> tuple[str, str] | None:
+        return self.toks[self.i] if self.i < len(self.toks) else None
+
+    def take(self) -> tuple[str, str]:
+        tok = self.peek()
+        if tok is None:
+            raise MacroError(f"Unexpected end of expression: {self.src.strip()!r}")
+        self.i += 1
+        return tok
+
+    def accept(self, *values: str) -> str | None:
+        tok = self.peek()
+        if tok is not None and tok[0] in ("op", "name") and tok[1] in values:
+            self.i += 1
+            return tok[1]
+        return None
+
+    def parse(self) -> _Expr:
+        if not self.toks:
+            raise MacroError("Empty expression")
+        fn = self.or_()
+        if self.peek() is not None:
+            raise MacroError(f"Unexpected {self.peek()[1]!r} in expression: {self.src.strip()!r}")  # type: ignore[index]
+        bare = None
+        if len(self.toks) == 1 and self.toks[0][0] == "name" and "." not in self.toks[0][1]:
+            bare = self.toks[0][1]
+        return _Expr(self.src.strip(), fn, frozenset(self.names), bare)
+
+    def or_(self) -> Callable[[Env], Any]:
+        lhs = self.and_()
+        while self.accept("OR"):
+            rhs = self.and_()
+            lhs = (lambda a, b: lambda env: bool(a(env)) or bool(b(env)))(lhs, rhs)
+        return lhs
+
+    def and_(self) -> Callable[[Env], Any]:
+        lhs = self.not_()
+        while self.accept("AND"):
+            rhs = self.not_()
+            lhs = (lambda a, b: lambda env: bool(a(env)) and bool(b(env)))(lhs, rhs)
+        return lhs
+
+    def not_(self) -> Callable[[Env], Any]:
+        if self.accept("NOT"):
+            inner = self.not_()
+            return lambda env: not inner(env)
+        return self.cmp()
+
+    def cmp(self) -> Callable[[Env], Any]:
+        lhs = self.sum()
+        op = self.accept("==", "!=", "<=", ">=", "<", ">", "=")
+        if op is None:
+            return lhs
+        op = "==" if op == "=" else op
+        rhs = self.sum()
+        return lambda env: _compare(op, lhs(env), rhs(env))
+
+    def sum(self) -> Callable[[Env], Any]:
+        lhs = self.term()
+        while (op := self.accept("+", "-")) is not None:
+            rhs = self.term()
+            lhs = (lambda o, a, b: lambda env: _arith(o, a(env), b(env)))(op, lhs, rhs)
+        return lhs
+
+    def term(self) -> Callable[[Env], Any]:
+        lhs = self.unary()
+        while (op := self.accept("*", "/", "%")) is not None:
+            rhs = self.unary()
+            lhs = (lambda o, a, b: lambda env: _arith(o, a(env), b(env)))(op, lhs, rhs)
+        return lhs
+
+    def unary(self) -> Callable[[Env], Any]:
+        if self.accept("-"):
+            inner = self.unary()
+            return lambda env: _arith("-", 0, inner(env))
+        if self.accept("+"):
+            inner = self.unary()
+            return lambda env: _arith("+", 0, inner(env))
+        return self.atom()
+
+    def atom(self) -> Callable[[Env], Any]:
+        kind, val = self.take()
+        if kind == "num":
+            n = _number(val)
+            return lambda env: n
+        if kind == "str":
+            s = _unquote(val)
+            return lambda env: s
+        if kind == "op" and val == "(":
+            inner = self.or_()
+            if not self.accept(")"):
+                raise MacroError(f"Missing ')' in expression: {self.src.strip()!r}")
+            return inner
+        if kind == "name":
+            if val == "COUNT":
+                return self.count()
+            if val in _KEYWORDS:
+                raise MacroError(f"Unexpected {val!r} in expression: {self.src.strip()!r}")
+            nxt = self.peek()
+            if nxt == ("op", "("):
+                # Only COUNT() exists: anything else could not be evaluated at compile time.
+                raise MacroError(f"Unknown function {val!r} (only COUNT() is allowed)")
+            self.names.add(val.partition(".")[0])
+            return lambda env: _lookup(env, val)
+        raise MacroError(f"Unexpected {val!r} in expression: {self.src.strip()!r}")
+
+    def count(self) -> Callable[[Env], Any]:
+        if not self.accept("("):
+            raise MacroError("COUNT needs a table: COUNT(TABLE)")
+        kind, name = self.take()
+        if kind != "name" or "." in name or not self.accept(")"):
+            raise MacroError(f"COUNT needs a table name: {self.src.strip()!r}")
+        self.names.add(name)
+
+        def fn(env: Env) -> int:
+            t = env.get(name)
+            if not isinstance(t, _Table):
+                raise MacroError(f"COUNT({name}): {name!r} is not a table")
+            return len(t.rows)
+
+        return fn
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile_expr(src: str) -> _Expr:
+    return _ExprParser(src).parse()
+
+
+# ---------------------------------------------------------------------------
+# Line templates
+# ---------------------------------------------------------------------------
+
+_SEGMENT_RE = re.compile(
+    r"""\$\{(?P<subst>[^{}]*)\}
+      | (?P<placeholder>\{\{[^{}]*\}\})
+      | \{\s*(?P<ida>\d+)\s*\.\.\s*(?P<idb>\d+)\s*\}
+      | (?<=\S)\[(?P<toka>\d+)\.\.(?P<tokb>\d+)\]
+      | \{(?P<id>[^{}]*)\}
+    """,
+    re.X,
+)
+_AS_RE = re.compile(r"\bas\s*$", re.I)
+# A {...} body that was meant as an ID expression: a call, or a name/number followed by an operator.
+_EXPR_LIKE_RE = re.compile(r"\b" + _NAME + r"\s*\(|^\s*(?:" + _NAME + r"(?:\." + _NAME + r")?|\d+)\s*(?:[-+*/%<>]|[=!]=)")
+
+
+@dataclasses.dataclass(frozen=True)
+class _IdSeg:
+    expr: _Expr
+    introduces: bool  # written as "... as {ID}"
+
+
+@dataclasses.dataclass(frozen=True)
+class _RangeSeg:
+    is_id: bool
+    introduces: bool = False
+
+
+@dataclasses.dataclass(frozen=True)
+class _Template:
+    # Segments: str (literal), _Expr (${...}), _IdSeg ({ID_EXPR}), _RangeSeg.
+    segments: tuple[Any, ...]
+    range_start: tuple[int, int] | None  # (id start, token start) when the line has range shorthands
+    range_len: int
+
+
+def _compile_template(text: str) -> _Template:
+    segments: list[Any] = []
+    lit: list[str] = []
+    id_range: tuple[int, int] | None = None
+    tok_range: tuple[int, int] | None = None
+
+    def flush() -> None:
+        if lit:
+            segments.append("".join(lit))
+            lit.clear()
+
+    def preceding_text() -> str:
+        return "".join(lit) if lit else (segments[-1] if segments and isinstance(segments[-1], str) else "")
+
+    pos = 0
+    for m in _SEGMENT_RE.finditer(text):
+        lit.append(text[pos : m.start()])
+        pos = m.end()
+        kind = next(k for k in ("subst", "placeholder", "ida", "toka", "id") if m.group(k) is not None)
+        if kind == "subst":
+            flush()
+            segments.append(_compile_expr(m.group("subst")))
+        elif kind == "placeholder":
+            lit.append(m.group(0))  # {{NAME}} is inert
+        elif kind == "ida":
+            if id_range is not None:
+                raise MacroError("At most one {A..B} ID range per line")
+            a, b = int(m.group("ida")), int(m.group("idb"))
+            if a > b:
+                raise MacroError(f"Invalid ID range {{{a}..{b}}}: start > end")
+            id_range = (a, b)
+            introduces = bool(_AS_RE.search(preceding_text()))
+            flush()
+            segments.append(_RangeSeg(is_id=True, introduces=introduces))
+        elif kind == "toka":
+            if tok_range is not None:
+                raise MacroError("At most one TOKEN[A..B] range per line")
+            a, b = int(m.group("toka")), int(m.group("tokb"))
+            if a > b:
+                raise MacroError(f"Invalid token range [{a}..{b}]: start > end")
+            tok_range = (a, b)
+            flush()
+            segments.append(_RangeSeg(is_id=False))
+        else:
+            body = m.group("id")
+            introduces = bool(_AS_RE.search(preceding_text()))
+            try:
+                expr = _compile_expr(body)
+            except MacroError:
+                # "as {...}" and call/operator forms must be valid ID expressions;
+                # anything else (prose, JSON) is plain text.
+                if introduces or _EXPR_LIKE_RE.search(body):
+                    raise
+                lit.append(m.group(0))
+                continue
+            flush()
+            segments.append(_IdSeg(expr, introduces))
+    lit.append(text[pos:])
+    flush()
+
+    if id_range and tok_range and (id_range[1] - id_range[0]) != (tok_range[1] - tok_range[0]):
+        raise MacroError(
+            f"Token range [{tok_range[0]}..{tok_range[1]}] and ID range {{{id_range[0]}..{id_range[1]}}} "
+            "must have the same length"
+        )
+    rng = id_range or tok_range
+    return _Template(
+        segments=tuple(segments),
+        range_start=((id_range or (0, 0))[0], (tok_range or (0, 0))[0]) if rng else None,
+        range_len=(rng[1] - rng[0] + 1) if rng else 1,
+    )
+
+
+# ---------------------------------------------------------------------------
+# AST
+# ---------------------------------------------------------------------------
+
+
+@dataclasses.dataclass(frozen=True)
+class _Text:
+    line: int
+    template: _Template
+
+
+@dataclasses.dataclass(frozen=True)
+class _Let:
+    line: int
+    name: str
+    expr: _Expr
+
+
+@dataclasses.dataclass(frozen=True)
+class _TableDef:
+    line: int
+    table: _Table
+
+
+@dataclasses.dataclass(frozen=True)
+class _For:
+    line: int
+    index: str
+    row: str | None  # table loops only
+    table: str | None
+    start: _Expr | None  # range loops only
+    end: _Expr | None
+    body: tuple[Any, ...]
+
+
+@dataclasses.dataclass(frozen=True)
+class _If:
+    line: int
+    cond: _Expr
+    then: tuple[Any, ...]
+    orelse: tuple[Any, ...]
+
+
+@dataclasses.dataclass(frozen=True)
+class _Alloc:
+    line: int
+    name: str
+    count: _Expr
+    start: _Expr | None  # manual allocation
+
+
+@dataclasses.dataclass(frozen=True)
+class CompiledMacros:
+    """A parsed procedure section; reusable across expansions."""
+
+    body: tuple[Any, ...]
+
+
+_LET_RE = re.compile(rf"@LET\s+({_NAME})\s*=(?!=)(.+)$")
+_TABLE_RE = re.compile(rf"@TABLE\s+({_NAME})\s*$")
+_ROW_RE = re.compile(rf"@ROW\s+({_NAME})((?:\s+.*)?)$")
+_ROW_FIELD_RE = re.compile(rf'\s*({_NAME})=("(?:[^"\\]|\\.)*"|[^\s"]+)')
+_FOR_TABLE_RE = re.compile(rf"@FOR\s+({_NAME})\s*,\s*({_NAME})\s+IN\s+({_NAME})\s*$")
+_FOR_RANGE_RE = re.compile(rf"@FOR\s+({_NAME})\s+IN\s+(.+?)\.\.(.+)$")
+_IF_RE = re.compile(r"@IF\s+(.+)$")
+_ALLOC_AUTO_RE = re.compile(rf"@ALLOC\s+({_NAME})\s*=(?!=)(.+)$")
+_ALLOC_MANUAL_RE = re.compile(rf"@ALLOC\s+({_NAME})\s+START\s*=\s*(.+?)\s+COUNT\s*=\s*(.+)$")
+_DIRECTIVE_RE = re.compile(r"@([A-Za-z]+)")
+_INT_RE = re.compile(r"[+-]?\d+")
+_FLOAT_RE = re.compile(r"[+-]?(?:\d+\.\d*|\.\d+)(?:[eE][+-]?\d+)?|[+-]?\d+[eE][+-]?\d+")
+
+
+def _check_name(name: str) -> str:
+    if name in _KEYWORDS:
+        raise MacroError(f"{name!r} is a reserved word")
+    return name
+
+
+def _row_value(tok: str) -> Any:
+    if tok.startswith('"'):
+        return _unquote(tok)
+    if _INT_RE.fullmatch(tok):
+        return int(tok)
+    if _FLOAT_RE.fullmatch(tok):
+        return float(tok)
+    return tok
+
+
+def _parse_row(table: str, line: str) -> dict[str, Any]:
+    m = _ROW_RE.match(line)
+    if not m:
+        raise MacroError("Invalid @ROW (expected: @ROW TABLE key=value ...)")
+    if m.group(1) != table:
+        raise MacroError(f"@ROW {m.group(1)} inside @TABLE {table}")
+    rest = m.group(2)
+    row: dict[str, Any] = {}
+    pos = 0
+    while pos < len(rest.rstrip()):
+        f = _ROW_FIELD_RE.match(rest, pos)
+        if not f:
+            raise MacroError(f"Invalid @ROW field near {rest[pos:].strip()!r}")
+        key = f.group(1)
+        if key in row:
+            raise MacroError(f"Duplicate key {key!r} in @ROW")
+        row[key] = _row_value(f.group(2))
+        pos = f.end()
+    if not row:
+        raise MacroError("@ROW needs at least one key=value")
+    return row
+
+
+def _parse(source: str) -> CompiledMacros:
+    # Open @FOR/@IF blocks; each frame remembers the body it will be appended to.
+    root: list[Any] = []
+    stack: list[dict[str, Any]] = []
+    body = root
+    table: dict[str, Any] | None = None
+
+    for lineno, raw in enumerate(source.splitlines(), start=1):
+        line = raw.strip()
+        try:
+            if table is not None:
+                if not line:
+                    continue
+                if line.startswith("@ROW"):
+                    table["rows"].append(_parse_row(table["name"], line))
+                elif line == "@ENDTABLE":
+                    if not table["rows"]:
+                        raise MacroError(f"Table {table['name']!r} is empty")
+                    body.append(_TableDef(table["line"], _Table(table["name"], tuple(table["rows"]))))
+                    table = None
+                else:
+                    raise MacroError(f"Only @ROW lines are allowed inside @TABLE {table['name']} (missing @ENDTABLE?)")
+                continue
+
+            if not line:
+                continue
+            if not line.startswith("@"):
+                body.append(_Text(lineno, _compile_template(line)))
+                continue
+
+            d = _DIRECTIVE_RE.match(line)
+            word = d.group(1) if d else ""
+            if word == "LET":
+                m = _LET_RE.match(line)
+                if not m:
+                    raise MacroError("Invalid @LET (expected: @LET NAME = EXPR)")
+                body.append(_Let(lineno, _check_name(m.group(1)), _compile_expr(m.group(2))))
+            elif word == "TABLE":
+                m = _TABLE_RE.match(line)
+                if not m:
+                    raise MacroError("Invalid @TABLE (expected: @TABLE NAME)")
+                table = {"name": _check_name(m.group(1)), "line": lineno, "rows": []}
+            elif word == "ROW":
+                raise MacroError("@ROW outside @TABLE")
+            elif word == "FOR":
+                m = _FOR_TABLE_RE.match(line)
+                frame: dict[str, Any]
+                if m:
+                    frame = {
+                        "kind": "FOR",
+                        "line": lineno,
+                        "index": _check_name(m.group(1)),
+                        "row": _check_name(m.group(2)),
+                        "table": m.group(3),
+                        "start": None,
+                        "end": None,
+                    }
+                    if frame["index"] == frame["row"]:
+                        raise MacroError(f"Loop index and row cannot both be named {frame['index']!r}")
+                else:
+                    m = _FOR_RANGE_RE.match(line)
+                    if not m:
+                        raise MacroError("Invalid @FOR (expected: @FOR i, row IN TABLE or @FOR i IN A..B)")
+                    frame = {
+                        "kind": "FOR",
+                        "line": lineno,
+                        "index": _check_name(m.group(1)),
+                        "row": None,
+                        "table": None,
+                        "start": _compile_expr(m.group(2)),
+                        "end": _compile_expr(m.group(3)),
+                    }
+                frame["parent"] = body
+                frame["body"] = body = []
+                stack.append(frame)
+            elif word == "ENDFOR":
+                if not stack or stack[-1]["kind"] != "FOR":
+                    raise MacroError("@ENDFOR without matching @FOR")
+                f = stack.pop()
+                node = _For(f["line"], f["index"], f["row"], f["table"], f["start"], f["end"], tuple(f["body"]))
+                body = f["parent"]
+                body.append(node)
+            elif word == "IF":
+                m = _IF_RE.match(line)
+                if not m:
+                    raise MacroError("Invalid @IF (expected: @IF EXPR)")
+                frame = {"kind": "IF", "line": lineno, "cond": _compile_expr(m.group(1)), "then": [], "else": None}
+                frame["parent"] = body
+                body = frame["then"]
+                stack.append(frame)
+            elif word == "ELSE":
+                if line != "@ELSE" or not stack or stack[-1]["kind"] != "IF" or stack[-1]["else"] is not None:
+                    raise MacroError("@ELSE without matching @IF")
+                stack[-1]["else"] = body = []
+            elif word == "ENDIF":
+                if not stack or stack[-1]["kind"] != "IF":
+                    raise MacroError("@ENDIF without matching @IF")
+                f = stack.pop()
+                node = _If(f["line"], f["cond"], tuple(f["then"]), tuple(f["else"] or ()))
+                body = f["parent"]
+                body.append(node)
+            elif word == "ALLOC":
+                m = _ALLOC_MANUAL_RE.match(line)
+                if m:
+                    body.append(_Alloc(lineno, _check_name(m.group(1)), _compile_expr(m.group(3)), _compile_expr(m.group(2))))
+                else:
+                    m = _ALLOC_AUTO_RE.match(line)
+                    if not m:
+                        raise MacroError("Invalid @ALLOC (expected: @ALLOC BASE = K or @ALLOC BASE START=S COUNT=K)")
+                    body.append(_Alloc(lineno, _check_name(m.group(1)), _compile_expr(m.group(2)), None))
+            elif word == "ENDTABLE":
+                raise MacroError("@ENDTABLE without matching @TABLE")
+            else:
+                raise MacroError(f"Unknown directive: {line.split()[0]!r}")
+        except MacroError as e:
+            if e.line is None:
+                raise MacroError(e.message, lineno) from None
+            raise
+
+    if table is not None:
+        raise MacroError(f"@TABLE {table['name']} is missing @ENDTABLE", table["line"])
+    if stack:
+        raise MacroError(f"@{stack[-1]['kind']} is missing @END{stack[-1]['kind']}", stack[-1]["line"])
+    return CompiledMacros(tuple(root))
+
+
+@functools.lru_cache(maxsize=256)
+def compile_macros(source: str) -> CompiledMacros:
+    """Parse one procedure section (Test steps or Success conditions) into an AST.
+
+    Results are cached by source text, so re-expanding an unchanged procedure
+    skips parsing entirely.
+    """
+    return _parse(source)
+
+
+# ---------------------------------------------------------------------------
+# Expansion
+# ---------------------------------------------------------------------------
+
+
+class _Expander:
+    def __init__(self) -> None:
+        self.cursor = 0  # G
+        self.allocs: list[Allocation] = []  # sorted by start
+        self.alloc_starts: list[int] = []
+        self.introduced: dict[int, int] = {}  # ID -> line that introduced it
+        self.section = ""
+        self.introducing = False
+        self.out: list[ExpandedLine] = []
+        self.referenced: list[tuple[int, int]] = []  # (ID, line)
+
+    def run(self, section: str, compiled: CompiledMacros, env: Env, *, introducing: bool) -> tuple[ExpandedLine, ...]:
+        self.section = section
+        self.introducing = introducing
+        self.out = []
+        self.block(compiled.body, env)
+        return tuple(self.out)
+
+    def fail(self, msg: str, line: int) -> MacroError:
+        return MacroError(msg, line, self.section)
+
+    def eval(self, expr: _Expr, env: Env, line: int) -> Any:
+        try:
+            return expr(env)
+        except MacroError as e:
+            raise self.fail(e.message, line) from None
+
+    def eval_int(self, expr: _Expr, env: Env, line: int, what: str) -> int:
+        v = self.eval(expr, env, line)
+        if not isinstance(v, int) or isinstance(v, bool):
+            raise self.fail(f"{what} must be an integer (got {v!r} from {expr.src!r})", line)
+        return v
+
+    def bind(self, env: Env, name: str, value: Any, line: int) -> None:
+        if name in env:
+            raise self.fail(f"{name!r} is already defined (shadowing is forbidden)", line)
+        env[name] = value
+
+    def block(self, nodes: tuple[Any, ...], env: Env) -> None:
+        for node in nodes:
+            t = type(node)
+            if t is _Text:
+                self.text(node, env)
+            elif t is _Let:
+                self.bind(env, node.name, self.eval(node.expr, env, node.line), node.line)
+            elif t is _TableDef:
+                self.bind(env, node.table.name, node.table, node.line)
+            elif t is _For:
+                self.loop(node, env)
+            elif t is _If:
+                branch = node.then if self.eval(node.cond, env, node.line) else node.orelse
+                self.block(branch, env.new_child())
+            elif t is _Alloc:
+                self.alloc(node, env)
+
+    def loop(self, node: _For, env: Env) -> None:
+        if node.table is not None:
+            table = env.get(node.table)
+            if not isinstance(table, _Table):
+                raise self.fail(f"Unknown table: {node.table!r}", node.line)
+            for i, row in enumerate(table.rows):
+                child = env.new_child()
+                self.bind(child, node.index, i, node.line)
+                self.bind(child, node.row, row, node.line)  # type: ignore[arg-type]
+                self.block(node.body, child)
+            return
+
+        assert node.start is not None and node.end is not None
+        a = self.eval_int(node.start, env, node.line, "Range start")
+        b = self.eval_int(node.end, env, node.line, "Range end")
+        if a > b:
+            raise self.fail(f"Invalid range {a}..{b}: start > end", node.line)
+        for i in range(a, b + 1):
+            child = env.new_child()
+            self.bind(child, node.index, i, node.line)
+            self.block(node.body, child)
+
+    def alloc(self, node: _Alloc, env: Env) -> None:
+        count = self.eval_int(node.count, env, node.line, "@ALLOC count")
+        if count <= 0:
+            raise self.fail(f"@ALLOC count must be positive (got {count})", node.line)
+        if node.start is None:
+            start = self.cursor
+        else:
+            start = self.eval_int(node.start, env, node.line, "@ALLOC START")
+            if start < 0:
+                raise self.fail(f"@ALLOC START must be non-negative (got {start})", node.line)
+
+        new = Allocation(node.name, start, count)
+        i = bisect.bisect_left(self.alloc_starts, start)
+        for other in self.allocs[max(i - 1, 0) : i + 1]:
+            if other.start <= new.end and new.start <= other.end:
+                raise self.fail(
+                    f"@ALLOC {new.name} [{new.start}..{new.end}] overlaps @ALLOC {other.name} [{other.start}..{other.end}]",
+                    node.line,
+                )
+        self.allocs.insert(i, new)
+        self.alloc_starts.insert(i, start)
+        # G only moves forward, also for manual blocks placed below it.
+        self.cursor = max(self.cursor, new.end + 1)
+        self.bind(env, node.name, start, node.line)
+
+    def check_reserved(self, mid: int, expr: _Expr | None, line: int) -> None:
+        i = bisect.bisect_right(self.alloc_starts, mid) - 1
+        if i < 0:
+            return
+        block = self.allocs[i]
+        if mid <= block.end and (expr is None or block.name not in expr.names):
+            raise self.fail(
+                f"ID {mid} is inside the block reserved by @ALLOC {block.name} [{block.start}..{block.end}] "
+                f"but is not derived from {block.name}",
+                line,
+            )
+
+    def use_id(self, mid: int, expr: _Expr | None, introduces: bool, line: int) -> None:
+        self.check_reserved(mid, expr, line)
+        if introduces and self.introducing:
+            first = self.introduced.get(mid)
+            if first is not None:
+                raise self.fail(f"Duplicate measurement ID {{{mid}}} (first introduced on steps line {first})", line)
+            self.introduced[mid] = line
+        elif not self.introducing:
+            self.referenced.append((mid, line))
+
+    def text(self, node: _Text, env: Env) -> None:
+        tpl = node.template
+        for k in range(tpl.range_len):
+            parts: list[str] = []
+            ids: list[int] = []
+            for seg in tpl.segments:
+                if type(seg) is str:
+                    parts.append(seg)
+                elif type(seg) is _Expr:
+                    v = self.eval(seg, env, node.line)
+                    parts.append(str(v))
+                elif type(seg) is _IdSeg:
+                    expr = seg.expr
+                    if expr.bare_name is not None and expr.bare_name not in env:
+                        if seg.introduces:
+                            raise self.fail(
+                                f"Unknown name {expr.bare_name!r} in measurement ID \"as {{{expr.src}}}\"", node.line
+                            )
+                        parts.append("{" + expr.src + "}")  # legacy {NAME} placeholder
+                        continue
+                    mid = self.eval_int(expr, env, node.line, f"Measurement ID {{{expr.src}}}")
+                    if mid < 0:
+                        raise self.fail(f"Measurement ID {{{expr.src}}} is negative ({mid})", node.line)
+                    self.use_id(mid, expr, seg.introduces, node.line)
+                    parts.append(f"{{{mid}}}")
+                    ids.append(mid)
+                else:  # _RangeSeg
+                    assert tpl.range_start is not None
+                    if seg.is_id:
+                        mid = tpl.range_start[0] + k
+                        self.use_id(mid, None, seg.introduces, node.line)
+                        parts.append(f"{{{mid}}}")
+                        ids.append(mid)
+                    else:
+                        parts.append(str(tpl.range_start[1] + k))
+            self.out.append(ExpandedLine("".join(parts), node.line, tuple(ids)))
+
+
+def expand_procedure(steps: str, conditions: str | None = None) -> ExpandedProcedure:
+    """Expand an authored procedure into linear steps and success conditions.
+
+    ``steps`` and ``conditions`` are the bodies of the *Test steps* and
+    *Success conditions* sections. They share one compile-time scope and one
+    allocation cursor, in that order, so conditions can use names and
+    ``@ALLOC`` bases from the steps.
+
+    Raises ``MacroError`` (with section and line) for unknown variables,
+    non-deterministic expressions, duplicate IDs, overlapping allocations, IDs
+    inside a reserved block that are not derived from its base, orphan
+    condition IDs, empty tables and shadowing.
+    """
+    ex = _Expander()
+    env: Env = collections.ChainMap()
+    try:
+        steps_out = ex.run("steps", compile_macros(steps), env, introducing=True)
+    except MacroError as e:
+        if e.section is None:
+            raise MacroError(e.message, e.line, "steps") from None
+        raise
+
+    cond_out: tuple[ExpandedLine, ...] = ()
+    if conditions is not None:
+        try:
+            cond_out = ex.run("conditions", compile_macros(conditions), env, introducing=False)
+        except MacroError as e:
+            if e.section is None:
+                raise MacroError(e.message, e.line, "conditions") from None
+            raise
+        for mid, line in ex.referenced:
+            if mid not in ex.introduced:
+                raise MacroError(f"Orphan measurement ID {{{mid}}}: no step introduces it (\"as {{{mid}}}\")", line, "conditions")
+
+    return ExpandedProcedure(
+        steps=steps_out,
+        conditions=cond_out,
+        measurement_ids=tuple(ex.introduced),
+        allocations=tuple(sorted(ex.allocs, key=lambda a: a.start)),
+    )
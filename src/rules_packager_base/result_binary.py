@@ -0,0 +1,239 @@
+"""
+result_binary.py
+
+Compact binary container behind ``Result.save(path, format="binary")`` and
+``Result.load()``. JSON stays the interchange format; this one is for fast
+save/load of large sweep results.
+
+Layout (little-endian):
+
+    b"RPRB" | u8 version | u8 codec (0 raw, 1 zlib) | u16 reserved | u32 header length
+    header: UTF-8 JSON {"test_name", "compact", "blocks": [[name, typecode, count], ...], ...}
+    payload (zlib-compressed as a whole when codec = 1): the blocks, back to back
+
+Numeric measurements and PASS/FAIL/SKIP verdicts are packed arrays (IDs as
+int64, values as float64, kinds/codes as uint8). Everything else (non-numeric
+measurements, other verdicts, criteria, evidence) is one JSON block, and the
+log is NUL-joined UTF-8 when every entry is a string without NUL, JSON otherwise.
+The "meas_rest_pos"/"verdict_rest_pos" blocks give the position of each JSON
+entry among all entries of its map, so decoding restores the original key order
+(files without them put the JSON entries last).
+"""
+
+from __future__ import annotations
+
+from array import array
+import json
+from pathlib import Path
+import struct
+import sys
+from typing import Any, Iterator, Mapping
+import zlib
+
+
+MAGIC = b"RPRB"
+_VERSION = 1
+_PREAMBLE = struct.Struct("<4sBBHI")
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+
+# Measurement kinds in the "meas_kinds" block.
+_FLOAT, _INT = 1, 2
+_INT_LIMIT = 1 << 53
+
+_VERDICT_CODES = {"PASS": 1, "FAIL": 2, "SKIP": 3}
+_VERDICT_NAMES = (None, "PASS", "FAIL", "SKIP")
+
+
+class ResultFormatError(ValueError):
+    pass
+
+
+def _le(a: array) -> bytes:
+    if sys.byteorder == "big" and a.itemsize > 1:
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+
+def _from_le(typecode: str, data: bytes) -> array:
+    a = array(typecode)
+    a.frombytes(data)
+    if sys.byteorder == "big" and a.itemsize > 1:
+        a.byteswap()
+    return a
+
+
+def encode(
+    *,
+    test_name: str,
+    measurements: Mapping[int, Any],
+    verdicts: Mapping[int, Any],
+    criteria: Mapping[int, Any],
+    evidence: list[Any],
+    log: Any,
+    compact: bool = False,
+    level: int = 6,
+) -> bytes:
+    """Serialize Result fields; ``level`` 0 stores the payload uncompressed."""
+    meas_ids, meas_values, meas_kinds = array("q"), array("d"), array("B")
+    other_meas: dict[str, Any] = {}
+    meas_rest_pos = array("q")
+    for i, (k, v) in enumerate(measurements.items()):
+        if type(k) is int and isinstance(v, float):
+            meas_ids.append(k)
+            meas_values.append(v)
+            meas_kinds.append(_FLOAT)
+        elif type(k) is int and isinstance(v, int) and not isinstance(v, bool) and -_INT_LIMIT <= v <= _INT_LIMIT:
+            meas_ids.append(k)
+            meas_values.append(v)
+            meas_kinds.append(_INT)
+        else:
+            other_meas[str(k)] = v
+            meas_rest_pos.append(i)
+
+    verdict_ids, verdict_codes = array("q"), array("B")
+    other_verdicts: dict[str, Any] = {}
+    verdict_rest_pos = array("q")
+    for i, (k, v) in enumerate(verdicts.items()):
+        code = _VERDICT_CODES.get(v) if isinstance(v, str) else None
+        if type(k) is int and code is not None:
+            verdict_ids.append(k)
+            verdict_codes.append(code)
+        else:
+            other_verdicts[str(k)] = v
+            verdict_rest_pos.append(i)
+
+    log_entries = list(log)
+    if all(isinstance(e, str) and "\x00" not in e for e in log_entries):
+        log_encoding, log_block = "nul", "\x00".join(log_entries).encode("utf-8")
+    else:
+        log_encoding, log_block = "json", json.dumps(log_entries, ensure_ascii=False).encode("utf-8")
+
+    rest = json.dumps(
+        {
+            "measurements": other_meas,
+            "verdicts": other_verdicts,
+            "criteria": {str(k): v for k, v in criteria.items()},
+            "evidence": list(evidence),
+        },
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+    blocks = [
+        ("meas_ids", "q", meas_ids),
+        ("meas_values", "d", meas_values),
+        ("meas_kinds", "B", meas_kinds),
+        ("verdict_ids", "q", verdict_ids),
+        ("verdict_codes", "B", verdict_codes),
+        ("meas_rest_pos", "q", meas_rest_pos),
+        ("verdict_rest_pos", "q", verdict_rest_pos),
+        ("rest", "B", rest),
+        ("log", "B", log_block),
+    ]
+    header = json.dumps(
+        {
+            "test_name": test_name,
+            "compact": compact,
+            "log_encoding": log_encoding,
+            "log_count": len(log_entries),
+            "blocks": [[name, tc, len(data)] for name, tc, data in blocks],
+        },
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+    payload = b"".join(_le(d) if isinstance(d, array) else bytes(d) for _n, _tc, d in blocks)
+    codec = CODEC_RAW
+    if level:
+        payload = zlib.compress(payload, level)
+        codec = CODEC_ZLIB
+    return _PREAMBLE.pack(MAGIC, _VERSION, codec, 0, len(header)) + header + payload
+
+
+def _interleave(packed: Iterator[tuple[int, Any]], other: dict[str, Any], positions: array | None) -> dict[int, Any]:
+    """Merge packed and JSON entries back into one map in their original order."""
+    out: dict[int, Any] = {}
+    if positions is None:  # written before the position blocks existed: JSON entries last
+        out.update(packed)
+        out.update((int(k), v) for k, v in other.items())
+        return out
+    n = 0
+    for pos, (k, v) in zip(positions, other.items()):
+        for pk, pv in packed if n < pos else ():
+            out[pk] = pv
+            n += 1
+            if n == pos:
+                break
+        out[int(k)] = v
+        n += 1
+    out.update(packed)
+    return out
+
+
+def decode(data: bytes) -> dict[str, Any]:
+    """Inverse of ``encode``: Result fields with int IDs (plus ``compact``)."""
+    if len(data) < _PREAMBLE.size:
+        raise ResultFormatError("Truncated binary Result")
+    magic, version, codec, _reserved, header_len = _PREAMBLE.unpack_from(data)
+    if magic != MAGIC:
+        raise ResultFormatError("Not a binary Result (bad magic)")
+    if version != _VERSION:
+        raise ResultFormatError(f"Unsupported binary Result version {version}")
+    start = _PREAMBLE.size + header_len
+    try:
+        header = json.loads(data[_PREAMBLE.size : start].decode("utf-8"))
+        payload = data[start:]
+        if codec == CODEC_ZLIB:
+            payload = zlib.decompress(payload)
+        elif codec != CODEC_RAW:
+            raise ResultFormatError(f"Unknown binary Result codec {codec}")
+    except (ValueError, zlib.error) as e:
+        raise ResultFormatError(f"Corrupt binary Result: {e}")
+
+    view = memoryview(payload)
+    blocks: dict[str, Any] = {}
+    pos = 0
+    for name, tc, count in header["blocks"]:
+        size = array(tc).itemsize * count
+        if pos + size > len(view):
+            raise ResultFormatError("Truncated binary Result payload")
+        chunk = view[pos : pos + size]
+        blocks[name] = _from_le(tc, chunk) if tc != "B" else bytes(chunk)
+        pos += size
+
+    rest = json.loads(blocks["rest"].decode("utf-8"))
+    measurements = _interleave(
+        ((k, int(v) if kind == _INT else v) for k, v, kind in zip(blocks["meas_ids"], blocks["meas_values"], blocks["meas_kinds"])),
+        rest["measurements"],
+        blocks.get("meas_rest_pos"),
+    )
+    verdicts = _interleave(
+        ((k, _VERDICT_NAMES[c]) for k, c in zip(blocks["verdict_ids"], blocks["verdict_codes"])),
+        rest["verdicts"],
+        blocks.get("verdict_rest_pos"),
+    )
+
+    log_block = blocks["log"].decode("utf-8")
+    if header["log_encoding"] == "nul":
+        log = log_block.split("\x00") if header.get("log_count") else []
+    else:
+        log = json.loads(log_block)
+
+    return {
+        "test_name": header.get("test_name", ""),
+        "compact": bool(header.get("compact")),
+        "measurements": measurements,
+        "verdicts": verdicts,
+        "criteria": {int(k): v for k, v in rest["criteria"].items()},
+        "evidence": rest["evidence"],
+        "log": log,
+    }
+
+
+def is_binary(path: str | Path) -> bool:
+    try:
+        with Path(path).open("rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
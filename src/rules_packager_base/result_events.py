@@ -0,0 +1,416 @@
+"""
+result_events.py
+
+Live event stream behind ``Result.publish_events()``: every measurement, verdict,
+criterion, evidence entry, log line and operator prompt is sent to a local
+channel as it happens, so the GUI can show progress without re-reading
+``results.json``.
+
+Channels (the ``target`` string, also accepted from the ``RULES_PACKAGER_EVENTS``
+environment variable, which makes every ``Result`` a script creates publish):
+
+    path/to/events.jsonl         append-only JSON Lines file (any OS; follow_events() tails it)
+    tcp://127.0.0.1:PORT         local TCP socket (EventListener is the receiving end)
+    unix:/path/to/socket         Unix domain socket (POSIX)
+
+Events use the record layout of result_journal (``{"t": "m", "id": 1, "v": 2.41}``,
+"v", "c", "e", "l", "p" for prompts, "-" suffixes for deletes, "e-"/"l-" when
+the evidence list or log is replaced), framed by a header
+``{"format": "rules_packager_base.result-events", ...}`` and
+``{"t": "end", "overall": ...}``. Sending happens on one background thread shared
+by all publishers of the process; a socket that fails or stalls for more than
+``send_timeout`` seconds is dropped, the test carries on and ``dropped`` counts
+the lost events.
+
+GUI side:
+
+    with EventListener() as listener:              # or follow_events("events.jsonl")
+        env = {**os.environ, EVENTS_ENV: listener.address}
+        proc = subprocess.Popen([sys.executable, "test.py"], env=env, cwd=run_dir)
+        live = LiveResult()
+        for ev in listener.events(timeout=0.5):
+            live.apply(ev)
+            ...  # live.verdict_counts(), live.overall, live.prompt, live.log[-20:]
+"""
+
+from __future__ import annotations
+
+import collections
+from collections.abc import Iterator
+import json
+import os
+from pathlib import Path
+import queue
+import socket
+import threading
+import time
+from typing import Any, Callable
+import warnings
+import weakref
+
+from .result_store import TrackedVerdicts, overall_of
+
+
+EVENTS_ENV = "RULES_PACKAGER_EVENTS"
+EVENTS_FORMAT = "rules_packager_base.result-events"
+_VERSION = 1
+
+_MAP_KINDS = {"m": "measurements", "v": "verdicts", "c": "criteria"}
+
+# default=str: an odd value must not stop the test just because it is published.
+_encode = json.JSONEncoder(ensure_ascii=False, default=str).encode
+
+# Sent without waiting for the next flush: the operator is waiting, or the run is over.
+_URGENT = ("p", "end")
+
+
+class EventError(ValueError):
+    pass
+
+
+def _parse_target(target: str | Path) -> tuple[str, Any]:
+    text = str(target)
+    if text.startswith("tcp://"):
+        host, sep, port = text[len("tcp://") :].rpartition(":")
+        if not sep or not port.isdigit():
+            raise EventError(f"Expected tcp://host:port, got {text!r}")
+        return "tcp", (host or "127.0.0.1", int(port))
+    if text.startswith("unix:"):
+        path = text[len("unix:") :]
+        if path.startswith("//"):
+            path = path[2:]
+        if not hasattr(socket, "AF_UNIX"):
+            raise EventError("Unix sockets are not available on this platform; use tcp://127.0.0.1:PORT")
+        return "unix", path
+    return "file", Path(text)
+
+
+class _Sender:
+    """The one thread that flushes every open publisher; it holds them weakly."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._publishers: weakref.WeakSet[EventPublisher] = weakref.WeakSet()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def add(self, publisher: "EventPublisher") -> None:
+        with self._lock:
+            self._publishers.add(publisher)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="result-events-send", daemon=True)
+                self._thread.start()
+
+    def discard(self, publisher: "EventPublisher") -> None:
+        with self._lock:
+            self._publishers.discard(publisher)
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _open(self) -> list["EventPublisher"]:
+        with self._lock:
+            return list(self._publishers)
+
+    def _run(self) -> None:
+        # No publisher is referenced between rounds, so an abandoned one can be collected.
+        while True:
+            self._wake.wait(min((p.flush_interval for p in self._open()), default=1.0))
+            self._wake.clear()
+            for p in self._open():
+                try:
+                    p.flush()
+                except Exception as e:  # one broken publisher must not stop the others
+                    warnings.warn(f"Result events to {p.target!r}: send failed: {e!r}")
+            p = None
+
+
+_SENDER = _Sender()
+
+
+class EventPublisher:
+    """Sends records to one channel; a sink for result_journal's Journal* wrappers.
+
+    ``write()`` encodes the record right away (so later changes to a value the
+    script still holds are not picked up half-way) and queues the line. A
+    background thread (one per process, whatever the number of publishers) sends
+    the queue every ``flush_interval`` seconds, and right away for prompts and
+    the end record, so a slow or stalled reader never holds up the test.
+    """
+
+    def __init__(
+        self,
+        target: str | Path,
+        *,
+        test_name: str = "",
+        flush_interval: float = 0.05,
+        send_timeout: float = 1.0,
+    ) -> None:
+        self.target = str(target)
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._pending: list[str] = []
+        self._closing = False
+        self._f: Any = None
+        self._sock: socket.socket | None = None
+        kind, addr = _parse_target(target)
+        if kind == "file":
+            self._f = addr.open("a", encoding="utf-8")
+        else:
+            sock = socket.socket(socket.AF_INET if kind == "tcp" else socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(send_timeout)
+            try:
+                sock.connect(addr)
+            except OSError:
+                sock.close()
+                raise
+            self._sock = sock
+        self.write({"format": EVENTS_FORMAT, "version": _VERSION, "test_name": test_name, "pid": os.getpid(), "time": time.time()})
+        _SENDER.add(self)
+
+    @property
+    def closed(self) -> bool:
+        return self._closing
+
+    def write(self, rec: dict[str, Any]) -> None:
+        try:
+            line = _encode(rec) + "\n"
+        except (TypeError, ValueError, RecursionError):  # e.g. a circular reference
+            line = None
+        with self._lock:
+            if self._closing or line is None:
+                self.dropped += 1
+                return
+            self._pending.append(line)
+        if rec.get("t") in _URGENT:
+            _SENDER.wake()
+
+    def flush(self) -> None:
+        """Send everything queued so far (on the calling thread)."""
+        # Taking the lines under _io_lock keeps batches in order when two threads flush.
+        with self._io_lock:
+            with self._lock:
+                lines, self._pending = self._pending, []
+            if not lines:
+                return
+            if self._f is None and self._sock is None:
+                self.dropped += len(lines)
+                return
+            data = "".join(lines)
+            try:
+                if self._f is not None:
+                    self._f.write(data)
+                    self._f.flush()
+                else:
+                    self._sock.sendall(data.encode("utf-8"))  # type: ignore[union-attr]
+            except OSError:
+                self.dropped += len(lines)
+                self._close_channel()
+
+    def close(self, *, test_name: str | None = None, overall: str | None = None) -> None:
+        if self._closing:
+            return
+        self.write({"t": "end", "test_name": test_name, "overall": overall})
+        with self._lock:
+            self._closing = True
+        _SENDER.discard(self)
+        self.flush()
+        with self._io_lock:
+            self._close_channel()
+
+    def _close_channel(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+
+
+def _decode(line: bytes) -> dict[str, Any] | None:
+    try:
+        rec = json.loads(line)
+    except ValueError:
+        return None
+    return rec if isinstance(rec, dict) else None
+
+
+def follow_events(
+    path: str | Path,
+    *,
+    poll_interval: float = 0.1,
+    timeout: float | None = None,
+    until_end: bool = True,
+) -> Iterator[dict[str, Any]]:
+    """Tail an events file, yielding each record as it is appended.
+
+    Waits for the file to appear. Stops after an "end" record (``until_end``) or
+    when nothing new arrives for ``timeout`` seconds. Reads only new bytes, and
+    a half-written last line is held back until it is complete.
+    """
+    p = Path(path)
+    idle_since = time.monotonic()
+    while not p.exists():
+        if timeout is not None and time.monotonic() - idle_since >= timeout:
+            return
+        time.sleep(poll_interval)
+    pending = b""
+    with p.open("rb") as f:
+        while True:
+            chunk = f.read(1 << 16)
+            if not chunk:
+                if timeout is not None and time.monotonic() - idle_since >= timeout:
+                    return
+                time.sleep(poll_interval)
+                continue
+            idle_since = time.monotonic()
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                rec = _decode(line)
+                if rec is None:
+                    continue
+                yield rec
+                if until_end and rec.get("t") == "end":
+                    return
+
+
+class EventListener:
+    """Socket endpoint that publishers connect to; events from all connections are queued.
+
+    ``address`` is the target string to hand to the test process (e.g. through
+    ``EVENTS_ENV``); with the default port 0 the OS picks a free port.
+    """
+
+    def __init__(self, address: str = "tcp://127.0.0.1:0", *, backlog: int = 8) -> None:
+        kind, addr = _parse_target(address)
+        if kind == "file":
+            raise EventError(f"EventListener needs a tcp:// or unix: address, got {address!r}; use follow_events() for files")
+        self._unix_path = addr if kind == "unix" else None
+        self._server = socket.socket(socket.AF_INET if kind == "tcp" else socket.AF_UNIX, socket.SOCK_STREAM)
+        if self._unix_path is not None and os.path.exists(self._unix_path):
+            os.unlink(self._unix_path)
+        self._server.bind(addr)
+        self._server.listen(backlog)
+        if kind == "tcp":
+            host, port = self._server.getsockname()[:2]
+            self.address = f"tcp://{host}:{port}"
+        else:
+            self.address = f"unix:{self._unix_path}"
+        self._queue: queue.Queue[dict[str, Any]] = queue.Queue()
+        self._closed = threading.Event()
+        threading.Thread(target=self._accept_loop, name="result-events-accept", daemon=True).start()
+
+    def _accept_loop(self) -> None:
+        while not self._closed.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._read_loop, args=(conn,), name="result-events-read", daemon=True).start()
+
+    def _read_loop(self, conn: socket.socket) -> None:
+        with conn, conn.makefile("rb") as f:
+            for line in f:
+                rec = _decode(line)
+                if rec is not None:
+                    self._queue.put(rec)
+
+    def get(self, timeout: float | None = None) -> dict[str, Any] | None:
+        """Next event, or None after ``timeout`` seconds without one."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def events(self, timeout: float | None = None) -> Iterator[dict[str, Any]]:
+        """Yield events until the listener is closed or ``timeout`` passes without one."""
+        while not self._closed.is_set():
+            rec = self.get(timeout)
+            if rec is None:
+                return
+            yield rec
+
+    def close(self) -> None:
+        self._closed.set()
+        self._server.close()
+        if self._unix_path is not None:
+            try:
+                os.unlink(self._unix_path)
+            except OSError:
+                pass
+
+    def __enter__(self) -> "EventListener":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class LiveResult:
+    """Current state of one run, folded from its events (what a live view renders).
+
+    A new header resets the state, so a file that several runs appended to shows
+    the latest run. ``log`` keeps the last ``log_tail`` lines; ``prompt`` is the
+    prompt waiting for an answer, if any.
+    """
+
+    def __init__(self, *, log_tail: int | None = 1000, on_event: Callable[[dict[str, Any]], None] | None = None) -> None:
+        self.log_tail = log_tail
+        self.on_event = on_event
+        self.reset()
+
+    def reset(self, test_name: str = "") -> None:
+        self.test_name = test_name
+        self.measurements: dict[Any, Any] = {}
+        self.verdicts = TrackedVerdicts()
+        self.criteria: dict[Any, Any] = {}
+        self.evidence: list[Any] = []
+        self.log: collections.deque[Any] = collections.deque(maxlen=self.log_tail)
+        self.log_total = 0
+        self.prompt: str | None = None
+        self.finished = False
+        self.final_overall: str | None = None
+
+    def apply(self, rec: dict[str, Any]) -> None:
+        t = rec.get("t")
+        if t is None:
+            if rec.get("format") == EVENTS_FORMAT:
+                self.reset(rec.get("test_name") or "")
+        elif t in _MAP_KINDS:
+            getattr(self, _MAP_KINDS[t])[rec["id"]] = rec["v"]
+        elif t[:-1] in _MAP_KINDS and t.endswith("-"):
+            getattr(self, _MAP_KINDS[t[:-1]]).pop(rec["id"], None)
+        elif t == "l":
+            self.log.append(rec["v"])
+            self.log_total += 1
+            # test_helpers.prompt sends "p" after logging the prompt; the next line is the answer.
+            self.prompt = None
+        elif t == "p":
+            self.prompt = rec["v"]
+        elif t == "e":
+            self.evidence.append(rec["v"])
+        elif t == "e-":
+            self.evidence.clear()
+        elif t == "l-":
+            self.log.clear()
+            self.log_total = 0
+        elif t == "end":
+            self.finished = True
+            self.prompt = None
+            self.final_overall = rec.get("overall")
+            if rec.get("test_name") is not None:
+                self.test_name = rec["test_name"]
+        if self.on_event is not None:
+            self.on_event(rec)
+
+    @property
+    def overall(self) -> str:
+        return self.final_overall or overall_of(self.verdicts)
+
+    def verdict_counts(self) -> tuple[int, int, int, int]:
+        return self.verdicts.verdict_counts()
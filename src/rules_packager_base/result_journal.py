@@ -0,0 +1,366 @@
+"""
+result_journal.py
+
+JSON Lines journal behind ``Result.stream_to()``. Every measurement, verdict,
+criterion, log line and evidence entry is appended as one record when it
+happens, so a crash loses at most the last ``fsync_interval`` seconds. In
+memory, only the log is bounded (to a tail). Measurements, verdicts and
+criteria keep the latest value per ID, unbounded: they grow with the number of
+distinct IDs, not with the number of writes, and verdicts/overall need them all.
+
+Journal layout (one JSON object per line):
+
+    {"format": "rules_packager_base.result-journal", "version": 1, "test_name": "..."}
+    {"t": "m", "id": 1, "v": 2.41}          measurement set   ("m-": deleted)
+    {"t": "v", "id": 1, "v": "PASS"}        verdict set       ("v-": deleted)
+    {"t": "c", "id": 1, "v": {...}}         criterion set     ("c-": deleted)
+    {"t": "l", "v": "Step 1 ..."}           log line
+    {"t": "e", "v": {"label": ..., ...}}    evidence entry
+    {"t": "e-"} / {"t": "l-"}               evidence / log cleared (the field was reassigned)
+    {"t": "p", "v": "Enter Vout ..."}       operator prompt shown (informational)
+    {"t": "end", "test_name": "...", "overall": "PASS"}
+"""
+
+from __future__ import annotations
+
+import collections
+from collections.abc import Iterator, MutableMapping
+import json
+import mmap
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Any, Iterable
+
+
+JOURNAL_FORMAT = "rules_packager_base.result-journal"
+_VERSION = 1
+
+_MAP_KINDS = {"m": "measurements", "v": "verdicts", "c": "criteria"}
+
+
+class JournalError(ValueError):
+    pass
+
+
+class ResultJournal:
+    """Append-only writer; flushes and fsyncs at most every ``fsync_interval`` seconds."""
+
+    def __init__(self, path: str | Path, *, test_name: str = "", fsync_interval: float = 1.0) -> None:
+        self.path = Path(path)
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._f = self.path.open("w", encoding="utf-8")
+        self._last_sync = time.monotonic()
+        self.records = 0
+        # Optional second sink (e.g. a result_events.EventPublisher) that gets every record too.
+        self.mirror: Any = None
+        self.write({"format": JOURNAL_FORMAT, "version": _VERSION, "test_name": test_name})
+        self.sync()
+
+    @property
+    def closed(self) -> bool:
+        return self._f.closed
+
+    def write(self, rec: dict[str, Any]) -> None:
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._f.closed:
+                raise JournalError(f"Result journal is closed: {self.path}")
+            self._f.write(line)
+            self.records += 1
+            if time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync_locked()
+        if self.mirror is not None:
+            self.mirror.write(rec)
+
+    def sync(self) -> None:
+        with self._lock:
+            if not self._f.closed:
+                self._sync_locked()
+
+    def _sync_locked(self) -> None:
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._last_sync = time.monotonic()
+
+    def close(self, *, test_name: str | None = None, overall: str | None = None) -> None:
+        if self.closed:
+            return
+        self.write({"t": "end", "test_name": test_name, "overall": overall})
+        with self._lock:
+            self._sync_locked()
+            self._f.close()
+
+
+class JournalMap(MutableMapping):
+    """Dict-like ``{id: value}`` that journals every change.
+
+    ``journal`` is any sink with ``write(record)``. Existing entries of ``data``
+    are written first unless ``replay`` is false.
+    """
+
+    def __init__(self, journal: Any, kind: str, data: MutableMapping | None = None, *, replay: bool = True) -> None:
+        self._journal = journal
+        self._kind = kind
+        # A non-dict store (e.g. result_store.CompactMeasurements) is kept as the backing.
+        self._data: MutableMapping = dict(data or {}) if data is None or type(data) is dict else data
+        if replay:
+            for k, v in self._data.items():
+                journal.write({"t": kind, "id": k, "v": v})
+
+    def __getitem__(self, key: int) -> Any:
+        return self._data[key]
+
+    def __setitem__(self, key: int, value: Any) -> None:
+        self._journal.write({"t": self._kind, "id": key, "v": value})
+        self._data[key] = value
+
+    def __delitem__(self, key: int) -> None:
+        del self._data[key]
+        self._journal.write({"t": self._kind + "-", "id": key})
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def __repr__(self) -> str:
+        return f"JournalMap({self._data!r})"
+
+    @property
+    def backing(self) -> MutableMapping:
+        return self._data
+
+    def __getattr__(self, name: str) -> Any:
+        # Store-specific helpers of the backing (verdict_counts(), numeric(), nbytes).
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._data, name)
+
+
+class JournalList(list):
+    """List that journals appended entries (evidence: small, kept whole)."""
+
+    def __init__(self, journal: Any, kind: str, items: Iterable[Any] = (), *, replay: bool = True) -> None:
+        super().__init__()
+        self._journal = journal
+        self._kind = kind
+        if replay:
+            self.extend(items)
+        else:
+            super().extend(items)
+
+    def append(self, item: Any) -> None:
+        self._journal.write({"t": self._kind, "v": item})
+        super().append(item)
+
+    def extend(self, items: Iterable[Any]) -> None:
+        for item in items:
+            self.append(item)
+
+    def __iadd__(self, items: Iterable[Any]) -> "JournalList":
+        self.extend(items)
+        return self
+
+    def __reduce__(self):
+        # Copies/pickles are plain lists.
+        return (list, (list(self),))
+
+
+class _LogSink:
+    """Journaling shared by ``JournalLog`` and ``JournalLogTail``; ``total`` counts every line appended."""
+
+    _journal: Any
+    total: int
+
+    def append(self, item: Any) -> None:
+        self._journal.write({"t": "l", "v": item})
+        self.total += 1
+        super().append(item)  # type: ignore[misc]
+
+    def extend(self, items: Iterable[Any]) -> None:
+        for item in items:
+            self.append(item)
+
+    def __iadd__(self, items: Iterable[Any]) -> Any:
+        self.extend(items)
+        return self
+
+    def record(self, rec: dict[str, Any]) -> None:
+        """Write a record that is not a log line (e.g. a prompt event from test_helpers.prompt)."""
+        self._journal.write(rec)
+
+    def __reduce__(self):
+        # Copies/pickles are plain lists (of the tail, for JournalLogTail).
+        return (list, (list(self),))  # type: ignore[call-overload]
+
+
+class JournalLog(_LogSink, list):
+    """Log list that journals every line and keeps them all (a real list: slicing, ``+``, JSON)."""
+
+    def __init__(self, journal: Any, items: Iterable[Any] = (), *, replay: bool = True) -> None:
+        super().__init__()
+        self._journal = journal
+        self.total = 0
+        if replay:
+            self.extend(items)
+        else:
+            list.extend(self, items)
+            self.total = len(self)
+
+
+class JournalLogTail(_LogSink, collections.deque):
+    """Log sink that journals every line but keeps only the last ``maxlen`` in memory.
+
+    ``len()`` and iteration see the tail; ``total`` counts every line appended.
+    """
+
+    def __init__(self, journal: Any, items: Iterable[Any] = (), maxlen: int = 1000, *, replay: bool = True) -> None:
+        super().__init__(maxlen=maxlen)
+        self._journal = journal
+        self.total = 0
+        if replay:
+            self.extend(items)
+        else:
+            collections.deque.extend(self, items)
+            self.total = len(self)
+
+
+def journal_log(journal: Any, items: Iterable[Any] = (), maxlen: int | None = None, *, replay: bool = True) -> JournalLog | JournalLogTail:
+    """A ``JournalLog``, or a ``JournalLogTail`` when only the last ``maxlen`` lines are to be kept."""
+    if maxlen is None:
+        return JournalLog(journal, items, replay=replay)
+    return JournalLogTail(journal, items, maxlen, replay=replay)
+
+
+def iter_journal(path: str | Path) -> Iterator[dict[str, Any]]:
+    """Yield the header and then every record of a journal.
+
+    A torn last line (crash mid-write) is ignored; corruption anywhere else
+    raises ``JournalError``.
+    """
+    p = Path(path)
+    with p.open("r", encoding="utf-8") as f:
+        header_line = f.readline()
+        try:
+            header = json.loads(header_line)
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get("format") != JOURNAL_FORMAT:
+            raise JournalError(f"Not a Result journal: {p}")
+        if header.get("version") != _VERSION:
+            raise JournalError(f"Unsupported Result journal version {header.get('version')!r}: {p}")
+        yield header
+
+        for lineno, line in enumerate(f, start=2):
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                # Only the last line can lack its newline: a torn final write.
+                if not line.endswith("\n"):
+                    return
+                raise JournalError(f"Corrupt Result journal record at line {lineno}: {p}")
+            yield rec
+
+
+def is_journal(path: str | Path) -> bool:
+    try:
+        with Path(path).open("r", encoding="utf-8") as f:
+            head = json.loads(f.readline(65536))
+    except (OSError, ValueError):
+        return False
+    return isinstance(head, dict) and head.get("format") == JOURNAL_FORMAT
+
+
+def replay_journal(path: str | Path, *, with_log: bool = True) -> dict[str, Any]:
+    """Fold a journal into the ``Result.to_json()`` fields (without ``overall``)."""
+    maps: dict[str, dict[int, Any]] = {name: {} for name in _MAP_KINDS.values()}
+    log: list[Any] = []
+    evidence: list[Any] = []
+    test_name = ""
+    for rec in iter_journal(path):
+        t = rec.get("t")
+        if t is None:
+            test_name = rec.get("test_name") or ""
+        elif t == "l":
+            if with_log:
+                log.append(rec["v"])
+        elif t in _MAP_KINDS:
+            maps[_MAP_KINDS[t]][int(rec["id"])] = rec["v"]
+        elif t[:-1] in _MAP_KINDS and t.endswith("-"):
+            maps[_MAP_KINDS[t[:-1]]].pop(int(rec["id"]), None)
+        elif t == "e":
+            evidence.append(rec["v"])
+        elif t == "e-":
+            evidence.clear()
+        elif t == "l-":
+            log.clear()
+        elif t == "end":
+            if rec.get("test_name") is not None:
+                test_name = rec["test_name"]
+    return {"test_name": test_name, **maps, "evidence": evidence, "log": log}
+
+
+# A log reset is always a whole record line of its own (ResultJournal.write's encoding);
+# the same text nested inside a value is never preceded by a newline and followed by one.
+_LOG_RESET_LINE = b'\n{"t": "l-"}\n'
+
+
+def _count_log_resets(path: str | Path) -> int:
+    with Path(path).open("rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            n, pos = 0, mm.find(_LOG_RESET_LINE)
+            while pos >= 0:
+                n += 1
+                pos = mm.find(_LOG_RESET_LINE, pos + 1)
+    return n
+
+
+def iter_log_entries(path: str | Path) -> Iterator[Any]:
+    """Log lines of a journal, after its last log reset (a scan for whole reset lines finds how many there are)."""
+    resets = _count_log_resets(path)
+    seen = 0
+    for rec in iter_journal(path):
+        t = rec.get("t")
+        if t == "l" and seen >= resets:
+            yield rec["v"]
+        elif t == "l-":
+            seen += 1
+
+
+def write_results_json(journal_path: str | Path, output: str | Path) -> Path:
+    """Rebuild ``results.json`` from a journal without loading the log into memory.
+
+    The output is identical to ``json.dumps(result.to_json(), indent=2)`` of the
+    Result the journal recorded. The journal is read twice: once for the
+    measurements, verdicts, criteria and evidence, then again to stream the log.
+    """
+    from .result_store import overall_of
+
+    data = replay_journal(journal_path, with_log=False)
+    overall = overall_of(data["verdicts"])
+    out = Path(output)
+
+    def field(key: str, value: Any) -> str:
+        return f"  {json.dumps(key)}: " + json.dumps(value, indent=2).replace("\n", "\n  ")
+
+    with out.open("w", encoding="utf-8") as f:
+        f.write("{\n")
+        for key in ("test_name", "measurements", "verdicts", "criteria", "evidence"):
+            f.write(field(key, data[key]) + ",\n")
+        f.write('  "log": [')
+        first = True
+        for line in iter_log_entries(journal_path):
+            f.write(("\n    " if first else ",\n    ") + json.dumps(line))
+            first = False
+        f.write("]" if first else "\n  ]")
+        f.write(",\n" + field("overall", overall) + "\n}")
+    return out
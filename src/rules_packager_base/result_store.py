@@ -0,0 +1,372 @@
+"""
+result_store.py
+
+Compact mappings for ``Result.measurements`` and ``Result.verdicts`` in sweep
+tests with 10^5+ IDs. They behave like the plain dicts they replace, but
+numeric measurements live in one ``array('d')`` indexed by ID (9 bytes per slot
+instead of ~100+ per dict entry), verdicts are one byte per ID, and the
+PASS/FAIL/SKIP counts are kept up to date on every write so ``Result.overall``
+is O(1).
+
+    res = Result.compact(test_name="SWEEP")
+    res.measurements[12345] = 2.41
+    ids, values = res.measurements.numeric()   # NumPy arrays when installed
+
+Non-numeric values (strings, None, bools, ...), negative or non-int IDs and IDs
+far past the current end are kept in a small side dict. Iteration is in ID
+order for the array-backed entries, then the side dict in insertion order.
+
+``TrackedVerdicts`` is the dict every plain ``Result.verdicts`` becomes: it keeps
+the verdict counts on every write. Both verdict stores call listeners on each change.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterator, MutableMapping
+from typing import Any, Callable
+
+try:  # optional: numeric() returns NumPy arrays when available
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when NumPy is absent
+    np = None  # type: ignore[assignment]
+
+
+# Slot kinds in CompactMeasurements._kind.
+_ABSENT, _FLOAT, _INT = 0, 1, 2
+_INT_LIMIT = 1 << 53  # ints a double holds exactly
+
+# Verdict codes in CompactVerdicts._codes; other values live in the side dict and count as 4.
+_VERDICT_CODES = {"PASS": 1, "FAIL": 2, "SKIP": 3}
+_VERDICT_NAMES = (None, "PASS", "FAIL", "SKIP")
+_OTHER = 4
+
+# An ID may extend the arrays by at most this many slots (or by doubling,
+# whichever is larger); IDs further out go to the side dict.
+_MAX_GAP = 1 << 16
+
+_MISSING = object()
+
+
+def _grow_to(key: int, length: int) -> int:
+    """New length to hold ``key``, or -1 if ``key`` is too far past the end."""
+    if key - length > max(_MAX_GAP, length):
+        return -1
+    return max(key + 1, 2 * length, 64)
+
+
+def _verdict_code(value: Any) -> int:
+    return _VERDICT_CODES.get(value, _OTHER) if isinstance(value, str) else _OTHER
+
+
+def _is_slot_key(key: Any) -> bool:
+    return type(key) is int and key >= 0
+
+
+class CompactMeasurements(MutableMapping):
+    """``{id: value}`` with numeric values stored densely in ``array('d')``."""
+
+    def __init__(self, data: Any = None) -> None:
+        self._values = array("d")
+        self._kind = bytearray()
+        self._other: dict[Any, Any] = {}
+        self._n = 0
+        if data:
+            self.update(data)
+
+    def _slot(self, key: Any, *, grow: bool) -> int:
+        if not _is_slot_key(key):
+            return -1
+        size = len(self._kind)
+        if key < size:
+            return key
+        if not grow:
+            return -1
+        new_size = _grow_to(key, size)
+        if new_size < 0:
+            return -1
+        self._values.frombytes(bytes(8 * (new_size - size)))
+        self._kind.extend(bytes(new_size - size))
+        return key
+
+    def __getitem__(self, key: Any) -> Any:
+        if _is_slot_key(key) and key < len(self._kind):
+            kind = self._kind[key]
+            if kind == _FLOAT:
+                return self._values[key]
+            if kind == _INT:
+                return int(self._values[key])
+        return self._other[key]
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        if isinstance(value, float):
+            kind = _FLOAT
+        elif isinstance(value, int) and not isinstance(value, bool) and -_INT_LIMIT <= value <= _INT_LIMIT:
+            kind = _INT
+        else:
+            kind = _ABSENT
+        slot = self._slot(key, grow=kind != _ABSENT)
+
+        if kind != _ABSENT and slot >= 0:
+            if self._kind[slot] == _ABSENT and self._other.pop(key, _MISSING) is _MISSING:
+                self._n += 1
+            self._values[slot] = value
+            self._kind[slot] = kind
+            return
+
+        if slot >= 0 and self._kind[slot] != _ABSENT:
+            self._kind[slot] = _ABSENT
+            self._n -= 1
+        if key not in self._other:
+            self._n += 1
+        self._other[key] = value
+
+    def __delitem__(self, key: Any) -> None:
+        if _is_slot_key(key) and key < len(self._kind) and self._kind[key] != _ABSENT:
+            self._kind[key] = _ABSENT
+        else:
+            del self._other[key]
+        self._n -= 1
+
+    def __contains__(self, key: object) -> bool:
+        if _is_slot_key(key) and key < len(self._kind) and self._kind[key] != _ABSENT:  # type: ignore[operator]
+            return True
+        return key in self._other
+
+    def __iter__(self) -> Iterator[Any]:
+        kind = self._kind
+        yield from (i for i in range(len(kind)) if kind[i])
+        yield from self._other
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __repr__(self) -> str:
+        return f"CompactMeasurements({dict(self.items())!r})"
+
+    def numeric(self) -> tuple[Any, Any]:
+        """``(ids, values)`` of the array-backed entries in ID order.
+
+        NumPy int64/float64 arrays when NumPy is installed, otherwise
+        ``array('q')`` and ``array('d')``.
+        """
+        if np is not None:
+            kinds = np.frombuffer(bytes(self._kind), dtype=np.uint8)
+            ids = np.flatnonzero(kinds).astype(np.int64)
+            return ids, np.frombuffer(self._values, dtype=np.float64)[ids]
+        ids = array("q", (i for i, k in enumerate(self._kind) if k))
+        return ids, array("d", (self._values[i] for i in ids))
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the dense storage (the side dict is not counted)."""
+        return self._values.itemsize * len(self._values) + len(self._kind)
+
+
+VerdictListener = Callable[[Any, Any, Any], None]
+
+
+class _VerdictListeners:
+    """Listeners called as ``listener(id, old, new)`` after each verdict change."""
+
+    _listeners: list[VerdictListener]
+
+    def add_listener(self, listener: VerdictListener) -> None:
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: VerdictListener) -> None:
+        self._listeners.remove(listener)
+
+    def _notify(self, key: Any, old: Any, new: Any) -> None:
+        for listener in list(self._listeners):
+            listener(key, old, new)
+
+
+class CompactVerdicts(_VerdictListeners, MutableMapping):
+    """``{id: verdict}`` with PASS/FAIL/SKIP stored as one byte per ID and counted incrementally."""
+
+    def __init__(self, data: Any = None) -> None:
+        self._codes = bytearray()
+        self._other: dict[Any, Any] = {}
+        self._counts = [0, 0, 0, 0, 0]  # index = verdict code of the value; [0] unused, [4] = other values
+        self._listeners = []
+        if data:
+            self.update(data)
+
+    def _code_at(self, key: Any) -> int:
+        code = self._codes[key] if _is_slot_key(key) and key < len(self._codes) else 0
+        return code or (_OTHER if key in self._other else 0)
+
+    def __getitem__(self, key: Any) -> Any:
+        code = self._code_at(key)
+        if code == 0:
+            raise KeyError(key)
+        if code == _OTHER:
+            return self._other[key]
+        return _VERDICT_NAMES[code]
+
+    def _uncount(self, key: Any, code: int) -> None:
+        # Side-dict entries count by value: a PASS at an ID past the array is still a PASS.
+        self._counts[_verdict_code(self._other[key]) if code == _OTHER else code] -= 1
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        old = self._code_at(key)
+        prev = self[key] if old and self._listeners else None
+        if old:
+            self._uncount(key, old)
+        if old == _OTHER:
+            del self._other[key]
+        elif old:
+            self._codes[key] = 0
+
+        bucket = code = _verdict_code(value)
+        if code != _OTHER and _is_slot_key(key):
+            size = len(self._codes)
+            if key >= size:
+                new_size = _grow_to(key, size)
+                if new_size < 0:
+                    code = _OTHER
+                else:
+                    self._codes.extend(bytes(new_size - size))
+        else:
+            code = _OTHER
+        if code == _OTHER:
+            self._other[key] = value
+        else:
+            self._codes[key] = code
+        self._counts[bucket] += 1
+        if self._listeners:
+            self._notify(key, prev, value)
+
+    def __delitem__(self, key: Any) -> None:
+        code = self._code_at(key)
+        if code == 0:
+            raise KeyError(key)
+        prev = self[key] if self._listeners else None
+        self._uncount(key, code)
+        if code == _OTHER:
+            del self._other[key]
+        else:
+            self._codes[key] = 0
+        if self._listeners:
+            self._notify(key, prev, None)
+
+    def __contains__(self, key: object) -> bool:
+        return self._code_at(key) != 0
+
+    def __iter__(self) -> Iterator[Any]:
+        codes = self._codes
+        yield from (i for i in range(len(codes)) if codes[i])
+        yield from self._other
+
+    def __len__(self) -> int:
+        return sum(self._counts)
+
+    def __repr__(self) -> str:
+        return f"CompactVerdicts({dict(self.items())!r})"
+
+    def __reduce__(self):
+        # Copies/pickles keep the data but not the listeners.
+        return (self.__class__, (dict(self.items()),))
+
+    def verdict_counts(self) -> tuple[int, int, int, int]:
+        """``(n_pass, n_fail, n_skip, n_total)``, maintained on every write."""
+        c = self._counts
+        return c[1], c[2], c[3], c[1] + c[2] + c[3] + c[4]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._codes)
+
+
+def overall_of(verdicts: Any) -> str:
+    """``Result.overall`` for a verdicts mapping: O(1) when it keeps ``verdict_counts()``."""
+    counts = getattr(verdicts, "verdict_counts", None)
+    if counts is not None:
+        n_pass, n_fail, n_skip, n = counts()
+        if not n: return "SKIP"
+        if n_fail: return "FAIL"
+        if n_skip == n: return "SKIP"
+        if n_pass == n: return "PASS"
+        return "PARTIAL"
+    vals = list(verdicts.values())
+    if not vals: return "SKIP"
+    if any(v == "FAIL" for v in vals): return "FAIL"
+    if all(v == "SKIP" for v in vals): return "SKIP"
+    if all(v == "PASS" for v in vals): return "PASS"
+    return "PARTIAL"
+
+
+class TrackedVerdicts(_VerdictListeners, dict):
+    """A dict of ``{id: verdict}`` that keeps PASS/FAIL/SKIP counts on every write.
+
+    Every mutating dict method is overridden so the counts stay right and
+    listeners are called as ``listener(id, old, new)`` after each change, with
+    ``None`` for a missing side (``new`` is ``None`` on delete).
+    """
+
+    def __init__(self, data: Any = None) -> None:
+        super().__init__()
+        self._listeners = []
+        self._counts = [0, 0, 0, 0, 0]
+        if data:
+            self.update(data)
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        old = dict.get(self, key, _MISSING)
+        dict.__setitem__(self, key, value)
+        if old is not _MISSING:
+            self._counts[_verdict_code(old)] -= 1
+        self._counts[_verdict_code(value)] += 1
+        if self._listeners:
+            self._notify(key, None if old is _MISSING else old, value)
+
+    def __delitem__(self, key: Any) -> None:
+        old = dict.pop(self, key)
+        self._counts[_verdict_code(old)] -= 1
+        if self._listeners:
+            self._notify(key, old, None)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for k, v in dict(*args, **kwargs).items():
+            self[k] = v
+
+    def __ior__(self, other: Any) -> "TrackedVerdicts":
+        self.update(other)
+        return self
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def pop(self, key: Any, *default: Any) -> Any:
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        value = dict.__getitem__(self, key)
+        del self[key]
+        return value
+
+    def popitem(self) -> tuple[Any, Any]:
+        if not self:
+            raise KeyError("popitem(): dictionary is empty")
+        key = next(reversed(self.keys()))
+        return key, self.pop(key)
+
+    def clear(self) -> None:
+        for key in list(self):
+            del self[key]
+
+    def __repr__(self) -> str:
+        return f"TrackedVerdicts({dict.__repr__(self)})"
+
+    def __reduce__(self):
+        # Copies/pickles keep the data but not the listeners.
+        return (self.__class__, (dict(self),))
+
+    def verdict_counts(self) -> tuple[int, int, int, int]:
+        """``(n_pass, n_fail, n_skip, n_total)``, maintained on every write."""
+        c = self._counts
+        return c[1], c[2], c[3], c[1] + c[2] + c[3] + c[4]
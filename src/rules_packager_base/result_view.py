@@ -0,0 +1,369 @@
+"""
+result_view.py
+
+Random access to a large ``results.json`` without loading it. A sidecar index
+(``results.json.idx``) holds the byte span of every measurement, verdict,
+criterion and log entry; ``ResultView`` memory-maps the JSON and decodes only
+what is asked for.
+
+    with ResultView("results/PSU-001/results.json") as rv:
+        rv.measurements[12345]        # one json.loads of a few bytes
+        rv.verdicts.get(7)
+        rv.log[-20:]                  # last 20 log entries
+        rv.overall
+
+The index is built on first open by one regex pass over the file (strings and
+structural characters only) and reused while the file's size and mtime match.
+If the sidecar cannot be written, the index is kept in memory only.
+
+Sidecar layout: b"RPRI" | u32 header length | header JSON | packed int64 arrays
+(per section: ids, starts, ends; for the log: starts, ends).
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Mapping, Sequence
+import json
+import mmap
+import os
+from pathlib import Path
+import re
+import struct
+import sys
+from typing import Any, Iterator
+
+from .result_store import overall_of
+
+
+INDEX_SUFFIX = ".idx"
+_MAGIC = b"RPRI"
+_VERSION = 2
+_PREAMBLE = struct.Struct("<4sI")
+
+_MAP_SECTIONS = ("measurements", "verdicts", "criteria")
+
+# JSON strings (skipped whole) and structural characters; numbers and literals
+# are never matched, their spans fall between separators.
+_TOKEN_RE = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\],:]')
+
+# Keys written by Result.to_json() for int IDs; anything else ("01", "1_0", " 1") stays a string.
+_INT_KEY_RE = re.compile(r"0|-?[1-9][0-9]*")
+
+_INT64_MIN, _INT64_MAX = -(2**63), 2**63 - 1
+
+_QUOTE, _LBRACE, _RBRACE, _LBRACKET, _RBRACKET, _COMMA, _COLON = b'"{}[],:'
+
+
+class ResultIndexError(ValueError):
+    pass
+
+
+def index_path_for(path: str | Path) -> Path:
+    p = Path(path)
+    return p.with_name(p.name + INDEX_SUFFIX)
+
+
+def _key(buf: Any, start: int, end: int) -> Any:
+    raw = bytes(buf[start:end])
+    key = json.loads(raw) if b"\\" in raw else raw[1:-1].decode("utf-8")
+    return int(key) if _INT_KEY_RE.fullmatch(key) else key
+
+
+def _scan(buf: Any) -> dict[str, Any]:
+    """Byte spans of the top-level members and of each member of the indexed sections."""
+    top: dict[str, list[int]] = {}
+    sections: dict[str, tuple[Any, array, array]] = {name: (array("q"), array("q"), array("q")) for name in _MAP_SECTIONS}
+    log_starts, log_ends = array("q"), array("q")
+
+    # One frame per open container: [is_object, depth, member_start, key, expecting_key]
+    stack: list[list[Any]] = []
+    for m in _TOKEN_RE.finditer(buf):
+        pos = m.start()
+        c = buf[pos]
+        if c == _QUOTE:
+            if stack and stack[-1][0] and stack[-1][4]:
+                frame = stack[-1]
+                if frame[1] <= 2:  # only keys of the top object and of its sections are needed
+                    frame[3] = _key(buf, pos, m.end())
+                frame[4] = False
+            continue
+
+        if c == _COLON:
+            stack[-1][2] = m.end()
+            continue
+
+        if c == _LBRACE or c == _LBRACKET:
+            is_object = c == _LBRACE
+            # Object members start at their ':'; array elements right after '[' or ','.
+            stack.append([is_object, len(stack) + 1, None if is_object else m.end(), None, is_object])
+            continue
+
+        # ',' or a closing bracket ends the current member of the innermost container.
+        frame = stack[-1]
+        depth = frame[1]
+        if depth <= 2 and frame[2] is not None:
+            start, end = frame[2], pos
+            if depth == 1:
+                top[frame[3]] = [start, end]
+            else:
+                section = stack[0][3]
+                if not frame[0] and section == "log":
+                    if c == _COMMA or buf[start:end].strip():
+                        log_starts.append(start)
+                        log_ends.append(end)
+                elif frame[0] and section in sections and frame[3] is not None:
+                    ids, starts, ends = sections[section]
+                    key = frame[3]
+                    if isinstance(ids, array) and not (type(key) is int and _INT64_MIN <= key <= _INT64_MAX):
+                        # Keys that do not fit the int64 array: keep them all in a list.
+                        ids = list(ids)
+                        sections[section] = (ids, starts, ends)
+                    ids.append(key)
+                    starts.append(start)
+                    ends.append(end)
+        if c == _COMMA:
+            frame[2] = None if frame[0] else m.end()
+            frame[3] = None
+            frame[4] = frame[0]
+        else:
+            stack.pop()
+
+    if stack:
+        raise ResultIndexError("Truncated JSON (unclosed container)")
+    return {"top": top, "sections": sections, "log": (log_starts, log_ends)}
+
+
+def build_index(path: str | Path) -> dict[str, Any]:
+    """Scan ``path`` (a results.json) and return its in-memory index."""
+    p = Path(path)
+    st = p.stat()
+    with p.open("rb") as f:
+        if st.st_size == 0:
+            raise ResultIndexError(f"Empty results file: {p}")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            try:
+                idx = _scan(mm)
+            except (IndexError, ValueError) as e:
+                raise ResultIndexError(f"Cannot index {p}: {e}")
+    idx["size"] = st.st_size
+    idx["mtime_ns"] = st.st_mtime_ns
+    return idx
+
+
+def _pack(a: array) -> bytes:
+    if sys.byteorder == "big":
+        a = array("q", a)
+        a.byteswap()
+    return a.tobytes()
+
+
+def write_index(path: str | Path, idx: dict[str, Any]) -> Path:
+    out = index_path_for(path)
+    arrays: list[array] = []
+    blocks: list[list[Any]] = []
+    for name, cols in idx["sections"].items():
+        # Non-int keys cannot go in the int64 array; they stay in the header.
+        if all(type(k) is int for k in cols[0]):
+            blocks.append([name, len(cols[0])])
+            arrays.extend(cols)
+        else:
+            blocks.append([name, len(cols[0]), list(cols[0])])
+            arrays.extend(cols[1:])
+    blocks.append(["log", len(idx["log"][0])])
+    arrays.extend(idx["log"])
+    header = json.dumps(
+        {"version": _VERSION, "size": idx["size"], "mtime_ns": idx["mtime_ns"], "top": idx["top"], "blocks": blocks},
+        ensure_ascii=False,
+    ).encode("utf-8")
+    tmp = out.with_name(out.name + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(_PREAMBLE.pack(_MAGIC, len(header)))
+        f.write(header)
+        for a in arrays:
+            f.write(_pack(a))
+    os.replace(tmp, out)
+    return out
+
+
+def read_index(path: str | Path) -> dict[str, Any] | None:
+    """Sidecar index of ``path`` if it exists and matches the file's size and mtime."""
+    p = Path(path)
+    try:
+        st = p.stat()
+        data = index_path_for(p).read_bytes()
+    except OSError:
+        return None
+    if len(data) < _PREAMBLE.size:
+        return None
+    magic, header_len = _PREAMBLE.unpack_from(data)
+    if magic != _MAGIC:
+        return None
+    pos = _PREAMBLE.size + header_len
+    try:
+        header = json.loads(data[_PREAMBLE.size : pos].decode("utf-8"))
+    except ValueError:
+        return None
+    if header.get("version") != _VERSION or header.get("size") != st.st_size or header.get("mtime_ns") != st.st_mtime_ns:
+        return None
+
+    def take(n: int) -> array:
+        nonlocal pos
+        a = array("q")
+        a.frombytes(data[pos : pos + 8 * n])
+        if sys.byteorder == "big":
+            a.byteswap()
+        pos += 8 * n
+        return a
+
+    sections: dict[str, tuple[Any, array, array]] = {}
+    log: tuple[array, array] = (array("q"), array("q"))
+    for block in header["blocks"]:
+        name, n = block[0], block[1]
+        if name == "log":
+            log = (take(n), take(n))
+        elif len(block) > 2:
+            sections[name] = (block[2], take(n), take(n))
+        else:
+            sections[name] = (take(n), take(n), take(n))
+    if pos != len(data):
+        return None
+    return {"size": header["size"], "mtime_ns": header["mtime_ns"], "top": header["top"], "sections": sections, "log": log}
+
+
+class _SectionView(Mapping):
+    """Read-only ``{id: value}`` over one indexed object of the results file."""
+
+    def __init__(self, mm: Any, ids: Any, starts: array, ends: array) -> None:
+        self._mm = mm
+        self._ids = ids
+        self._starts = starts
+        self._ends = ends
+        self._pos: dict[Any, int] | None = None
+        # IDs written in order without gaps (the common case) need no lookup table.
+        n = len(ids)
+        self._base = ids[0] if n and type(ids[0]) is int and ids[-1] - ids[0] == n - 1 and _is_increasing(ids) else None
+
+    def _where(self, key: Any) -> int:
+        if self._base is not None:
+            i = key - self._base if type(key) is int else -1
+            if 0 <= i < len(self._ids):
+                return i
+            raise KeyError(key)
+        if self._pos is None:
+            self._pos = {k: i for i, k in enumerate(self._ids)}
+        return self._pos[key]
+
+    def __getitem__(self, key: Any) -> Any:
+        i = self._where(key)
+        return json.loads(self._mm[self._starts[i] : self._ends[i]])
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            self._where(key)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+def _is_increasing(ids: Any) -> bool:
+    return all(a < b for a, b in zip(ids, ids[1:]))
+
+
+class _LogView(Sequence):
+    """Read-only list of log entries; indexing and slicing decode only those entries."""
+
+    def __init__(self, mm: Any, starts: array, ends: array) -> None:
+        self._mm = mm
+        self._starts = starts
+        self._ends = ends
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __getitem__(self, i: Any) -> Any:
+        if isinstance(i, slice):
+            return [self._entry(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("log index out of range")
+        return self._entry(i)
+
+    def _entry(self, i: int) -> Any:
+        return json.loads(self._mm[self._starts[i] : self._ends[i]])
+
+
+class ResultView:
+    """Memory-mapped, read-only view of a results.json (see module docstring)."""
+
+    def __init__(self, path: str | Path, *, write_sidecar: bool = True) -> None:
+        self.path = Path(path)
+        idx = read_index(self.path)
+        if idx is None:
+            idx = build_index(self.path)
+            if write_sidecar:
+                try:
+                    write_index(self.path, idx)
+                except OSError:
+                    pass
+        self._f = self.path.open("rb")
+        try:
+            self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._f.close()
+            raise
+        if self._mm.size() != idx["size"]:
+            self.close()
+            raise ResultIndexError(f"{self.path} changed while opening; retry")
+        self._top: dict[str, list[int]] = idx["top"]
+        empty = (array("q"), array("q"), array("q"))
+        self.measurements = _SectionView(self._mm, *idx["sections"].get("measurements", empty))
+        self.verdicts = _SectionView(self._mm, *idx["sections"].get("verdicts", empty))
+        self.criteria = _SectionView(self._mm, *idx["sections"].get("criteria", empty))
+        self.log = _LogView(self._mm, *idx["log"])
+
+    def _top_value(self, key: str, default: Any = None) -> Any:
+        span = self._top.get(key)
+        if span is None:
+            return default
+        return json.loads(self._mm[span[0] : span[1]])
+
+    @property
+    def test_name(self) -> str:
+        return self._top_value("test_name", "") or ""
+
+    @property
+    def overall(self) -> str:
+        # Stored by to_json(); recomputed from the verdicts for files without it.
+        stored = self._top_value("overall")
+        if stored is not None:
+            return stored
+        return overall_of(dict(self.verdicts.items()))
+
+    @property
+    def evidence(self) -> list[Any]:
+        return self._top_value("evidence", []) or []
+
+    def to_result(self) -> Any:
+        from .Result import Result
+
+        return Result.from_json_file(str(self.path))
+
+    def close(self) -> None:
+        mm = getattr(self, "_mm", None)
+        if mm is not None and not mm.closed:
+            mm.close()
+        self._f.close()
+
+    def __enter__(self) -> "ResultView":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
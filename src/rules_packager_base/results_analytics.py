@@ -0,0 +1,429 @@
+"""
+results_analytics.py
+
+Cross-run analytics over a GUI project's ``results/`` tree
+(``results/<test>/[...]/results.json``, one file per run; ``results.jsonl``
+journals and ``results.rpb`` binary saves are read too).
+
+    from rules_packager_base.results_analytics import scan_results
+
+    table = scan_results("project/results")      # parallel, cached by file stat
+    for s in table.stats().values():
+        print(s.meas_id, s.n, s.mean, s.std, s.yield_, s.cpk)
+
+The table is columnar, one row per (run, measurement ID): ``run`` (index into
+``table.runs``), ``meas_id``, ``value`` (NaN when not numeric) and ``verdict``
+(0 none, 1 PASS, 2 FAIL, 3 SKIP, 4 other). A verdict is filed under the
+measurement(s) its criterion refers to (``ref``/``refs``; the rule's own ID when
+there is no criterion), and the worst one wins. Spec limits for Cpk come from the
+``criteria`` of the most recent run that defines them.
+
+    python -m rules_packager_base.results_analytics project/results [--json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import dataclasses
+import json
+import math
+import os
+from array import array
+from pathlib import Path
+import sys
+import threading
+from typing import Any, Iterable, Iterator
+
+from .result_binary import decode as decode_binary, is_binary
+from .result_journal import is_journal, replay_journal
+from .result_store import overall_of
+
+try:  # optional: ResultsTable.to_numpy()
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when NumPy is absent
+    np = None  # type: ignore[assignment]
+
+
+RESULT_FILE_NAMES = ("results.json", "results.jsonl", "results.rpb")
+
+VERDICT_CODES = {"PASS": 1, "FAIL": 2, "SKIP": 3}
+_OTHER_VERDICT = 4
+
+# Several rules may judge one measurement; its row keeps the worst verdict
+# (indexed by code: none < SKIP < PASS < other < FAIL).
+_VERDICT_RANK = (0, 2, 4, 1, 3)
+
+# Criterion types -> which limit fields bound the referenced measurement.
+_LOWER_UPPER_TYPES = {"within_pct", "within_abs", "range_abs"}
+_UPPER_TYPES = {"lt_abs", "le_abs"}
+_LOWER_TYPES = {"gt_abs", "ge_abs"}
+
+
+class ResultsScanError(RuntimeError):
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class RunInfo:
+    path: str
+    test_name: str
+    overall: str
+    mtime_ns: int
+
+
+@dataclasses.dataclass(frozen=True)
+class _RunRows:
+    info: RunInfo
+    meas_id: array  # array('q')
+    value: array  # array('d')
+    verdict: bytes
+    limits: dict[int, tuple[float | None, float | None]]
+
+
+@dataclasses.dataclass(frozen=True)
+class MeasStats:
+    meas_id: int
+    n: int  # rows (runs that recorded this ID)
+    n_numeric: int
+    mean: float
+    std: float  # sample standard deviation
+    min: float
+    max: float
+    n_pass: int
+    n_fail: int
+    yield_: float  # n_pass / (n_pass + n_fail); NaN without verdicts
+    lsl: float | None
+    usl: float | None
+    cpk: float | None
+
+
+class ResultsCache:
+    """In-process cache of parsed result files keyed by ``(path, size, mtime_ns)``.
+
+    Safe to share between scan threads. Entries beyond ``max_entries`` are
+    dropped oldest-first.
+    """
+
+    def __init__(self, *, max_entries: int = 100_000) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[int, int, _RunRows]] = {}
+
+    def get(self, path: str, size: int, mtime_ns: int) -> _RunRows | None:
+        with self._lock:
+            hit = self._entries.get(path)
+        if hit is None or hit[0] != size or hit[1] != mtime_ns:
+            return None
+        return hit[2]
+
+    def put(self, path: str, size: int, mtime_ns: int, rows: _RunRows) -> None:
+        with self._lock:
+            self._entries.pop(path, None)
+            self._entries[path] = (size, mtime_ns, rows)
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_DEFAULT_CACHE = ResultsCache()
+
+
+def _as_float(v: Any) -> float:
+    if isinstance(v, bool) or not isinstance(v, (int, float)):
+        return math.nan
+    return float(v)
+
+
+def _limits(criteria: dict[str, Any]) -> dict[int, tuple[float | None, float | None]]:
+    out: dict[int, tuple[float | None, float | None]] = {}
+    for crit_id, crit in criteria.items():
+        if not isinstance(crit, dict):
+            continue
+        kind = crit.get("type")
+        try:
+            ref = int(crit.get("ref", crit_id))
+            if kind in _LOWER_UPPER_TYPES:
+                out[ref] = (float(crit["lower"]), float(crit["upper"]))
+            elif kind in _UPPER_TYPES:
+                out[ref] = (None, float(crit["limit"]))
+            elif kind in _LOWER_TYPES:
+                out[ref] = (float(crit["limit"]), None)
+        except (KeyError, TypeError, ValueError):
+            continue
+    return out
+
+
+def _int_keyed(section: Any, what: str, path: Path) -> dict[int, Any]:
+    if not isinstance(section, dict):
+        raise ResultsScanError(f"Expected an object of {what}s in {path}")
+    try:
+        return {int(k): v for k, v in section.items()}
+    except (TypeError, ValueError) as e:
+        raise ResultsScanError(f"Bad {what} ID in {path}: {e}")
+
+
+def _refs(crit: Any, rule_id: int, path: Path) -> list[int]:
+    """Measurement IDs a verdict is about: the criterion's ref/refs, else the rule's own ID."""
+    if not isinstance(crit, dict):
+        return [rule_id]
+    refs = crit["refs"] if "refs" in crit else [crit.get("ref", rule_id)]
+    try:
+        return [int(r) for r in refs]
+    except (TypeError, ValueError) as e:
+        raise ResultsScanError(f"Bad ref in criterion {rule_id} of {path}: {e}")
+
+
+def _load_rows(path: Path, mtime_ns: int) -> _RunRows:
+    try:
+        if is_binary(path):
+            data = decode_binary(path.read_bytes())
+        elif is_journal(path):
+            data = replay_journal(path, with_log=False)
+        else:
+            with path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+    except (OSError, ValueError, KeyError) as e:
+        raise ResultsScanError(f"Failed to read result file: {path}: {e}")
+    if not isinstance(data, dict):
+        raise ResultsScanError(f"Not a Result JSON object: {path}")
+
+    meas = _int_keyed(data.get("measurements") or {}, "measurement", path)
+    verd = _int_keyed(data.get("verdicts") or {}, "verdict", path)
+    criteria = _int_keyed(data.get("criteria") or {}, "criterion", path)
+    ids = sorted(meas)
+    worst: dict[int, int] = {}
+    for rid, v in verd.items():
+        code = VERDICT_CODES.get(v, _OTHER_VERDICT)
+        for ref in _refs(criteria.get(rid), rid, path):
+            if ref in meas and _VERDICT_RANK[code] > _VERDICT_RANK[worst.get(ref, 0)]:
+                worst[ref] = code
+    codes = bytes(worst.get(i, 0) for i in ids)
+
+    info = RunInfo(
+        path=str(path),
+        test_name=str(data.get("test_name") or ""),
+        overall=str(data.get("overall") or overall_of(verd)),
+        mtime_ns=mtime_ns,
+    )
+    return _RunRows(
+        info=info,
+        meas_id=array("q", ids),
+        value=array("d", (_as_float(meas.get(i)) for i in ids)),
+        verdict=codes,
+        limits=_limits(criteria),
+    )
+
+
+def _load_cached(path: Path, cache: ResultsCache | None) -> _RunRows:
+    try:
+        st = path.stat()
+    except OSError as e:
+        raise ResultsScanError(f"Failed to stat result file: {path}: {e}")
+    key = str(path)
+    if cache is not None:
+        hit = cache.get(key, st.st_size, st.st_mtime_ns)
+        if hit is not None:
+            return hit
+    rows = _load_rows(path, st.st_mtime_ns)
+    if cache is not None:
+        cache.put(key, st.st_size, st.st_mtime_ns, rows)
+    return rows
+
+
+def find_result_files(results_dir: str | Path, *, names: Iterable[str] = RESULT_FILE_NAMES) -> list[Path]:
+    """All result files under ``results_dir``, sorted by path."""
+    wanted = set(names)
+    out: list[Path] = []
+    for root, dirs, files in os.walk(results_dir):
+        dirs.sort()
+        out.extend(Path(root) / f for f in sorted(files) if f in wanted)
+    return sorted(out)
+
+
+@dataclasses.dataclass
+class ResultsTable:
+    runs: list[RunInfo]
+    run: array  # array('l'): index into runs
+    meas_id: array  # array('q')
+    value: array  # array('d')
+    verdict: bytearray
+    limits: dict[int, tuple[float | None, float | None]]
+
+    def __len__(self) -> int:
+        return len(self.meas_id)
+
+    def rows(self) -> Iterator[tuple[RunInfo, int, float, int]]:
+        for r, i, v, c in zip(self.run, self.meas_id, self.value, self.verdict):
+            yield self.runs[r], i, v, c
+
+    def to_numpy(self) -> dict[str, Any]:
+        if np is None:
+            raise ResultsScanError("NumPy is not installed")
+        return {
+            "run": np.frombuffer(self.run, dtype=np.int64 if self.run.itemsize == 8 else np.int32).astype(np.int64),
+            "meas_id": np.frombuffer(self.meas_id, dtype=np.int64),
+            "value": np.frombuffer(self.value, dtype=np.float64),
+            "verdict": np.frombuffer(bytes(self.verdict), dtype=np.uint8),
+        }
+
+    def run_yield(self) -> float:
+        """Fraction of runs whose overall verdict is PASS (NaN with no runs)."""
+        if not self.runs:
+            return math.nan
+        return sum(1 for r in self.runs if r.overall == "PASS") / len(self.runs)
+
+    def stats(self, ids: Iterable[int] | None = None) -> dict[int, MeasStats]:
+        """Per-ID statistics, yield and Cpk, keyed by measurement ID in ID order."""
+        wanted = None if ids is None else set(ids)
+        # Sums are taken relative to the first value seen per ID, which keeps
+        # the variance accurate for values with a large common offset.
+        acc: dict[int, list[float]] = {}  # id -> [n, n_num, shift, s, ss, min, max, n_pass, n_fail]
+        for i, v, c in zip(self.meas_id, self.value, self.verdict):
+            if wanted is not None and i not in wanted:
+                continue
+            a = acc.get(i)
+            if a is None:
+                a = acc[i] = [0, 0, math.nan, 0.0, 0.0, math.inf, -math.inf, 0, 0]
+            a[0] += 1
+            if v == v:
+                if a[1] == 0:
+                    a[2] = v
+                a[1] += 1
+                d = v - a[2]
+                a[3] += d
+                a[4] += d * d
+                if v < a[5]:
+                    a[5] = v
+                if v > a[6]:
+                    a[6] = v
+            if c == 1:
+                a[7] += 1
+            elif c == 2:
+                a[8] += 1
+
+        out: dict[int, MeasStats] = {}
+        for i in sorted(acc):
+            n, n_num, shift, s, ss, lo, hi, n_pass, n_fail = acc[i]
+            mean = shift + s / n_num if n_num else math.nan
+            std = math.sqrt(max(ss - s * s / n_num, 0.0) / (n_num - 1)) if n_num > 1 else math.nan
+            lsl, usl = self.limits.get(i, (None, None))
+            out[i] = MeasStats(
+                meas_id=i,
+                n=int(n),
+                n_numeric=int(n_num),
+                mean=mean,
+                std=std,
+                min=lo if n_num else math.nan,
+                max=hi if n_num else math.nan,
+                n_pass=int(n_pass),
+                n_fail=int(n_fail),
+                yield_=n_pass / (n_pass + n_fail) if n_pass + n_fail else math.nan,
+                lsl=lsl,
+                usl=usl,
+                cpk=cpk(mean, std, lsl, usl),
+            )
+        return out
+
+
+def cpk(mean: float, std: float, lsl: float | None, usl: float | None) -> float | None:
+    """Process capability index; one-sided when only one limit exists. None without limits or spread."""
+    if (lsl is None and usl is None) or not (std > 0) or mean != mean:
+        return None
+    sides = []
+    if usl is not None:
+        sides.append((usl - mean) / (3.0 * std))
+    if lsl is not None:
+        sides.append((mean - lsl) / (3.0 * std))
+    return min(sides)
+
+
+def scan_results(
+    results_dir: str | Path,
+    *,
+    names: Iterable[str] = RESULT_FILE_NAMES,
+    workers: int = 0,
+    cache: ResultsCache | bool = True,
+) -> ResultsTable:
+    """Load every result file under ``results_dir`` into one columnar table.
+
+    Files are parsed on ``workers`` threads (0 = auto, 1 = serial). Parsed
+    files are kept in ``cache`` (default: a process-wide ``ResultsCache``)
+    keyed by size and mtime, so rescanning an unchanged tree only stats it.
+    Runs are ordered by path.
+    """
+    store = _DEFAULT_CACHE if cache is True else (cache or None)
+    paths = find_result_files(results_dir, names=names)
+    if workers == 1 or len(paths) < 2:
+        parsed = [_load_cached(p, store) for p in paths]
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers or None) as executor:
+            parsed = list(executor.map(lambda p: _load_cached(p, store), paths))
+
+    table = ResultsTable(runs=[], run=array("l"), meas_id=array("q"), value=array("d"), verdict=bytearray(), limits={})
+    limits_mtime: dict[int, int] = {}
+    for idx, rows in enumerate(parsed):
+        table.runs.append(rows.info)
+        table.run.extend([idx] * len(rows.meas_id))
+        table.meas_id.extend(rows.meas_id)
+        table.value.extend(rows.value)
+        table.verdict.extend(rows.verdict)
+        for i, lim in rows.limits.items():
+            if rows.info.mtime_ns >= limits_mtime.get(i, -1):
+                table.limits[i] = lim
+                limits_mtime[i] = rows.info.mtime_ns
+    return table
+
+
+def _fmt(v: float | None) -> str:
+    if v is None or v != v:
+        return "-"
+    return f"{v:.6g}"
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Per-measurement statistics, yield and Cpk across result files")
+    ap.add_argument("results_dir", help="GUI project results/ folder")
+    ap.add_argument("--jobs", type=int, default=0, help="Parse files on N worker threads (default: 0 = auto, 1 = serial)")
+    ap.add_argument("--id", type=int, action="append", default=None, help="Only this measurement ID (repeatable)")
+    ap.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    args = ap.parse_args(argv)
+
+    try:
+        table = scan_results(args.results_dir, workers=int(args.jobs))
+    except ResultsScanError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    stats = table.stats(args.id)
+
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "runs": len(table.runs),
+                    "run_yield": None if not table.runs else table.run_yield(),
+                    "stats": [
+                        {k: (None if isinstance(v, float) and v != v else v) for k, v in dataclasses.asdict(s).items()}
+                        for s in stats.values()
+                    ],
+                },
+                indent=2,
+            )
+        )
+        return 0
+
+    print(f"{len(table.runs)} runs, run yield {_fmt(table.run_yield())}")
+    print(f"{'ID':>6} {'n':>6} {'mean':>12} {'std':>12} {'min':>12} {'max':>12} {'yield':>7} {'Cpk':>8}")
+    for s in stats.values():
+        print(
+            f"{s.meas_id:>6} {s.n:>6} {_fmt(s.mean):>12} {_fmt(s.std):>12} {_fmt(s.min):>12} {_fmt(s.max):>12}"
+            f" {_fmt(s.yield_):>7} {_fmt(s.cpk):>8}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import dataclasses
+from pathlib import Path
+import sqlite3
+import threading
+import time
+import warnings
+
+
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+
+# Bump when the table layout or the meaning of a cached column changes.
+_SCHEMA_VERSION = 1
+
+
+@dataclasses.dataclass(frozen=True)
+class CachedDoc:
+    sha256: str
+    content: str
+    doc_id: str | None
+    title: str | None
+
+
+class RuleDocCache:
+    """Persistent cache of parsed rule docs keyed by file stat signature.
+
+    A row is reused only when ``(path, size, mtime_ns)`` all match, so an
+    unchanged file skips reading, hashing and frontmatter parsing. Rows are
+    evicted least-recently-used first once the stored content exceeds
+    ``max_bytes``.
+
+    Safe to share between the loader's worker threads.
+    """
+
+    def __init__(self, path: Path, *, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.path = Path(path)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._touched: dict[str, int] = {}
+        self._dirty = False
+        self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            return self._open_db()
+        except sqlite3.DatabaseError as e:
+            # A cache must never break a build: drop an unreadable file and start over.
+            warnings.warn(f"Discarding unreadable rule doc cache {self.path}: {e}")
+            self.path.unlink(missing_ok=True)
+            return self._open_db()
+
+    def _open_db(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != _SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS docs")
+                conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS docs ("
+                " path TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " sha256 TEXT NOT NULL,"
+                " doc_id TEXT,"
+                " title TEXT,"
+                " content TEXT NOT NULL,"
+                " nbytes INTEGER NOT NULL,"
+                " last_used INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS docs_last_used ON docs(last_used)")
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def get(self, path: str, size: int, mtime_ns: int) -> CachedDoc | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sha256, content, doc_id, title FROM docs"
+                " WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, size, mtime_ns),
+            ).fetchone()
+            if row is None:
+                return None
+            # Batch LRU bookkeeping; written back in close().
+            self._touched[path] = time.time_ns()
+        return CachedDoc(sha256=row[0], content=row[1], doc_id=row[2], title=row[3])
+
+    def get_meta(self, path: str, size: int, mtime_ns: int) -> tuple[str, str | None, str | None] | None:
+        """Like ``get`` but returns only ``(sha256, doc_id, title)``, without the content."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sha256, doc_id, title FROM docs WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, size, mtime_ns),
+            ).fetchone()
+            if row is None:
+                return None
+            self._touched[path] = time.time_ns()
+        return row[0], row[1], row[2]
+
+    def put(self, path: str, size: int, mtime_ns: int, doc: CachedDoc) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO docs"
+                " (path, size, mtime_ns, sha256, doc_id, title, content, nbytes, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    path,
+                    size,
+                    mtime_ns,
+                    doc.sha256,
+                    doc.doc_id,
+                    doc.title,
+                    doc.content,
+                    size,
+                    time.time_ns(),
+                ),
+            )
+            self._touched.pop(path, None)
+            self._dirty = True
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM docs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        doomed: list[tuple[str]] = []
+        for path, nbytes in self._conn.execute("SELECT path, nbytes FROM docs ORDER BY last_used ASC"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((path,))
+            total -= nbytes
+        self._conn.executemany("DELETE FROM docs WHERE path = ?", doomed)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            try:
+                if self._touched:
+                    self._conn.executemany(
+                        "UPDATE docs SET last_used = ? WHERE path = ?",
+                        [(t, p) for p, t in self._touched.items()],
+                    )
+                    self._touched.clear()
+                    self._dirty = True
+                if self._dirty:
+                    self._evict()
+                    self._conn.commit()
+            finally:
+                self._conn.close()
+                self._conn = None  # type: ignore[assignment]
+
+    def __enter__(self) -> "RuleDocCache":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import collections
+import dataclasses
+import json
+import math
+from pathlib import Path
+import re
+from typing import Any
+
+from .section_index import SectionIndexError, _load_json, _read_spans, load_section_index
+
+
+SEARCH_INDEX_NAME = "search_index.json"
+
+# Bump when tokenization or the layout of search_index.json changes.
+_SCHEMA_VERSION = 1
+
+_WORD_RE = re.compile(r"\w+")
+
+# Okapi BM25 parameters.
+_K1 = 1.2
+_B = 0.75
+
+
+@dataclasses.dataclass(frozen=True)
+class SearchHit:
+    score: float
+    doc_id: str | None
+    source: str | None
+    filename: str
+    heading_path: tuple[str, ...]
+    start: int  # byte offsets of the section in the collected file
+    end: int
+    text: str | None = None
+
+
+def tokenize(text: str) -> list[str]:
+    """Case-folded word tokens; ``MEAS:VOLT?`` -> ``["meas", "volt"]``, ``${V_OUT}`` -> ``["v_out"]``."""
+    return _WORD_RE.findall(text.casefold())
+
+
+def _index_file(data: bytes, sections: list[dict[str, Any]]) -> dict[str, Any]:
+    lengths: list[int] = []
+    terms: dict[str, list[list[int]]] = {}
+    for i, sec in enumerate(sections):
+        counts = collections.Counter(tokenize(data[sec["start"] : sec["end"]].decode("utf-8")))
+        lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            terms.setdefault(term, []).append([i, tf])
+    return {"lengths": lengths, "terms": dict(sorted(terms.items()))}
+
+
+def build_search_index(rules_dir: Path, *, previous: dict[str, Any] | None = None) -> tuple[dict[str, Any], int]:
+    """Build the BM25 index over every section listed in ``sections.json``.
+
+    Postings of a file whose sha256 matches its entry in ``previous`` are
+    reused as-is, so only changed docs are re-tokenized. Returns the index and
+    the number of files that had to be (re)indexed.
+    """
+    sidx = load_section_index(rules_dir)
+    old_files: dict[str, Any] = {}
+    if previous is not None and previous.get("schema_version") == _SCHEMA_VERSION:
+        old_files = previous.get("files") or {}
+
+    files: dict[str, dict[str, Any]] = {}
+    reindexed = 0
+    for filename, finfo in (sidx.get("files") or {}).items():
+        old = old_files.get(filename)
+        if old is not None and old.get("sha256") == finfo["sha256"]:
+            files[filename] = old
+            continue
+        try:
+            data = (rules_dir / filename).read_bytes()
+        except OSError as e:
+            raise SectionIndexError(f"Failed to read collected doc: {rules_dir / filename}: {e}")
+        files[filename] = {"sha256": finfo["sha256"], **_index_file(data, finfo["sections"])}
+        reindexed += 1
+
+    n_sections = sum(len(f["lengths"]) for f in files.values())
+    total_len = sum(sum(f["lengths"]) for f in files.values())
+    return (
+        {
+            "schema_version": _SCHEMA_VERSION,
+            "n_sections": n_sections,
+            "avg_len": (total_len / n_sections) if n_sections else 0.0,
+            "files": files,
+        },
+        reindexed,
+    )
+
+
+def write_search_index(rules_dir: Path) -> int:
+    """(Re)build ``search_index.json`` for ``rules_dir`` incrementally.
+
+    Returns the number of files that had to be re-tokenized.
+    """
+    path = rules_dir / SEARCH_INDEX_NAME
+    try:
+        previous = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        previous = None
+
+    idx, reindexed = build_search_index(rules_dir, previous=previous if isinstance(previous, dict) else None)
+    text = json.dumps(idx, ensure_ascii=False, separators=(",", ":"))
+    try:
+        if path.read_text(encoding="utf-8") == text:
+            return reindexed
+    except OSError:
+        pass
+    path.write_text(text, encoding="utf-8")
+    return reindexed
+
+
+def load_search_index(rules_dir: Path) -> dict[str, Any]:
+    path = rules_dir / SEARCH_INDEX_NAME
+    try:
+        idx = _load_json(path)
+    except FileNotFoundError:
+        raise SectionIndexError(f"No search index in {rules_dir} (collect the rules first)")
+    except Exception as e:
+        raise SectionIndexError(f"Failed to read search index: {path}: {e}")
+    if not isinstance(idx, dict) or idx.get("schema_version") != _SCHEMA_VERSION:
+        raise SectionIndexError(f"Unsupported search index (expected schema_version {_SCHEMA_VERSION}): {path}")
+    return idx
+
+
+def search(
+    rules_dir: Path,
+    query: str,
+    *,
+    limit: int = 10,
+    doc_id: str | None = None,
+    with_text: bool = False,
+) -> list[SearchHit]:
+    """Rank the sections of the collected rules in ``rules_dir`` against ``query``.
+
+    Scores are Okapi BM25 over the section's own text (heading included).
+    Ties are broken by manifest and document order, so results are stable.
+    ``with_text`` also returns each section's text, read through mmap.
+    """
+    idx = load_search_index(rules_dir)
+    sidx = load_section_index(rules_dir)
+    qterms = sorted(set(tokenize(query)))
+    if not qterms or limit <= 0:
+        return []
+
+    # First manifest entry per file (aliases from --dedup share one file).
+    owners: dict[str, dict[str, Any]] = {}
+    for d in sidx.get("docs") or []:
+        owners.setdefault(d["filename"], d)
+    order = {fn: i for i, fn in enumerate(owners)}
+
+    files: dict[str, Any] = idx["files"]
+    for fn, f in files.items():
+        if f.get("sha256") != (sidx.get("files") or {}).get(fn, {}).get("sha256"):
+            raise SectionIndexError(f"Search index is stale for {rules_dir / fn} (re-run --collect-rules)")
+    if doc_id is not None:
+        files = {fn: f for fn, f in files.items() if owners.get(fn, {}).get("doc_id") == doc_id}
+
+    n = idx["n_sections"]
+    avg_len = idx["avg_len"] or 1.0
+    scores: dict[tuple[str, int], float] = {}
+    for term in qterms:
+        postings = [(fn, f, p) for fn, f in files.items() for p in f["terms"].get(term, ())]
+        if not postings:
+            continue
+        # df over the whole index, even when filtered by doc_id.
+        df = len(postings) if doc_id is None else sum(len(f["terms"].get(term, ())) for f in idx["files"].values())
+        idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+        for fn, f, (sec, tf) in postings:
+            norm = tf + _K1 * (1.0 - _B + _B * f["lengths"][sec] / avg_len)
+            key = (fn, sec)
+            scores[key] = scores.get(key, 0.0) + idf * tf * (_K1 + 1.0) / norm
+
+    ranked = sorted(scores.items(), key=lambda kv: (-kv[1], order.get(kv[0][0], len(order)), kv[0][1]))[:limit]
+
+    hits: list[SearchHit] = []
+    for (fn, sec), score in ranked:
+        ent = sidx["files"][fn]["sections"][sec]
+        owner = owners.get(fn, {})
+        hits.append(
+            SearchHit(
+                score=round(score, 6),
+                doc_id=owner.get("doc_id"),
+                source=owner.get("source"),
+                filename=fn,
+                heading_path=tuple(ent["heading_path"]),
+                start=ent["start"],
+                end=ent["end"],
+            )
+        )
+
+    if with_text:
+        by_file: dict[str, list[int]] = {}
+        for i, h in enumerate(hits):
+            by_file.setdefault(h.filename, []).append(i)
+        for fn, idxs in by_file.items():
+            spans = [(hits[i].heading_path, hits[i].start, hits[i].end) for i in idxs]
+            for i, (_p, _s, _e, text) in zip(idxs, _read_spans(rules_dir / fn, sidx["files"][fn], spans)):
+                hits[i] = dataclasses.replace(hits[i], text=text)
+    return hits
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import dataclasses
+import functools
+import hashlib
+import json
+import mmap
+from pathlib import Path
+from typing import Any, Iterable
+
+from .sections import split_sections
+
+
+SECTION_INDEX_NAME = "sections.json"
+
+# Bump when the layout of sections.json changes.
+_SCHEMA_VERSION = 1
+
+
+class SectionIndexError(RuntimeError):
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class SectionHit:
+    doc_id: str | None
+    source: str | None
+    filename: str
+    heading_path: tuple[str, ...]
+    start: int  # byte offset in the collected file
+    end: int
+    text: str
+
+
+def _index_file(data: bytes) -> dict[str, Any]:
+    # Offsets are taken from the bytes actually on disk (not the in-memory doc),
+    # so they stay right whatever newline translation happened on write.
+    text = data.decode("utf-8")
+    secs = split_sections(text, level=6)
+
+    entries: list[dict[str, Any]] = []
+    pos = 0
+    for sec in secs:
+        chunk = text[sec.start : sec.end].encode("utf-8")
+        entries.append(
+            {
+                "heading": sec.heading,
+                "level": sec.level,
+                "heading_path": list(sec.heading_path),
+                "start": pos,
+                "end": pos + len(chunk),
+                "sha256": hashlib.sha256(chunk).hexdigest(),
+            }
+        )
+        pos += len(chunk)
+
+    # subtree_end: up to the next heading at the same or a shallower level, i.e.
+    # the section together with its subsections.
+    for i, ent in enumerate(entries):
+        ent["subtree_end"] = ent["end"]
+        if ent["level"] == 0:
+            continue
+        for nxt in entries[i + 1 :]:
+            if nxt["level"] <= ent["level"]:
+                break
+            ent["subtree_end"] = nxt["end"]
+
+    return {
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "n_bytes": len(data),
+        "sections": entries,
+    }
+
+
+def build_section_index(rules_dir: Path, manifest: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Index every heading of the collected docs listed in ``manifest``.
+
+    Files are read back from ``rules_dir``; a file shared by several manifest
+    entries (``--dedup``) is indexed once.
+    """
+    docs: list[dict[str, Any]] = []
+    files: dict[str, dict[str, Any]] = {}
+    for ent in manifest:
+        filename = str(ent["filename"])
+        docs.append(
+            {
+                "index": ent.get("index"),
+                "filename": filename,
+                "doc_id": ent.get("doc_id"),
+                "source": ent.get("source"),
+            }
+        )
+        if filename not in files:
+            try:
+                files[filename] = _index_file((rules_dir / filename).read_bytes())
+            except (OSError, UnicodeDecodeError) as e:
+                raise SectionIndexError(f"Failed to index collected doc: {rules_dir / filename}: {e}")
+
+    return {"schema_version": _SCHEMA_VERSION, "docs": docs, "files": files}
+
+
+def write_section_index(rules_dir: Path, manifest: Iterable[dict[str, Any]]) -> Path:
+    """Build the section index for ``rules_dir`` and write it to ``sections.json``.
+
+    The file is only rewritten when its content changes.
+    """
+    path = rules_dir / SECTION_INDEX_NAME
+    text = json.dumps(build_section_index(rules_dir, manifest), indent=2, ensure_ascii=False)
+    try:
+        if path.read_text(encoding="utf-8") == text:
+            return path
+    except OSError:
+        pass
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@functools.lru_cache(maxsize=16)
+def _load_json_cached(path: str, size: int, mtime_ns: int) -> Any:
+    # Keyed by the file signature so a rewritten index is picked up automatically.
+    # Callers must treat the result as read-only.
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def _load_json(path: Path) -> Any:
+    st = path.stat()
+    return _load_json_cached(str(path), st.st_size, st.st_mtime_ns)
+
+
+def load_section_index(rules_dir: Path) -> dict[str, Any]:
+    path = rules_dir / SECTION_INDEX_NAME
+    try:
+        idx = _load_json(path)
+    except FileNotFoundError:
+        raise SectionIndexError(f"No section index in {rules_dir} (collect the rules first)")
+    except Exception as e:
+        raise SectionIndexError(f"Failed to read section index: {path}: {e}")
+    if not isinstance(idx, dict) or idx.get("schema_version") != _SCHEMA_VERSION:
+        raise SectionIndexError(f"Unsupported section index (expected schema_version {_SCHEMA_VERSION}): {path}")
+    return idx
+
+
+def _heading_matches(ent: dict[str, Any], needle: str) -> bool:
+    heading = ent.get("heading")
+    return heading is not None and needle in heading.casefold()
+
+
+def query_sections(
+    rules_dir: Path,
+    *,
+    doc_id: str | None = None,
+    heading: str | None = None,
+    include_subsections: bool = True,
+) -> list[SectionHit]:
+    """Return sections of the collected docs in ``rules_dir``.
+
+    ``doc_id`` selects docs by exact doc id; ``heading`` selects sections
+    whose heading contains it (case-insensitive). Without ``heading`` each
+    selected doc is returned whole. With ``include_subsections`` a hit spans
+    its nested subsections too, and hits nested in an earlier hit are not
+    repeated.
+
+    Slices are read through a memory map of each file, so only the requested
+    bytes are paged in. Results follow manifest and document order.
+    """
+    idx = load_section_index(rules_dir)
+    files: dict[str, Any] = idx.get("files") or {}
+    needle = heading.casefold() if heading is not None else None
+
+    hits: list[SectionHit] = []
+    for doc in idx.get("docs") or []:
+        if doc_id is not None and doc.get("doc_id") != doc_id:
+            continue
+        filename = doc["filename"]
+        finfo = files.get(filename)
+        if finfo is None:
+            raise SectionIndexError(f"Section index has no entry for {filename!r}: {rules_dir}")
+
+        spans: list[tuple[tuple[str, ...], int, int]] = []
+        if needle is None:
+            spans.append(((), 0, int(finfo["n_bytes"])))
+        else:
+            covered_to = -1
+            for ent in finfo["sections"]:
+                if not _heading_matches(ent, needle) or ent["start"] < covered_to:
+                    continue
+                end = ent["subtree_end"] if include_subsections else ent["end"]
+                spans.append((tuple(ent["heading_path"]), ent["start"], end))
+                if include_subsections:
+                    covered_to = end
+
+        if spans:
+            for path, start, end, text in _read_spans(rules_dir / filename, finfo, spans):
+                hits.append(
+                    SectionHit(
+                        doc_id=doc.get("doc_id"),
+                        source=doc.get("source"),
+                        filename=filename,
+                        heading_path=path,
+                        start=start,
+                        end=end,
+                        text=text,
+                    )
+                )
+    return hits
+
+
+def _read_spans(
+    path: Path,
+    finfo: dict[str, Any],
+    spans: list[tuple[tuple[str, ...], int, int]],
+) -> list[tuple[tuple[str, ...], int, int, str]]:
+    try:
+        with open(path, "rb") as f:
+            size = Path(path).stat().st_size
+            if size != finfo["n_bytes"]:
+                raise SectionIndexError(f"Section index is stale for {path} (re-run --collect-rules)")
+            if size == 0:
+                return [(p, s, e, "") for p, s, e in spans]
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return [(p, s, e, mm[s:e].decode("utf-8")) for p, s, e in spans]
+    except UnicodeDecodeError:
+        # Same size but different content: the offsets no longer fall on characters.
+        raise SectionIndexError(f"Section index is stale for {path} (re-run --collect-rules)")
+    except OSError as e:
+        raise SectionIndexError(f"Failed to read collected doc: {path}: {e}")
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import dataclasses
+import re
+
+
+# Rough BPE-style estimate: every punctuation/symbol character is one token and
+# runs of word characters cost one token per 4 characters. Never matches across
+# a newline, so estimates of line-aligned slices add up to the whole.
+_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+_HEADING_RE = re.compile(r" {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+_FENCE_RE = re.compile(r" {0,3}(`{3,}|~{3,})(.*)$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Deterministic, tokenizer-free estimate of the LLM token count of ``text``."""
+    return sum(1 for _ in _TOKEN_RE.finditer(text))
+
+
+@dataclasses.dataclass(frozen=True)
+class Section:
+    """A heading-delimited slice ``text[start:end]`` of a markdown document.
+
+    The preamble (everything before the first split heading, including any
+    frontmatter) has ``heading=None`` and ``level=0``.
+    """
+
+    heading: str | None
+    level: int
+    heading_path: tuple[str, ...]  # enclosing headings, outermost first, ending with this one
+    start: int
+    end: int
+
+
+def iter_headings(text: str) -> list[tuple[int, int, str]]:
+    """Return ``(offset, level, title)`` for every ATX heading outside code fences."""
+    out: list[tuple[int, int, str]] = []
+    fence: str | None = None
+    pos = 0
+    for line in text.splitlines(keepends=True):
+        stripped = line.rstrip("\r\n")
+        m = _FENCE_RE.match(stripped)
+        if fence is None:
+            if m and not (m.group(1)[0] == "`" and "`" in m.group(2)):
+                fence = m.group(1)
+            else:
+                h = _HEADING_RE.match(stripped)
+                if h:
+                    out.append((pos, len(h.group(1)), (h.group(2) or "").strip()))
+        elif m and m.group(1)[0] == fence[0] and len(m.group(1)) >= len(fence) and not m.group(2).strip():
+            fence = None
+        pos += len(line)
+    return out
+
+
+def split_sections(text: str, *, level: int = 2) -> list[Section]:
+    """Split ``text`` at every heading of ``level`` or shallower.
+
+    Deeper headings stay inside their parent section. Sections are contiguous
+    and cover the whole text, so joining them in order gives ``text`` back. An
+    empty preamble is omitted.
+    """
+    cuts = [(off, lvl, title) for off, lvl, title in iter_headings(text) if lvl <= level]
+
+    sections: list[Section] = []
+    if not cuts or cuts[0][0] > 0:
+        sections.append(Section(None, 0, (), 0, cuts[0][0] if cuts else len(text)))
+
+    stack: list[tuple[int, str]] = []
+    for i, (off, lvl, title) in enumerate(cuts):
+        while stack and stack[-1][0] >= lvl:
+            stack.pop()
+        stack.append((lvl, title))
+        end = cuts[i + 1][0] if i + 1 < len(cuts) else len(text)
+        sections.append(Section(title, lvl, tuple(t for _, t in stack), off, end))
+    return sections
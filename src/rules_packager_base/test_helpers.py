@@ -25,12 +25,23 @@ and test frameworks to ensure reliable data collection, operator interaction, an
 automated and manual test steps.
 """
 
+from array import array
+import functools
+import math
 import re
 
+try:  # optional: parse_quantities returns NumPy arrays when available
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when NumPy is absent
+    np = None
+
 
 def prompt(msg: str, log:list) -> str:
     print("\n" + msg.strip())
     log.append(msg.strip())
+    record = getattr(log, "record", None)  # streaming/publishing Result log: tell the GUI we are waiting
+    if record is not None:
+        record({"t": "p", "v": msg.strip()})
     ret = input("> ").strip()
     log.append(ret)
     return ret
@@ -52,43 +63,153 @@ def read_logic_01(msg: str, log: list) -> int:
 _SI = {"y":1e-24,"z":1e-21,"a":1e-18,"f":1e-15,"p":1e-12,"n":1e-9,"u":1e-6,"µ":1e-6,"m":1e-3,
        "":1.0,"k":1e3,"K":1e3,"M":1e6,"G":1e9,"T":1e12,"P":1e15,"E":1e18,"Z":1e21,"Y":1e24}
 
-def parse_quantity(s: str, default_unit: str = "V") -> float:
-    s = s.strip().replace(",", ".")
-    m = re.fullmatch(r"\s*([+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)\s*([a-zA-ZµΩOhms]*)\s*", s)
+_QUANTITY_RE = re.compile(r"\s*([+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)\s*([a-zA-ZµΩ]*)\s*")
+
+# Base units that take an SI prefix. "s"/"S" are time; the ohm spellings all mean Ω.
+_BASE_UNITS = ("V", "A", "s", "S", "Hz", "W", "Ω", "Ohms", "ohms", "Ohm", "ohm")
+
+# Every accepted unit string -> scale factor. A bare prefix (e.g. "10n") scales the value as is.
+_UNIT_SCALE = {pre: f for pre, f in _SI.items()}
+_UNIT_SCALE.update((pre + base, f) for base in _BASE_UNITS for pre, f in _SI.items())
+
+PARSE_QUANTITY_CACHE_SIZE = 4096
+
+
+_UNIT_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZµΩ"
+
+
+def _parse_quantity(s: str) -> float:
+    if "," in s:
+        s = s.replace(",", ".")
+
+    # Fast path: split off the trailing unit letters and look them up. float()
+    # also takes "_" separators and "inf"/"nan" spellings, which the grammar
+    # rejects: those (and "1e999", which is inf either way) go the regex path.
+    t = s.strip()
+    num = t.rstrip(_UNIT_CHARS)
+    scale = _UNIT_SCALE.get(t[len(num) :])
+    if scale is not None and "_" not in num:
+        try:
+            val = float(num)
+        except ValueError:
+            pass
+        else:
+            if math.isfinite(val):
+                return val * scale
+
+    m = _QUANTITY_RE.fullmatch(s)
     if not m:
         raise ValueError("Invalid numeric input")
     val = float(m.group(1))
-    unit = (m.group(2) or "").replace("Ohms","Ω").replace("ohms","Ω").replace("Ohm","Ω").replace("ohm","Ω")
-
-    # If only a prefix was given (e.g., "10n"), apply it to the default unit.
-    if unit in _SI:
-        return val * _SI[unit]
-
-    # If a base unit with optional prefix was given.
-    if unit.endswith("V"):
-        pre = unit[:-1]
-        if pre in _SI:
-            val *= _SI[pre]
-        return val
-
-    if unit.endswith("A"):
-        pre = unit[:-1]
-        if pre in _SI:
-            val *= _SI[pre]
-        return val
-
-    # Time unit with optional SI prefix (ms, us, ns, s)
+    scale = _UNIT_SCALE.get(m.group(2))
+    if scale is not None:
+        return val * scale
+
+    unit = m.group(2).replace("Ohms","Ω").replace("ohms","Ω").replace("Ohm","Ω").replace("ohm","Ω")
+    # Time unit with an unknown prefix.
     if unit.endswith("s") or unit.endswith("S"):
-        pre = unit[:-1]
-        if pre == "":
-            return val
-        if pre in _SI:
-            return val * _SI[pre]
         raise ValueError("Unrecognized time unit")
 
-    # Fallback: unrecognized unit, return numeric part unchanged.
+    # Fallback: unrecognized unit (or unknown prefix), return numeric part unchanged.
     return val
 
+
+_parse_quantity_cached = functools.lru_cache(maxsize=PARSE_QUANTITY_CACHE_SIZE)(_parse_quantity)
+
+
+def parse_quantity(s: str, default_unit: str = "V", *, cache: bool = True) -> float:
+    """Parse a number with an optional SI unit ("2.40V", "10 ms", "4.7kΩ", "12.5MHz", "10n") to base units.
+
+    Units V, A, s, Hz, W and Ω (or Ohm/ohms) take an SI prefix; a bare prefix
+    scales the number itself. Other units return the number unchanged. With
+    ``cache`` repeated strings are answered from a bounded LRU.
+    """
+    return _parse_quantity_cached(s) if cache else _parse_quantity(s)
+
+
+def parse_quantities(values, default_unit: str = "V"):
+    """Parse many quantity strings at once, e.g. a scope/DMM CSV column.
+
+    Returns ``(parsed, errors)``: a NumPy float64 array and bool mask when NumPy
+    is installed, otherwise ``array('d')`` and ``array('B')``. Elements that
+    ``parse_quantity`` would reject are NaN in ``parsed`` and set in ``errors``;
+    nothing is raised. Numeric arrays/items pass through as floats.
+
+    A column of pure numbers, or of numbers all ending in the unit of the first
+    element ("12.3mV", "12.4mV", ...), is converted in one batch. Otherwise the
+    elements go through ``parse_quantity`` one by one.
+    """
+    if np is not None and isinstance(values, np.ndarray) and values.dtype.kind in "biuf":
+        return values.astype(np.float64).ravel(), np.zeros(values.size, dtype=bool)
+    items = values if isinstance(values, (list, tuple)) else list(values)
+    n = len(items)
+
+    batch = _parse_batch(items)
+    if batch is not None:
+        numbers, scale = batch
+        if np is not None:
+            parsed = np.array(numbers, dtype=np.float64)
+            if scale != 1.0:
+                parsed *= scale
+            errors = np.zeros(n, dtype=bool)
+            slow = np.flatnonzero(~np.isfinite(parsed)).tolist()
+        else:
+            parsed = array("d", numbers if scale == 1.0 else map(scale.__mul__, numbers))
+            errors = array("B", bytes(n))
+            slow = [] if math.isfinite(sum(parsed)) else [i for i, v in enumerate(parsed) if not math.isfinite(v)]
+    else:
+        if np is not None:
+            parsed = np.full(n, np.nan)
+            errors = np.zeros(n, dtype=bool)
+        else:
+            parsed = array("d", [math.nan]) * n
+            errors = array("B", bytes(n))
+        slow = range(n)
+
+    # float() also takes "inf"/"nan", so non-finite batch results are re-checked here.
+    for i in slow:
+        item = items[i]
+        if isinstance(item, (int, float)) and not isinstance(item, bool):
+            parsed[i] = item
+            continue
+        try:
+            parsed[i] = parse_quantity(item, default_unit)
+        except (ValueError, TypeError, AttributeError):
+            parsed[i] = math.nan
+            errors[i] = 1
+    return parsed, errors
+
+
+def _parse_batch(items):
+    # All-or-nothing conversion of str items sharing one unit suffix to (numbers, scale);
+    # None if it does not apply.
+    if not items or not isinstance(items[0], str):
+        return None
+    t = items[0].strip().replace(",", ".")
+    unit = t[len(t.rstrip(_UNIT_CHARS)) :]
+    scale = _UNIT_SCALE.get(unit)
+    if scale is None:
+        return None
+    try:
+        joined = "\n".join(items)
+    except TypeError:
+        return None
+    if "_" in joined or joined.count("\n") != len(items) - 1:
+        return None
+    if "," in joined:
+        joined = joined.replace(",", ".")
+    if unit:
+        # Every element must end in exactly this unit; only that suffix is removed.
+        joined += "\n"
+        if joined.count(unit + "\n") != len(items):
+            return None
+        joined = joined.replace(unit + "\n", "\n")[:-1]
+    try:
+        return list(map(float, joined.split("\n"))), scale
+    except ValueError:
+        return None
+
+
 def read_measurement(msg: str, log: list, default_unit: str = "V") -> float:
     while True:
         try: return parse_quantity(prompt(msg, log), default_unit)
@@ -0,0 +1,27 @@
+import importlib.util
+from pathlib import Path
+import sys
+
+import pytest
+
+
+TOOLS_DIR = Path(__file__).resolve().parents[1] / "tools"
+
+
+def _load_tool(name):
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, TOOLS_DIR / f"{name}.py")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
+
+
+@pytest.fixture(scope="session")
+def generate_all():
+    return _load_tool("generate_all")
+
+
+@pytest.fixture(scope="session")
+def make_rules_index():
+    return _load_tool("make_rules_index")
@@ -0,0 +1,44 @@
+import pytest
+
+from rules_packager_base import Result
+from rules_packager_base.conditions import compile_conditions
+
+
+@pytest.mark.parametrize(
+    "value, verdict",
+    [(3.35, "PASS"), (3.25, "PASS"), (3.3, "PASS"), (3.3501, "FAIL"), (3.2499, "FAIL")],
+)
+def test_tolerance_bounds_are_inclusive(value, verdict):
+    cc = compile_conditions("{1} = 3.30 V ± 0.05 V")
+    assert cc.evaluate({1: value}) == {1: verdict}
+    assert (cc.criteria[1]["lower"], cc.criteria[1]["upper"]) == (3.25, 3.35)
+
+
+@pytest.mark.parametrize(
+    "line, value, verdict",
+    [
+        ("{1} = 2.15V±2%", 2.193, "PASS"),
+        ("{1} = 2.15V±2%", 2.107, "PASS"),
+        ("{1} <= 0.3 V", 0.1 + 0.2, "PASS"),
+        ("{1} < 0.3 V", 0.3, "FAIL"),
+        ("{1} > 0 V", 0.0, "FAIL"),
+    ],
+)
+def test_bounds(line, value, verdict):
+    assert compile_conditions(line).evaluate({1: value}) == {1: verdict}
+
+
+def test_applied_criteria_are_not_shared_with_the_compile_cache():
+    res = Result()
+    compile_conditions("{1} = 2.40 V ± 5%").apply(res)
+    res.criteria[1]["expr"] = "edited"
+    res.criteria[1]["refs_note"] = [1]
+    again = compile_conditions("{1} = 2.40 V ± 5%")
+    assert again.criteria[1]["expr"] == "{1} = 2.40 V ± 5%"
+    assert "refs_note" not in again.criteria[1]
+
+
+def test_within_pct_uses_the_documented_key():
+    crit = compile_conditions("{1} = 2.40 V ± 5%").criteria[1]
+    assert crit["type"] == "within_pct" and crit["tol_pct"] == 5.0
+    assert "tolerance_pct" not in crit
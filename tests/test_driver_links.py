@@ -0,0 +1,328 @@
+import hashlib
+import json
+
+import pytest
+
+from rules_packager_base.driver_links import RuleDoc, RulesLoadError, build_llm_context, fit_to_budget
+from rules_packager_base.sections import estimate_tokens
+
+
+def _doc(doc_id, body="Body.\n"):
+    return f"---\ndoc_id: {doc_id}\ntitle: {doc_id}\n---\n# {doc_id}\n\n{body}"
+
+
+def _files(folder, docs):
+    folder.mkdir(parents=True, exist_ok=True)
+    files = []
+    for name, text in docs.items():
+        (folder / name).write_text(text, encoding="utf-8")
+        files.append({"name": name, "sha256": hashlib.sha256(text.encode("utf-8")).hexdigest()})
+    return files
+
+
+def _registry(tmp_path, indexes):
+    """Write one path pack per ``{pack_id: index}`` entry and return the registry path."""
+    packs = []
+    for pack_id, index in indexes.items():
+        (tmp_path / pack_id).mkdir(exist_ok=True)
+        (tmp_path / pack_id / "rules_index.json").write_text(json.dumps(index), encoding="utf-8")
+        packs.append(
+            {"id": pack_id, "enabled": True, "rules": {"source": {"type": "path", "path": pack_id}, "rules_index": "rules_index.json"}}
+        )
+    path = tmp_path / "registry.json"
+    path.write_text(json.dumps({"packs": packs}), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def versioned(tmp_path):
+    """A v2 pack listing two version folders, defaulting to 1.0."""
+    pack = tmp_path / "drv"
+    index = {
+        "default_version": "1.0",
+        "versions": {
+            "1.0": {"files": _files(pack / "1.0", {"a.md": _doc("a-old")})},
+            "2.0": {"files": _files(pack / "2.0", {"a.md": _doc("a-new"), "b.md": _doc("b-new")})},
+        },
+    }
+    return _registry(tmp_path, {"drv": index})
+
+
+def test_v2_index_loads_default_version(versioned):
+    docs = build_llm_context(registry_path=versioned, sha_check="error")
+    assert [d.doc_id for d in docs] == ["a-old"]
+    assert docs[0].relpath == "1.0/a.md"
+
+
+def test_v2_index_loads_requested_version(versioned):
+    docs = build_llm_context(registry_path=versioned, sha_check="error", rules_versions={"drv": "2.0"})
+    assert [(d.doc_id, d.relpath) for d in docs] == [("a-new", "2.0/a.md"), ("b-new", "2.0/b.md")]
+
+
+def test_v2_index_rejects_unknown_version(versioned):
+    with pytest.raises(RulesLoadError, match=r"'3\.0' not found .*available: \['1\.0', '2\.0'\]"):
+        build_llm_context(registry_path=versioned, rules_versions={"drv": "3.0"})
+
+
+def test_registry_version_pin_is_overridden_by_caller(versioned):
+    reg = json.loads(versioned.read_text(encoding="utf-8"))
+    reg["packs"][0]["rules"]["version"] = "2.0"
+    versioned.write_text(json.dumps(reg), encoding="utf-8")
+    assert [d.doc_id for d in build_llm_context(registry_path=versioned)] == ["a-new", "b-new"]
+    assert [d.doc_id for d in build_llm_context(registry_path=versioned, rules_versions={"drv": "1.0"})] == ["a-old"]
+
+
+def test_v1_index_rejects_other_versions(tmp_path):
+    index = {"rules_version": "1.0", "files": _files(tmp_path / "drv" / "1.0", {"a.md": _doc("a")})}
+    registry = _registry(tmp_path, {"drv": index})
+    assert [d.relpath for d in build_llm_context(registry_path=registry, rules_versions={"drv": "1.0"})] == ["1.0/a.md"]
+    with pytest.raises(RulesLoadError, match=r"'2\.0' requested but .* only describes '1\.0'"):
+        build_llm_context(registry_path=registry, rules_versions={"drv": "2.0"})
+
+
+@pytest.mark.parametrize("entry", [["a.md"], "a.md", None])
+def test_v2_index_rejects_malformed_version_entry(tmp_path, entry):
+    registry = _registry(tmp_path, {"drv": {"default_version": "1.0", "versions": {"1.0": entry}}})
+    with pytest.raises(RulesLoadError, match=r"version '1\.0' must be an object"):
+        build_llm_context(registry_path=registry)
+
+
+@pytest.mark.parametrize("index", [[], "files", 1])
+def test_rejects_index_that_is_not_an_object(tmp_path, index):
+    registry = _registry(tmp_path, {"drv": index})
+    with pytest.raises(RulesLoadError, match="must be an object"):
+        build_llm_context(registry_path=registry)
+
+
+def _pack(tmp_path, pack_id, docs):
+    return {"files": _files(tmp_path / pack_id, docs)}
+
+
+def _raise_message(**kw):
+    with pytest.raises(RulesLoadError) as info:
+        build_llm_context(**kw)
+    return str(info.value)
+
+
+@pytest.mark.parametrize("workers", [0, 2, 8])
+def test_concurrent_load_matches_serial(tmp_path, workers):
+    registry = _registry(
+        tmp_path,
+        {
+            f"p{i}": _pack(tmp_path, f"p{i}", {f"{k}.md": _doc(f"p{i}-{k}", "x" * (i * k)) for k in range(5)})
+            for i in range(4)
+        },
+    )
+    serial = build_llm_context(registry_path=registry, sha_check="error")
+    assert len(serial) == 20
+    assert build_llm_context(registry_path=registry, sha_check="error", workers=workers) == serial
+
+
+def test_concurrent_load_raises_earliest_doc_error_before_later_index_error(tmp_path):
+    first = _pack(tmp_path, "first", {"a.md": _doc("a")})
+    first["files"][0]["sha256"] = "0" * 64
+    registry = _registry(tmp_path, {"first": first, "second": _pack(tmp_path, "second", {"b.md": _doc("b")})})
+    (tmp_path / "second" / "rules_index.json").write_text("{", encoding="utf-8")
+
+    serial = _raise_message(registry_path=registry, sha_check="error")
+    assert "sha256 mismatch" in serial
+    assert _raise_message(registry_path=registry, sha_check="error", workers=4) == serial
+
+
+def test_concurrent_load_raises_earliest_index_error_before_later_registry_error(tmp_path):
+    registry = _registry(tmp_path, {"first": _pack(tmp_path, "first", {"a.md": _doc("a")})})
+    (tmp_path / "first" / "rules_index.json").unlink()
+    reg = json.loads(registry.read_text(encoding="utf-8"))
+    reg["packs"].append({"id": "second", "enabled": True, "rules": {"source": {"type": "git"}, "rules_index": "x.json"}})
+    registry.write_text(json.dumps(reg), encoding="utf-8")
+
+    serial = _raise_message(registry_path=registry)
+    assert "Failed to read rules index" in serial
+    assert _raise_message(registry_path=registry, workers=4) == serial
+
+
+def test_concurrent_load_raises_registry_error_after_earlier_packs_load(tmp_path):
+    registry = _registry(tmp_path, {"first": _pack(tmp_path, "first", {"a.md": _doc("a")})})
+    reg = json.loads(registry.read_text(encoding="utf-8"))
+    reg["packs"].append({"id": "second", "enabled": True, "rules": {"source": {"type": "git"}, "rules_index": "x.json"}})
+    registry.write_text(json.dumps(reg), encoding="utf-8")
+
+    assert "Unsupported pack source type" in _raise_message(registry_path=registry, workers=4)
+
+
+def test_rejects_negative_workers(versioned):
+    with pytest.raises(RulesLoadError, match="workers must be >= 0"):
+        build_llm_context(registry_path=versioned, workers=-1)
+
+
+@pytest.mark.parametrize("workers", [None, 4])
+def test_identical_docs_share_one_content_string(tmp_path, workers):
+    same = _doc("shared", "Same body.\n")
+    registry = _registry(
+        tmp_path,
+        {
+            "one": _pack(tmp_path, "one", {"a.md": same, "b.md": _doc("other")}),
+            "two": _pack(tmp_path, "two", {"c.md": same}),
+        },
+    )
+    a, b, c = build_llm_context(registry_path=registry, workers=workers)
+    assert a.content == c.content == same
+    assert a.content is c.content
+    assert a.sha256 == c.sha256 != b.sha256
+
+
+@pytest.fixture
+def body_reads(monkeypatch):
+    """relpaths whose full body the loader reads."""
+    from rules_packager_base import driver_links
+
+    seen = []
+    real = driver_links._read_body
+
+    def read_body(entry, origin):
+        seen.append(entry.relpath)
+        return real(entry, origin)
+
+    monkeypatch.setattr(driver_links, "_read_body", read_body)
+    return seen
+
+
+@pytest.mark.parametrize("workers", [None, 4])
+def test_lazy_docs_read_only_frontmatter_until_content_is_used(tmp_path, body_reads, workers):
+    registry = _registry(tmp_path, {"p": _pack(tmp_path, "p", {"a.md": _doc("a", "x" * 100_000), "b.md": _doc("b")})})
+    eager = build_llm_context(registry_path=registry)
+    body_reads.clear()
+
+    lazy = build_llm_context(registry_path=registry, lazy=True, workers=workers)
+    assert [(d.doc_id, d.title, d.relpath) for d in lazy] == [("a", "a", "a.md"), ("b", "b", "b.md")]
+    assert body_reads == []
+    assert "not loaded" in repr(lazy[0])
+
+    assert lazy[0].sha256 == eager[0].sha256
+    assert body_reads == ["a.md"]
+    assert lazy[0].is_loaded and not lazy[1].is_loaded
+    assert lazy == eager
+    assert body_reads == ["a.md", "b.md"]
+    assert lazy[1].materialize() == eager[1]
+
+
+def test_lazy_docs_check_sha_on_first_access(tmp_path):
+    pack = _pack(tmp_path, "p", {"a.md": _doc("a")})
+    pack["files"][0]["sha256"] = "0" * 64
+    registry = _registry(tmp_path, {"p": pack})
+
+    (doc,) = build_llm_context(registry_path=registry, lazy=True, sha_check="error")
+    with pytest.raises(RulesLoadError, match="sha256 mismatch"):
+        doc.content
+
+
+def test_lazy_docs_check_cached_sha_up_front(tmp_path, body_reads):
+    pack = _pack(tmp_path, "p", {"a.md": _doc("a")})
+    registry = _registry(tmp_path, {"p": pack})
+    cache_path = tmp_path / "cache.sqlite"
+    build_llm_context(registry_path=registry, cache_path=cache_path)
+    pack["files"][0]["sha256"] = "0" * 64
+    (tmp_path / "p" / "rules_index.json").write_text(json.dumps(pack), encoding="utf-8")
+    body_reads.clear()
+
+    with pytest.raises(RulesLoadError, match="sha256 mismatch"):
+        build_llm_context(registry_path=registry, cache_path=cache_path, lazy=True, sha_check="error")
+    assert body_reads == []
+
+
+def test_dump_still_checks_sha(tmp_path, capsys):
+    from rules_packager_base.driver_links import main
+
+    pack = _pack(tmp_path, "p", {"a.md": _doc("a")})
+    registry = _registry(tmp_path, {"p": pack})
+    assert main(["--registry", str(registry), "--dump"]) == 0
+    assert "pack:p: a — a" in capsys.readouterr().out
+
+    pack["files"][0]["sha256"] = "0" * 64
+    (tmp_path / "p" / "rules_index.json").write_text(json.dumps(pack), encoding="utf-8")
+    assert main(["--registry", str(registry), "--dump"]) == 0
+    with pytest.raises(RulesLoadError, match="sha256 mismatch"):
+        main(["--registry", str(registry), "--dump", "--sha-check", "error"])
+
+
+def _rule_doc(name, content, priority=100, section_priorities=()):
+    return RuleDoc(
+        source="pack:p",
+        origin="p",
+        relpath=f"{name}.md",
+        sha256=hashlib.sha256(content.encode("utf-8")).hexdigest(),
+        content=content,
+        doc_id=name,
+        priority=priority,
+        section_priorities=tuple(section_priorities),
+    )
+
+
+HEAD = "---\ndoc_id: a\n---\n# A\n\nIntro.\n\n"
+KEY = "## Key\n\nMust have.\n\n"
+BIG = "## Big\n\n" + "word " * 200 + "\n\n"
+SMALL = "## Small\n\nNice to have.\n"
+
+
+@pytest.fixture
+def sectioned():
+    return [
+        _rule_doc("a", HEAD + KEY + BIG + SMALL, section_priorities=[("Key", 10)]),
+        _rule_doc("b", "No headings here.\n", priority=50),
+    ]
+
+
+def test_fit_to_budget_keeps_everything_that_fits(sectioned):
+    assert fit_to_budget(sectioned, sum(d.n_tokens for d in sectioned)) == sectioned
+    assert fit_to_budget(sectioned, 0) == []
+    with pytest.raises(RulesLoadError, match="max_tokens must be >= 0"):
+        fit_to_budget(sectioned, -1)
+
+
+def test_fit_to_budget_packs_sections_by_priority(sectioned):
+    a, b = sectioned
+    budget = b.n_tokens + estimate_tokens(HEAD + KEY + SMALL)
+    out = fit_to_budget(sectioned, budget)
+
+    # b (priority 50) and Key (10) first; Big does not fit, the smaller section after it still does.
+    assert [d.doc_id for d in out] == ["a", "b"]
+    trimmed = out[0]
+    assert trimmed.sections == ("Key", "Small")
+    assert trimmed.content == HEAD + KEY + SMALL
+    assert trimmed.sha256 == hashlib.sha256(trimmed.content.encode("utf-8")).hexdigest()
+    assert out[1] is b
+    assert sum(d.n_tokens for d in out) <= budget
+    assert a.sections is None
+
+
+def test_fit_to_budget_charges_the_head_with_the_first_section(sectioned):
+    a, b = sectioned
+    out = fit_to_budget(sectioned, b.n_tokens + estimate_tokens(KEY))
+    assert out == [b]
+    out = fit_to_budget(sectioned, estimate_tokens(HEAD + KEY))
+    assert [(d.doc_id, d.sections) for d in out] == [("a", ("Key",))]
+
+
+def test_fit_to_budget_is_deterministic(sectioned):
+    budget = estimate_tokens(HEAD + KEY + SMALL) + 1
+    assert fit_to_budget(sectioned, budget) == fit_to_budget(list(sectioned), budget)
+
+
+def test_max_tokens_uses_index_priorities(tmp_path):
+    pack = _pack(tmp_path, "p", {"a.md": HEAD + KEY + BIG + SMALL, "b.md": "No headings here.\n"})
+    pack["files"][0]["section_priorities"] = {"Small": 1}
+    pack["files"][1]["priority"] = 200
+    registry = _registry(tmp_path, {"p": pack})
+
+    out = build_llm_context(registry_path=registry, max_tokens=estimate_tokens(HEAD + KEY + SMALL))
+    assert [(d.relpath, d.sections) for d in out] == [("a.md", ("Key", "Small"))]
+    out = build_llm_context(registry_path=registry, max_tokens=estimate_tokens(HEAD + SMALL))
+    assert [(d.relpath, d.sections) for d in out] == [("a.md", ("Small",))]
+
+
+def test_rejects_invalid_index_priorities(tmp_path):
+    pack = _pack(tmp_path, "p", {"a.md": _doc("a")})
+    pack["files"][0]["priority"] = "high"
+    registry = _registry(tmp_path, {"p": pack})
+    with pytest.raises(RulesLoadError, match="Invalid priority for 'a.md'"):
+        build_llm_context(registry_path=registry)
@@ -0,0 +1,386 @@
+import base64
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+
+
+REPO = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def project(tmp_path):
+    """A copy of this project (pyproject + package), with a registry collecting its own rules."""
+    root = tmp_path / "proj"
+    root.mkdir()
+    shutil.copy(REPO / "pyproject.toml", root / "pyproject.toml")
+    shutil.copytree(REPO / "src", root / "src", ignore=shutil.ignore_patterns("__pycache__", ".rules_index.stat.json"))
+    registry = {
+        "packs": [
+            {
+                "id": "base",
+                "enabled": True,
+                "rules": {"source": {"type": "path", "path": "src/rules_packager_base"}, "rules_index": "rules/rules_index.json"},
+                "wheel": {"enabled": True},
+            }
+        ]
+    }
+    (root / "drivers_registry.json").write_text(json.dumps(registry), encoding="utf-8")
+    return root
+
+
+def test_fingerprint_ignores_collect_output_and_scratch_files(generate_all, project, capsys):
+    before = generate_all._project_fingerprint(project)
+    generate_all.collect_rules(
+        registry_path=project / "drivers_registry.json",
+        out_dir=project / "output" / "config" / "rules",
+        overwrite=True,
+        sha_check="off",
+    )
+    (project / "newfile.txt").write_text("scratch", encoding="utf-8")
+    assert any((project / "output" / "config" / "rules").glob("*.md"))
+    assert generate_all._project_fingerprint(project) == before
+
+
+def test_fingerprint_follows_package_sources_and_data(generate_all, project):
+    pkg = project / "src" / "rules_packager_base"
+    fps = [generate_all._project_fingerprint(project)]
+    (pkg / "new_module.py").write_text("X = 1\n", encoding="utf-8")
+    fps.append(generate_all._project_fingerprint(project))
+    index = pkg / "rules" / "rules_index.json"
+    index.write_text(index.read_text(encoding="utf-8") + "\n", encoding="utf-8")
+    fps.append(generate_all._project_fingerprint(project))
+    fps.append(generate_all._project_fingerprint(project, builder="pip"))
+    assert len(set(fps)) == len(fps)
+
+
+def _add_pack(root, pack_id, docs):
+    """A minimal rules pack at root/packs/<id> with ``{name: text}`` docs; returns its registry entry."""
+    pack = root / "packs" / pack_id
+    pack.mkdir(parents=True)
+    files = []
+    for name, text in docs.items():
+        (pack / name).write_text(text, encoding="utf-8")
+        files.append({"name": name, "sha256": hashlib.sha256(text.encode("utf-8")).hexdigest()})
+    (pack / "rules_index.json").write_text(json.dumps({"files": files}), encoding="utf-8")
+    return {"id": pack_id, "enabled": True, "rules": {"source": {"type": "path", "path": f"packs/{pack_id}"}, "rules_index": "rules_index.json"}}
+
+
+def test_sync_keeps_file_names_when_a_doc_is_inserted(generate_all, project, capsys):
+    registry_path = project / "drivers_registry.json"
+    registry = json.loads(registry_path.read_text(encoding="utf-8"))
+    out_dir = project / "output" / "config" / "rules"
+    generate_all.collect_rules(registry_path=registry_path, out_dir=out_dir, overwrite=False, sha_check="off", sync=True)
+    before = {p.name: p.stat().st_mtime_ns for p in out_dir.glob("*.md")}
+    capsys.readouterr()
+
+    registry["packs"].insert(0, _add_pack(project, "extra", {"extra.md": "---\ndoc_id: extra-doc\n---\n# Extra\n"}))
+    registry_path.write_text(json.dumps(registry), encoding="utf-8")
+    generate_all.collect_rules(registry_path=registry_path, out_dir=out_dir, overwrite=False, sha_check="off", sync=True)
+
+    out = capsys.readouterr().out
+    assert f"Sync: 1 added, 0 changed, 0 removed, {len(before)} unchanged" in out
+    after = {p.name: p.stat().st_mtime_ns for p in out_dir.glob("*.md")}
+    assert {k: v for k, v in after.items() if k in before} == before
+    manifest = json.loads((out_dir / "manifest.json").read_text(encoding="utf-8"))
+    assert [e["index"] for e in manifest] == list(range(1, len(manifest) + 1))
+
+
+def test_sync_rewrites_changed_docs_and_removes_dropped_ones(generate_all, project, capsys):
+    registry_path = project / "drivers_registry.json"
+    registry = json.loads(registry_path.read_text(encoding="utf-8"))
+    registry["packs"].append(
+        _add_pack(project, "extra", {"a.md": "---\ndoc_id: a\n---\n# A\n", "b.md": "---\ndoc_id: b\n---\n# B\n"})
+    )
+    registry_path.write_text(json.dumps(registry), encoding="utf-8")
+    out_dir = project / "output" / "config" / "rules"
+    out_dir.mkdir(parents=True)
+
+    def sync():
+        capsys.readouterr()
+        generate_all.collect_rules(registry_path=registry_path, out_dir=out_dir, overwrite=False, sha_check="off", sync=True)
+        return capsys.readouterr().out
+
+    sync()
+    before = {p.name: p.stat().st_mtime_ns for p in out_dir.glob("*.md")}
+    n = len(before)
+
+    (project / "packs" / "extra" / "a.md").write_text("---\ndoc_id: a\n---\n# A, revised\n", encoding="utf-8")
+    index_path = project / "packs" / "extra" / "rules_index.json"
+    index = json.loads(index_path.read_text(encoding="utf-8"))
+    index["files"] = [f for f in index["files"] if f["name"] != "b.md"]
+    index_path.write_text(json.dumps(index), encoding="utf-8")
+    out = sync()
+
+    assert f"Sync: 0 added, 1 changed, 1 removed, {n - 2} unchanged" in out
+    assert "  ~ pack-extra_a.md" in out and "  - pack-extra_b.md" in out
+    assert (out_dir / "pack-extra_a.md").read_text(encoding="utf-8").endswith("# A, revised\n")
+    after = {p.name: p.stat().st_mtime_ns for p in out_dir.glob("*.md")}
+    assert set(after) == set(before) - {"pack-extra_b.md"}
+    assert {k: v for k, v in after.items() if k != "pack-extra_a.md"} == {
+        k: v for k, v in before.items() if k in after and k != "pack-extra_a.md"
+    }
+
+    manifest_mtime = (out_dir / "manifest.json").stat().st_mtime_ns
+    assert f"Sync: 0 added, 0 changed, 0 removed, {n - 1} unchanged" in sync()
+    assert {p.name: p.stat().st_mtime_ns for p in out_dir.glob("*.md")} == after
+    assert (out_dir / "manifest.json").stat().st_mtime_ns == manifest_mtime
+
+
+@pytest.mark.parametrize("dedup", [False, True])
+def test_collect_marks_aliases_and_dedup_writes_each_blob_once(generate_all, project, capsys, dedup):
+    registry_path = project / "drivers_registry.json"
+    registry = json.loads(registry_path.read_text(encoding="utf-8"))
+    same = "---\ndoc_id: same\n---\n# Same\n"
+    registry["packs"] = [_add_pack(project, "one", {"a.md": same}), _add_pack(project, "two", {"b.md": "# B\n", "c.md": same})]
+    registry_path.write_text(json.dumps(registry), encoding="utf-8")
+    out_dir = project / "output" / "config" / "rules"
+    generate_all.collect_rules(registry_path=registry_path, out_dir=out_dir, overwrite=False, sha_check="error", dedup=dedup)
+
+    assert "(1 aliases)" in capsys.readouterr().out
+    manifest = json.loads((out_dir / "manifest.json").read_text(encoding="utf-8"))
+    assert [e.get("alias_of") for e in manifest] == [None, None, "pack-one_same.md"]
+    assert manifest[0]["sha256"] == manifest[2]["sha256"]
+    files = sorted(p.name for p in out_dir.glob("*.md"))
+    if dedup:
+        assert manifest[2]["filename"] == "pack-one_same.md"
+        assert len(files) == 2
+    else:
+        assert manifest[2]["filename"] == "pack-two_same.md"
+        assert (out_dir / "pack-two_same.md").read_text(encoding="utf-8") == same
+        assert len(files) == 3
+
+
+def test_collect_records_token_counts_and_trimmed_sections(generate_all, project, capsys):
+    registry_path = project / "drivers_registry.json"
+    registry = json.loads(registry_path.read_text(encoding="utf-8"))
+    registry["packs"] = [_add_pack(project, "p", {"a.md": "# A\n\n## One\n\nFirst.\n\n## Two\n\n" + "word " * 100 + "\n"})]
+    registry_path.write_text(json.dumps(registry), encoding="utf-8")
+    out_dir = project / "output" / "config" / "rules"
+    generate_all.collect_rules(registry_path=registry_path, out_dir=out_dir, overwrite=False, sha_check="error", max_tokens=20)
+
+    assert "docs trimmed to sections" in capsys.readouterr().out
+    (ent,) = json.loads((out_dir / "manifest.json").read_text(encoding="utf-8"))
+    text = (out_dir / ent["filename"]).read_text(encoding="utf-8")
+    assert ent["sections"] == ["One"]
+    assert text == "# A\n\n## One\n\nFirst.\n\n"
+    assert ent["n_bytes"] == len(text.encode("utf-8")) and 0 < ent["n_tokens"] <= 20
+    assert ent["sha256"] == hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _build(generate_all, project, **kwargs):
+    generate_all.build_selected_wheels(
+        registry_path=project / "drivers_registry.json",
+        out_dir=project / "output" / "config" / "wheels",
+        overwrite=True,
+        ensure_pip=False,
+        only_binary=False,
+        **kwargs,
+    )
+
+
+def test_failed_overwrite_build_keeps_previous_wheels(generate_all, project, monkeypatch):
+    wheels = project / "output" / "config" / "wheels"
+    wheels.mkdir(parents=True)
+    (wheels / "old-0.1-py3-none-any.whl").write_bytes(b"old")
+    (wheels / "requirements.txt").write_text("--find-links .\nold-0.1-py3-none-any.whl\n", encoding="utf-8")
+
+    def fail(project_root, *, label, build_dir, capture):
+        raise RuntimeError(f"build of {label} failed")
+
+    monkeypatch.setattr(generate_all, "_build_wheel", fail)
+    monkeypatch.setattr(generate_all, "_pip_available", lambda: True)
+    with pytest.raises(SystemExit, match="was not updated"):
+        _build(generate_all, project, builder="pip")
+    assert sorted(p.name for p in wheels.iterdir()) == ["old-0.1-py3-none-any.whl", "requirements.txt"]
+
+
+def test_overwrite_build_replaces_previous_wheels(generate_all, project):
+    wheels = project / "output" / "config" / "wheels"
+    wheels.mkdir(parents=True)
+    (wheels / "old-0.1-py3-none-any.whl").write_bytes(b"old")
+    _build(generate_all, project)
+    names = sorted(p.name for p in wheels.glob("*.whl"))
+    assert names == ["rules_packager_base-0.1.1-py3-none-any.whl"]
+    assert names[0] in (wheels / "requirements.txt").read_text(encoding="utf-8")
+
+
+def _fake_pip(calls, fail=()):
+    """Stand-in for ``subprocess.run`` of ``pip wheel``: drops a wheel named after the project."""
+
+    def run(cmd, *, env, **kwargs):
+        root = Path(cmd[-1])
+        calls.append((root.name, env["TMPDIR"]))
+        wheel_dir = Path(cmd[cmd.index("--wheel-dir") + 1])
+        if root.name in fail:
+            (wheel_dir / f"{root.name}-0.1-py3-none-any.whl").write_bytes(b"partial")
+            return subprocess.CompletedProcess(cmd, 1, stdout="boom\n")
+        (wheel_dir / f"{root.name}-0.1-py3-none-any.whl").write_bytes(b"wheel")
+        return subprocess.CompletedProcess(cmd, 0, stdout=f"built {root.name}\nok\n")
+
+    return run
+
+
+@pytest.fixture
+def two_projects(project):
+    second = project.parent / "second"
+    shutil.copytree(project, second)
+    registry_path = project / "drivers_registry.json"
+    registry = json.loads(registry_path.read_text(encoding="utf-8"))
+    registry["packs"].append(
+        {
+            "id": "other",
+            "enabled": True,
+            "rules": {"source": {"type": "path", "path": str(second / "src" / "rules_packager_base")}, "rules_index": "rules/rules_index.json"},
+            "wheel": {"enabled": True, "project_root": str(second)},
+        }
+    )
+    registry_path.write_text(json.dumps(registry), encoding="utf-8")
+    return project
+
+
+def test_parallel_builds_use_their_own_temp_dirs_and_prefix_output(generate_all, two_projects, monkeypatch, capsys):
+    calls = []
+    monkeypatch.setattr(generate_all, "_pip_available", lambda: True)
+    monkeypatch.setattr(generate_all.subprocess, "run", _fake_pip(calls))
+    _build(generate_all, two_projects, builder="pip", jobs=2)
+
+    assert sorted(name for name, _tmp in calls) == ["proj", "second"]
+    assert len({tmp for _name, tmp in calls}) == 2
+    out = capsys.readouterr().out
+    assert "[base] built proj\n[base] ok\n" in out
+    assert "[other] built second\n[other] ok\n" in out
+    wheels = two_projects / "output" / "config" / "wheels"
+    assert sorted(p.name for p in wheels.glob("*.whl")) == ["proj-0.1-py3-none-any.whl", "second-0.1-py3-none-any.whl"]
+    assert not list(wheels.parent.glob(".wheels-staging-*"))
+
+
+def test_parallel_build_failure_installs_no_wheels(generate_all, two_projects, monkeypatch, capsys):
+    wheels = two_projects / "output" / "config" / "wheels"
+    wheels.mkdir(parents=True)
+    (wheels / "old-0.1-py3-none-any.whl").write_bytes(b"old")
+    monkeypatch.setattr(generate_all, "_pip_available", lambda: True)
+    monkeypatch.setattr(generate_all.subprocess, "run", _fake_pip([], fail={"second"}))
+    with pytest.raises(SystemExit, match="1 project"):
+        _build(generate_all, two_projects, builder="pip", jobs=2)
+
+    assert "[other] boom" in capsys.readouterr().out
+    assert sorted(p.name for p in wheels.iterdir()) == ["old-0.1-py3-none-any.whl"]
+    assert not list(wheels.parent.glob(".wheels-staging-*"))
+
+
+def test_wheel_cache_hit_skips_the_build(generate_all, project, monkeypatch, capsys):
+    cache_dir = project / "output" / ".cache"
+    _build(generate_all, project, cache_dir=cache_dir)
+    built = (project / "output" / "config" / "wheels" / "rules_packager_base-0.1.1-py3-none-any.whl").read_bytes()
+
+    def no_build(*args, **kwargs):
+        raise AssertionError("cache hit expected")
+
+    monkeypatch.setattr(generate_all, "_write_pure_wheel", no_build)
+    capsys.readouterr()
+    _build(generate_all, project, cache_dir=cache_dir)
+    assert "Wheel cache hit" in capsys.readouterr().out
+    assert (project / "output" / "config" / "wheels" / "rules_packager_base-0.1.1-py3-none-any.whl").read_bytes() == built
+
+    with pytest.raises(AssertionError, match="cache hit expected"):
+        _build(generate_all, project, cache_dir=cache_dir, rebuild=True)
+    (project / "src" / "rules_packager_base" / "new_module.py").write_text("X = 1\n", encoding="utf-8")
+    with pytest.raises(AssertionError, match="cache hit expected"):
+        _build(generate_all, project, cache_dir=cache_dir)
+
+
+def test_wheel_cache_evicts_least_recently_used_entries(generate_all, tmp_path):
+    cache = tmp_path / "wheels"
+    for n, name in enumerate(["old", "mid", "new"]):
+        entry = cache / name
+        entry.mkdir(parents=True)
+        (entry / f"{name}-0.1-py3-none-any.whl").write_bytes(b"x" * 10)
+        os.utime(entry, (1000 + n, 1000 + n))
+    (cache / ".staging").mkdir()
+
+    generate_all._wheel_cache_evict(cache, 20)
+    assert sorted(p.name for p in cache.iterdir()) == [".staging", "mid", "new"]
+
+    # A fetch refreshes the entry's timestamp, so "mid" now outlives "new".
+    assert generate_all._wheel_cache_fetch(cache / "mid", tmp_path / "out")
+    generate_all._wheel_cache_evict(cache, 10)
+    assert sorted(p.name for p in cache.iterdir()) == [".staging", "mid"]
+    assert (tmp_path / "out" / "mid-0.1-py3-none-any.whl").read_bytes() == b"x" * 10
+
+
+def test_pure_wheel_is_complete_recorded_and_reproducible(generate_all, project, tmp_path):
+    plan = generate_all._pure_wheel_plan(project)
+    arcnames = [arc for arc, _src in plan.files]
+    assert "rules_packager_base/__init__.py" in arcnames
+    assert "rules_packager_base/rules/rules_index.json" in arcnames
+    assert not [a for a in arcnames if "__pycache__" in a or a.endswith(".stat.json")]
+
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    whl = generate_all._write_pure_wheel(plan, tmp_path / "a")
+    assert generate_all._write_pure_wheel(plan, tmp_path / "b").read_bytes() == whl.read_bytes()
+    assert whl.name == "rules_packager_base-0.1.1-py3-none-any.whl"
+
+    with zipfile.ZipFile(whl) as zf:
+        names = zf.namelist()
+        dist_info = "rules_packager_base-0.1.1.dist-info"
+        assert names[-1] == f"{dist_info}/RECORD"
+        metadata = zf.read(f"{dist_info}/METADATA").decode("utf-8").splitlines()
+        assert metadata[:3] == ["Metadata-Version: 2.1", "Name: rules-packager-base", "Version: 0.1.1"]
+        assert "Author: Adrien Lombet" in metadata and "Requires-Python: >=3.10" in metadata
+        assert zf.read(f"{dist_info}/top_level.txt") == b"rules_packager_base\n"
+
+        record = [line.split(",") for line in zf.read(f"{dist_info}/RECORD").decode("utf-8").splitlines()]
+        assert sorted(r[0] for r in record) == sorted(names)
+        for arcname, digest, size in record:
+            if arcname.endswith("/RECORD"):
+                assert (digest, size) == ("", "")
+                continue
+            data = zf.read(arcname)
+            expected = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b"=").decode()
+            assert (digest, size) == (f"sha256={expected}", str(len(data)))
+
+    # Pure wheels are importable straight from the zip.
+    out = subprocess.run(
+        [sys.executable, "-c", "import rules_packager_base.driver_links as m; print(m.__file__)"],
+        env={**os.environ, "PYTHONPATH": str(whl)},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert out.strip().startswith(str(whl))
+
+
+def test_auto_builder_does_not_need_pip_for_pure_projects(generate_all, project, monkeypatch):
+    monkeypatch.setattr(generate_all, "_pip_available", lambda: False)
+    _build(generate_all, project)
+    assert (project / "output" / "config" / "wheels" / "rules_packager_base-0.1.1-py3-none-any.whl").is_file()
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda root: (root / "setup.py").write_text("from setuptools import setup\nsetup()\n", encoding="utf-8"),
+        lambda root: _edit_pyproject(root, 'version = "0.1.1"', 'dynamic = ["version"]'),
+        lambda root: _edit_pyproject(root, '"setuptools>=68", "wheel"', '"setuptools>=68", "setuptools-scm"'),
+        lambda root: _edit_pyproject(root, "[tool.setuptools.packages.find]\nwhere = [\"src\"]\n", ""),
+    ],
+)
+def test_pure_wheel_plan_leaves_other_projects_to_pip(generate_all, project, change):
+    assert generate_all._pure_wheel_plan(project) is not None
+    change(project)
+    assert generate_all._pure_wheel_plan(project) is None
+
+
+def _edit_pyproject(root, old, new):
+    path = root / "pyproject.toml"
+    text = path.read_text(encoding="utf-8")
+    assert old in text
+    path.write_text(text.replace(old, new), encoding="utf-8")
@@ -0,0 +1,44 @@
+import pytest
+
+from rules_packager_base.macro_dsl import MacroError, expand_procedure
+
+
+def texts(proc):
+    return [line.text for line in proc.steps]
+
+
+def test_id_expression_expands():
+    proc = expand_procedure("@LET BASE = 10\nMeasure VOUT as {BASE + 1}.", "{11} = 3.3 V ± 0.1 V")
+    assert texts(proc) == ["Measure VOUT as {11}."]
+    assert proc.measurement_ids == (11,)
+
+
+@pytest.mark.parametrize(
+    "steps",
+    [
+        "Measure VOUT as {rand()}.",
+        "Measure VOUT as {1 +}.",
+        "Read {time()} from the scope.",
+        "Measure VOUT as {BASE + }.",
+    ],
+)
+def test_invalid_id_expressions_are_rejected(steps):
+    with pytest.raises(MacroError):
+        expand_procedure(steps)
+
+
+def test_unknown_name_in_introducing_position_is_rejected():
+    with pytest.raises(MacroError, match="TYPO"):
+        expand_procedure("Measure VOUT as {TYPO}.")
+
+
+def test_legacy_placeholder_and_prose_stay_literal():
+    steps = 'Set the PSU to {VIN}.\nSend {"cmd": "ON"} to the board.\n({see note}) {{ILIM}}'
+    assert texts(expand_procedure(steps)) == steps.splitlines()
+
+
+def test_error_reports_section_and_line():
+    with pytest.raises(MacroError) as info:
+        expand_procedure("Power on.\nMeasure VOUT as {rand()}.")
+    assert info.value.section == "steps"
+    assert info.value.line == 2
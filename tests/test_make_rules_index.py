@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+from rules_packager_base.driver_links import build_llm_context
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@pytest.fixture
+def rules(tmp_path):
+    root = tmp_path / "rules"
+    for ver in ("0.9.0", "0.10.0"):
+        _write(root / ver / "a.md", f"# A {ver}\n")
+        _write(root / ver / "b.md", f"# B {ver}\n")
+    return root
+
+
+@pytest.fixture
+def hashed(make_rules_index, monkeypatch):
+    """Names of the files make_rules_index actually hashes."""
+    seen = []
+    real = make_rules_index._sha256
+
+    def sha256(fp):
+        seen.append(f"{fp.parent.name}/{fp.name}")
+        return real(fp)
+
+    monkeypatch.setattr(make_rules_index, "_sha256", sha256)
+    return seen
+
+
+def _job(make_rules_index, rules, version="0.10.0", schema=2):
+    return make_rules_index._IndexJob(index_path=rules / "rules_index.json", version=version, schema=schema)
+
+
+def test_v2_index_lists_every_version(make_rules_index, rules, hashed):
+    assert make_rules_index._detect_latest_version(rules) == "0.10.0"
+    assert make_rules_index.run_jobs([_job(make_rules_index, rules)]) == 1
+    idx = json.loads((rules / "rules_index.json").read_text(encoding="utf-8"))
+
+    assert idx["default_version"] == idx["rules_version"] == "0.10.0"
+    assert list(idx["versions"]) == ["0.9.0", "0.10.0"]
+    assert idx["files"] == idx["versions"]["0.10.0"]["files"]
+    assert idx["versions"]["0.9.0"]["files"][0] == {
+        "name": "a.md",
+        "sha256": hashlib.sha256(b"# A 0.9.0\n").hexdigest(),
+    }
+    assert sorted(hashed) == ["0.10.0/a.md", "0.10.0/b.md", "0.9.0/a.md", "0.9.0/b.md"]
+
+
+def test_unchanged_files_are_not_rehashed_and_index_not_rewritten(make_rules_index, rules, hashed, capsys):
+    make_rules_index.run_jobs([_job(make_rules_index, rules)])
+    index = rules / "rules_index.json"
+    before = (index.read_text(encoding="utf-8"), index.stat().st_mtime_ns)
+    hashed.clear()
+    capsys.readouterr()
+
+    assert make_rules_index.run_jobs([_job(make_rules_index, rules)]) == 0
+    assert hashed == []
+    assert "hashed 0 of 4 file(s)" in capsys.readouterr().out
+    assert (index.read_text(encoding="utf-8"), index.stat().st_mtime_ns) == before
+
+
+def test_only_modified_files_are_rehashed(make_rules_index, rules, hashed):
+    make_rules_index.run_jobs([_job(make_rules_index, rules)])
+    hashed.clear()
+    sha = _write(rules / "0.9.0" / "b.md", "# B, longer now\n")
+    st = (rules / "0.10.0" / "a.md").stat()
+    os.utime(rules / "0.10.0" / "a.md", ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+
+    assert make_rules_index.run_jobs([_job(make_rules_index, rules)]) == 1
+    assert sorted(hashed) == ["0.10.0/a.md", "0.9.0/b.md"]
+    idx = json.loads((rules / "rules_index.json").read_text(encoding="utf-8"))
+    assert idx["versions"]["0.9.0"]["files"][1]["sha256"] == sha
+
+
+def test_keeps_hand_written_entry_keys(make_rules_index, rules):
+    make_rules_index.run_jobs([_job(make_rules_index, rules)])
+    index = rules / "rules_index.json"
+    idx = json.loads(index.read_text(encoding="utf-8"))
+    idx["versions"]["0.10.0"]["files"][0]["priority"] = 5
+    index.write_text(json.dumps(idx), encoding="utf-8")
+    _write(rules / "0.10.0" / "a.md", "# A, changed\n")
+
+    make_rules_index.run_jobs([_job(make_rules_index, rules)])
+    ent = json.loads(index.read_text(encoding="utf-8"))["versions"]["0.10.0"]["files"][0]
+    assert ent == {"name": "a.md", "sha256": hashlib.sha256(b"# A, changed\n").hexdigest(), "priority": 5}
+
+
+def test_schema_1_indexes_one_version(make_rules_index, rules):
+    make_rules_index.run_jobs([_job(make_rules_index, rules, version="0.9.0", schema=1)])
+    idx = json.loads((rules / "rules_index.json").read_text(encoding="utf-8"))
+    assert idx["rules_version"] == "0.9.0" and "versions" not in idx
+    assert [f["name"] for f in idx["files"]] == ["a.md", "b.md"]
+
+
+def test_all_packs_indexes_every_path_pack(make_rules_index, tmp_path, hashed, capsys):
+    _write(tmp_path / "versioned" / "rules" / "1.0" / "a.md", "---\ndoc_id: v\n---\n# V\n")
+    _write(tmp_path / "flat" / "b.md", "---\ndoc_id: f\n---\n# F\n")
+
+    def pack(pack_id, path, rules_index):
+        return {"id": pack_id, "enabled": True, "rules": {"source": {"type": "path", "path": path}, "rules_index": rules_index}}
+
+    registry = tmp_path / "registry.json"
+    registry.write_text(
+        json.dumps(
+            {
+                "packs": [
+                    pack("versioned", "versioned", "rules/rules_index.json"),
+                    pack("flat", "flat", "rules_index.json"),
+                    {"id": "pkg", "enabled": False, "rules": {"source": {"type": "package", "name": "x"}, "rules_index": "i.json"}},
+                ]
+            }
+        ),
+        encoding="utf-8",
+    )
+    make_rules_index.main(["--all-packs", "--registry", str(registry)])
+
+    assert "skip 'pkg'" in capsys.readouterr().out
+    assert sorted(hashed) == ["1.0/a.md", "flat/b.md"]
+    docs = build_llm_context(registry_path=registry, sha_check="error")
+    assert [d.doc_id for d in docs] == ["v", "f"]
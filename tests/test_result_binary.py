@@ -0,0 +1,103 @@
+import struct
+
+import pytest
+
+from rules_packager_base import Result
+from rules_packager_base.result_binary import MAGIC, ResultFormatError, decode, encode
+
+
+def _fields(**kw):
+    base = {"test_name": "T", "measurements": {}, "verdicts": {}, "criteria": {}, "evidence": [], "log": []}
+    base.update(kw)
+    return base
+
+
+def test_binary_round_trip_keeps_key_order(tmp_path):
+    res = Result(test_name="order")
+    res.measurements.update({1: "ok", 2: 1.5, 3: None, 4: 7})
+    res.verdicts.update({2: "PASS", 1: "INFO", 4: "FAIL", 3: None})
+    res.criteria.update({4: {"type": "gt_abs", "ref": 4, "limit": 1}, 1: {"type": "string_eq", "ref": 1, "target": "ok"}})
+    res.log.append("done")
+    path = tmp_path / "results.rpb"
+    res.save(path, format="binary")
+
+    loaded = Result.load(path)
+    assert list(loaded.measurements.items()) == list(res.measurements.items())
+    assert list(loaded.verdicts.items()) == list(res.verdicts.items())
+    assert loaded.to_json() == res.to_json()
+
+
+@pytest.mark.parametrize(
+    "measurements",
+    [
+        {9: 1.0, -1: 2.0, 3: "x", 10**18: 4, 2: True, 5: 2**60, 1: 0.5},
+        {1: "a", 2: "b", 3: 1.0},
+        {1: 1.0, 2: 2.0, 3: [1, 2]},
+        {},
+    ],
+)
+def test_mixed_packed_and_json_entries_keep_order(measurements):
+    verdicts = {k: v for k, v in zip(measurements, ["SKIP", "PASS", None, "PARTIAL", "FAIL", "PASS", "x"])}
+    data = decode(encode(**_fields(measurements=measurements, verdicts=verdicts)))
+    assert list(data["measurements"].items()) == list(measurements.items())
+    assert list(data["verdicts"].items()) == list(verdicts.items())
+    assert [type(v) for v in data["measurements"].values()] == [type(v) for v in measurements.values()]
+
+
+@pytest.mark.parametrize(
+    "log",
+    [[], ["one"], ["", "two", ""], ["with\x00nul", "b"], ["text", 3, {"k": None}], ["ünïcode ✓"]],
+)
+@pytest.mark.parametrize("level", [0, 6])
+def test_log_encodings_round_trip(log, level):
+    assert decode(encode(**_fields(log=log), level=level))["log"] == log
+
+
+def test_compact_result_round_trip(tmp_path):
+    res = Result.compact("SWEEP")
+    for i in range(1000):
+        res.measurements[i] = i * 0.5
+        res.verdicts[i] = "PASS" if i % 7 else "FAIL"
+    res.measurements[5000] = "late"
+    path = res.save(tmp_path / "sweep.rpb")
+    loaded = Result.load(path)
+    assert type(loaded.measurements) is type(res.measurements)
+    assert loaded.to_json() == res.to_json()
+
+
+def _corrupt(data, *, magic=None, version=None, codec=None):
+    m, v, c, r, n = struct.unpack_from("<4sBBHI", data)
+    return struct.pack("<4sBBHI", magic or m, v if version is None else version, c if codec is None else codec, r, n) + data[12:]
+
+
+@pytest.mark.parametrize(
+    "mangle, message",
+    [
+        (lambda d: d[:5], "Truncated"),
+        (lambda d: _corrupt(d, magic=b"XXXX"), "bad magic"),
+        (lambda d: _corrupt(d, version=99), "version 99"),
+        (lambda d: _corrupt(d, codec=7), "codec 7"),
+        (lambda d: d[:-8], "Corrupt"),
+    ],
+)
+def test_corrupt_files_raise_format_error(mangle, message):
+    data = encode(**_fields(measurements={i: float(i) for i in range(100)}, log=["x"] * 50))
+    assert data.startswith(MAGIC)
+    with pytest.raises(ResultFormatError, match=message):
+        decode(mangle(data))
+
+
+def test_truncated_raw_payload_raises_format_error():
+    data = encode(**_fields(measurements={i: float(i) for i in range(100)}), level=0)
+    with pytest.raises(ResultFormatError, match="Truncated binary Result payload"):
+        decode(data[:-16])
+
+
+@pytest.mark.parametrize("fmt, suffix", [("json.gz", ".gz"), ("binary", ".rpb")])
+def test_level_zero_stores_uncompressed(tmp_path, fmt, suffix):
+    res = Result(test_name="L")
+    res.log.extend(["the same line"] * 2000)
+    stored = res.save(tmp_path / f"a{suffix}", fmt, level=0)
+    packed = res.save(tmp_path / f"b{suffix}", fmt)
+    assert stored.stat().st_size > 10 * packed.stat().st_size
+    assert Result.load(stored).to_json() == Result.load(packed).to_json() == res.to_json()
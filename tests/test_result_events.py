@@ -0,0 +1,145 @@
+import copy
+import json
+import os
+import pickle
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+from rules_packager_base import Result
+from rules_packager_base.result_events import EVENTS_ENV, EventPublisher, LiveResult, follow_events
+
+
+# The shape of a generated GUI test script: fields are reassigned after Result() is created.
+_SCRIPT = textwrap.dedent(
+    """
+    from rules_packager_base import Result
+
+    res = Result()
+    res.test_name = "PSU-001"
+    res.criteria = {1: {"type": "gt_abs", "ref": 1, "limit": 2.0}, 4: {"type": "string_eq", "ref": 4, "target": "ok"}}
+    res.measurements[1] = 2.5
+    res.measurements[4] = "bad"
+    res.verdicts = {1: "PASS", 4: "PASS"}
+    res.verdicts[4] = "FAIL"
+    res.log.append("done")
+    res.print_json()
+    """
+)
+
+
+def test_script_publishes_reassigned_fields(tmp_path):
+    events = tmp_path / "events.jsonl"
+    env = {**os.environ, EVENTS_ENV: str(events), "PYTHONPATH": os.pathsep.join(sys.path)}
+    proc = subprocess.run([sys.executable, "-c", _SCRIPT], env=env, capture_output=True, text=True, timeout=60)
+    assert proc.returncode == 0 and "Traceback" not in proc.stderr, proc.stderr
+
+    live = LiveResult()
+    for ev in follow_events(events, timeout=5):
+        live.apply(ev)
+    assert live.finished
+    assert sorted(live.criteria) == [1, 4]
+    assert live.verdicts == {1: "PASS", 4: "FAIL"}
+    assert live.overall == "FAIL" and live.test_name == "PSU-001"
+    assert list(live.log) == ["done"]
+
+
+def test_close_events_after_reassignment(tmp_path):
+    events = tmp_path / "events.jsonl"
+    res = Result()
+    res.publish_events(events)
+    res.evidence.append({"label": "old"})
+    res.log.append("old")
+    res.criteria = {1: {"type": "gt_abs", "ref": 1, "limit": 0}}
+    res.evidence = [{"label": "scope"}]
+    res.log = ["new"]
+    res.close_events()
+    live = LiveResult()
+    for ev in follow_events(events, timeout=5):
+        live.apply(ev)
+    assert live.finished and live.evidence == [{"label": "scope"}] and list(live.log) == ["new"]
+    assert type(res.criteria) is dict and type(res.log) is list
+
+
+def test_publishing_results_copy_and_share_one_sender(tmp_path):
+    events = tmp_path / "events.jsonl"
+    before = threading.active_count()
+    results = [Result() for _ in range(20)]
+    for res in results:
+        res.publish_events(events)
+        res.verdicts[1] = "PASS"
+    assert threading.active_count() <= before + 1
+
+    clone = copy.deepcopy(results[0])
+    assert clone._events is None and clone.verdicts == {1: "PASS"}
+    assert pickle.loads(pickle.dumps(results[0])).overall == "PASS"
+    for res in results:
+        res.close_events()
+
+
+def test_published_log_is_a_list(tmp_path):
+    events = tmp_path / "events.jsonl"
+    res = Result()
+    res.publish_events(events)
+    res.log.append("a")
+    res.log += ["b", "c"]
+    res.evidence += [{"label": "scope"}]
+    assert res.log[-2:] == ["b", "c"]
+    assert res.log + ["d"] == ["a", "b", "c", "d"]
+    assert json.loads(json.dumps(res.log)) == ["a", "b", "c"]
+    assert res == Result(log=["a", "b", "c"], evidence=[{"label": "scope"}])
+    res.close_events()
+
+    live = LiveResult()
+    for ev in follow_events(events, timeout=5):
+        live.apply(ev)
+    assert list(live.log) == ["a", "b", "c"] and live.evidence == [{"label": "scope"}]
+
+
+def test_streaming_log_tail_journals_in_place_adds(tmp_path):
+    res = Result()
+    res.stream_to(tmp_path / "results.jsonl", log_tail=2)
+    res.log += ["a", "b", "c"]
+    assert list(res.log) == ["b", "c"] and res.log.total == 3
+    path = res.close_stream()
+    assert Result.from_journal(path).log == ["a", "b", "c"]
+
+
+def test_events_carry_the_value_at_write_time(tmp_path):
+    events = tmp_path / "events.jsonl"
+    res = Result()
+    publisher = res.publish_events(events)
+    crit = {"type": "gt_abs", "ref": 1, "limit": 0}
+    res.criteria[1] = crit
+    crit["extra"] = 1  # changed while the record is still queued
+    publisher.flush()
+    res.close_events()
+    recs = [ev for ev in follow_events(events, timeout=5) if ev.get("t") == "c"]
+    assert recs == [{"t": "c", "id": 1, "v": {"type": "gt_abs", "ref": 1, "limit": 0}}]
+
+
+def test_sender_survives_a_failing_publisher(tmp_path):
+    class _Broken:
+        def write(self, data):
+            raise RuntimeError("boom")
+
+    bad = EventPublisher(tmp_path / "bad.jsonl", flush_interval=0.01)
+    bad._f = _Broken()
+    good = EventPublisher(tmp_path / "good.jsonl", flush_interval=0.01)
+    with pytest.warns(UserWarning, match="send failed"):
+        bad.write({"t": "l", "v": "x"})
+        good.write({"t": "l", "v": "y"})
+        deadline = time.monotonic() + 5
+        while "y" not in (tmp_path / "good.jsonl").read_text(encoding="utf-8") and time.monotonic() < deadline:
+            time.sleep(0.01)
+        good.write({"t": "l", "v": "z"})
+        while "z" not in (tmp_path / "good.jsonl").read_text(encoding="utf-8") and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert '"z"' in (tmp_path / "good.jsonl").read_text(encoding="utf-8")
+    bad._f = None
+    bad.close()
+    good.close()
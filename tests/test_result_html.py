@@ -0,0 +1,85 @@
+import gzip
+import re
+
+import pytest
+
+from rules_packager_base import Result
+
+
+def _result(n_lines):
+    res = Result(test_name="Html <report>")
+    res.criteria[1] = {"type": "lt_abs", "ref": 1, "limit": 5, "expr": "V < 5", "units": "V"}
+    res.measurements[1] = 4.2
+    res.verdicts[1] = "PASS"
+    res.log.append("Step 1: power <on>")
+    res.log.extend(f"line {n}" for n in range(2, n_lines + 1))
+    return res
+
+
+def _log_lines(html):
+    return re.findall(r"line \d+|Step 1: power &lt;on&gt;", html.split("<h2>Logs</h2>", 1)[1])
+
+
+def test_report_contents_are_escaped(tmp_path):
+    html = _result(3).export_html(tmp_path / "r.html").read_text(encoding="utf-8")
+    assert "<h1>Html &lt;report&gt;</h1>" in html
+    assert "<li>Step 1: power &lt;on&gt;</li>" in html
+    assert (
+        "<tr><td class='id'>1</td><td class='expr'>V &lt; 5</td><td class='meas'>4.2</td>"
+        "<td class='units'>V</td><td class='verdict pass'>PASS</td></tr>"
+    ) in html
+    assert "<pre>Step 1: power &lt;on&gt;\nline 2\nline 3</pre>" in html
+    assert "<details" not in html
+
+
+def test_long_logs_are_split_into_collapsed_pages(tmp_path):
+    html = _result(12).export_html(tmp_path / "r.html", log_page_lines=5).read_text(encoding="utf-8")
+    assert re.findall(r"<details( open)?><summary>([^<]*)</summary>", html) == [
+        (" open", "Lines 1-5"),
+        ("", "Lines 6-10"),
+        ("", "Lines 11-12"),
+    ]
+    assert _log_lines(html) == ["Step 1: power &lt;on&gt;"] + [f"line {n}" for n in range(2, 13)]
+    # Exactly one page's worth is not split.
+    assert "<details" not in _result(5).export_html(tmp_path / "r5.html", log_page_lines=5).read_text(encoding="utf-8")
+    assert "<details" not in _result(12).export_html(tmp_path / "r0.html", log_page_lines=None).read_text(encoding="utf-8")
+
+
+def test_max_log_lines_keeps_head_and_tail(tmp_path):
+    html = _result(10).export_html(tmp_path / "r.html", max_log_lines=4).read_text(encoding="utf-8")
+    assert _log_lines(html) == ["Step 1: power &lt;on&gt;", "line 2", "line 9", "line 10"]
+    assert "... 6 lines omitted ..." in html
+    html = _result(4).export_html(tmp_path / "r4.html", max_log_lines=4).read_text(encoding="utf-8")
+    assert "omitted" not in html
+
+
+@pytest.mark.parametrize("kwargs", [{"log_page_lines": -1}, {"max_log_lines": -1}])
+def test_rejects_negative_limits(tmp_path, kwargs):
+    with pytest.raises(ValueError, match=">= 0"):
+        _result(3).export_html(tmp_path / "r.html", **kwargs)
+    assert not (tmp_path / "r.html").exists()
+
+
+def test_gzip_output_and_file_names(tmp_path, monkeypatch):
+    res = _result(3)
+    plain = res.export_html(tmp_path / "r.html").read_text(encoding="utf-8")
+
+    path = res.export_html(tmp_path / "r.html.gz")
+    assert gzip.decompress(path.read_bytes()).decode("utf-8") == plain
+    path = res.export_html(tmp_path / "report", gzip=True)
+    assert path.name == "report.html.gz"
+    assert gzip.decompress(path.read_bytes()).decode("utf-8") == plain
+
+    monkeypatch.chdir(tmp_path)
+    assert res.export_html().name == "Html_<report>.html"
+    assert res.export_html(gzip=True).name == "Html_<report>.html.gz"
+
+
+def test_streaming_report_includes_lines_outside_the_tail(tmp_path):
+    res = _result(1)
+    res.stream_to(tmp_path / "r.jsonl", log_tail=2)
+    res.log.extend(f"line {n}" for n in range(2, 11))
+    assert len(res.log) == 2
+    html = res.export_html(tmp_path / "r.html").read_text(encoding="utf-8")
+    res.close_stream()
+    assert _log_lines(html) == ["Step 1: power &lt;on&gt;"] + [f"line {n}" for n in range(2, 11)]
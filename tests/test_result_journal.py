@@ -0,0 +1,65 @@
+import json
+
+from rules_packager_base import Result
+from rules_packager_base.result_journal import iter_log_entries
+
+
+def test_field_reassignment_while_streaming_is_journaled(tmp_path):
+    journal = tmp_path / "results.jsonl"
+    res = Result(test_name="T")
+    res.measurements[1] = 1.0
+    res.stream_to(journal)
+    # The GUI script pattern: whole fields are assigned, not mutated.
+    res.criteria = {1: {"type": "within_abs", "ref": 1, "target": 1.0, "tolerance": 0.1}}
+    res.measurements = {2: 2.0}
+    res.verdicts = {1: "PASS"}
+    res.verdicts[2] = "FAIL"
+    res.evidence = [{"label": "scope", "file": "a.png", "meas_id": 2}]
+    res.log.append("before reset")
+    res.log = ["after reset"]
+    res.log.append("last")
+    assert res.close_stream() == journal
+
+    back = Result.from_json_file(str(journal))
+    assert back.criteria == res.criteria
+    assert dict(back.measurements) == {2: 2.0}
+    assert dict(back.verdicts) == {1: "PASS", 2: "FAIL"}
+    assert back.evidence == res.evidence
+    assert back.log == ["after reset", "last"]
+    assert back.overall == "FAIL"
+
+    out = Result.rebuild_json(journal, tmp_path / "results.json")
+    assert out.read_text(encoding="utf-8") == json.dumps(res.to_json(), indent=2)
+
+
+def test_close_stream_after_reassignment_restores_plain_containers(tmp_path):
+    res = Result()
+    res.stream_to(tmp_path / "r.jsonl")
+    res.criteria = {1: {"type": "string_eq", "ref": 1, "target": "ok"}}
+    res.close_stream()
+    assert type(res.criteria) is dict and type(res.log) is list
+    res.criteria[2] = {}
+    assert set(res.criteria) == {1, 2}
+
+
+def test_log_reset_text_inside_a_value_keeps_the_log(tmp_path):
+    res = Result(test_name="T")
+    path = tmp_path / "results.jsonl"
+    res.stream_to(path)
+    res.log.append("first")
+    res.measurements[1] = {"t": "l-"}
+    res.criteria[2] = {"note": '{"t": "l-"}'}
+    res.log.append("second")
+    res.close_stream()
+    assert list(iter_log_entries(path)) == ["first", "second"]
+    assert Result.from_journal(path).log == ["first", "second"]
+
+
+def test_log_reset_record_drops_earlier_lines(tmp_path):
+    res = Result()
+    path = tmp_path / "results.jsonl"
+    res.stream_to(path)
+    res.log.append("old")
+    res.log = ["new"]
+    res.close_stream()
+    assert list(iter_log_entries(path)) == ["new"]
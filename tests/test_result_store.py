@@ -0,0 +1,76 @@
+import copy
+import json
+import random
+
+import pytest
+
+from rules_packager_base import Result
+from rules_packager_base.result_store import CompactVerdicts, TrackedVerdicts, overall_of
+
+
+@pytest.mark.parametrize("key", [100001, 10**9, -1, "7"])
+def test_compact_verdict_outside_the_array_counts_by_value(key):
+    res = Result.compact()
+    res.verdicts[1] = "PASS"
+    res.verdicts[key] = "PASS"
+    assert res.overall == "PASS"
+    assert res.verdict_counts() == (2, 0, 0, 2)
+    res.verdicts[key] = "FAIL"
+    assert res.overall == "FAIL"
+    del res.verdicts[key]
+    assert res.verdict_counts() == (1, 0, 0, 1)
+
+
+def test_compact_verdicts_match_plain_dict():
+    rng = random.Random(0)
+    store, model = CompactVerdicts(), {}
+    for _ in range(5000):
+        key = rng.choice([rng.randrange(200), rng.randrange(10**6, 10**7), -rng.randrange(1, 5)])
+        if key in model and rng.random() < 0.3:
+            del store[key], model[key]
+        else:
+            value = rng.choice(["PASS", "FAIL", "SKIP", "INFO", None])
+            store[key] = model[key] = value
+        vals = list(model.values())
+        expected = (vals.count("PASS"), vals.count("FAIL"), vals.count("SKIP"), len(vals))
+        assert store.verdict_counts() == expected
+    assert dict(store.items()) == model
+
+
+def test_verdicts_are_a_dict():
+    res = Result()
+    res.verdicts = {1: "PASS"}
+    res.verdicts[2] = "FAIL"
+    assert isinstance(res.verdicts, dict)
+    assert json.loads(json.dumps(res.verdicts)) == {"1": "PASS", "2": "FAIL"}
+    assert res.verdicts | {3: "SKIP"} == {1: "PASS", 2: "FAIL", 3: "SKIP"}
+    assert repr(res.verdicts) == "TrackedVerdicts({1: 'PASS', 2: 'FAIL'})"
+    assert copy.deepcopy(res.verdicts) == res.verdicts
+
+
+def test_tracked_verdicts_count_every_dict_method():
+    seen = []
+    v = TrackedVerdicts({1: "PASS"})
+    v.add_listener(lambda *change: seen.append(change))
+    v.update({2: "FAIL"}, x="SKIP")
+    assert v.verdict_counts() == (1, 1, 1, 3)
+    v |= {1: "FAIL"}
+    assert v.setdefault(3, "PASS") == "PASS" and v.setdefault(3, "FAIL") == "PASS"
+    assert v.verdict_counts() == (1, 2, 1, 4)
+    assert v.pop(2) == "FAIL" and v.pop(2, None) is None
+    assert v.popitem() == (3, "PASS")
+    assert v.verdict_counts() == (0, 1, 1, 2)
+    v.clear()
+    assert v.verdict_counts() == (0, 0, 0, 0) and overall_of(v) == "SKIP"
+    assert seen[:3] == [(2, None, "FAIL"), ("x", None, "SKIP"), (1, "PASS", "FAIL")]
+    assert len(seen) == 8
+
+
+def test_listeners_survive_verdict_reassignment():
+    for res in (Result(), Result.compact()):
+        seen = []
+        res.add_verdict_listener(lambda *change: seen.append(change))
+        res.verdicts = {1: "PASS"}
+        res.verdicts[1] = "FAIL"
+        assert seen[-1] == (1, "PASS", "FAIL")
+        assert res.overall == "FAIL"
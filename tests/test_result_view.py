@@ -0,0 +1,115 @@
+import json
+
+import pytest
+
+from rules_packager_base import Result
+from rules_packager_base import result_view
+from rules_packager_base.result_view import ResultIndexError, ResultView, index_path_for
+
+
+@pytest.fixture
+def results_json(tmp_path):
+    res = Result(test_name="view")
+    res.measurements.update({1: 1.5, 2: "a, [b] {c}", 3: None, 4: [1, {"x": "}"}]})
+    res.verdicts.update({1: "PASS", 2: "FAIL", 4: "INFO"})
+    res.criteria.update({10: {"type": "gt_abs", "ref": 1, "limit": 1}, -3: {"type": "string_eq", "ref": 2, "target": "a"}})
+    res.evidence.append({"file": "scope.png"})
+    res.log.extend(["Step 1", 'quote " and \\ backslash', {"nested": [1, 2]}, 3, ""])
+    path = tmp_path / "results.json"
+    res.save(path)
+    return path
+
+
+def test_view_matches_full_load(results_json):
+    full = Result.from_json_file(str(results_json))
+    with ResultView(results_json) as rv:
+        assert rv.test_name == "view"
+        assert rv.overall == full.overall == "FAIL"
+        assert rv.evidence == full.evidence
+        for name in ("measurements", "verdicts", "criteria"):
+            view = getattr(rv, name)
+            assert dict(view.items()) == getattr(full, name)
+            assert list(view) == list(getattr(full, name))
+        assert rv.measurements[4] == [1, {"x": "}"}]
+        assert rv.criteria[-3]["target"] == "a"
+        assert 3 in rv.measurements and 5 not in rv.measurements and "1" not in rv.measurements
+        with pytest.raises(KeyError):
+            rv.verdicts[3]
+        assert rv.to_result().to_json() == full.to_json()
+
+
+def test_log_indexing_and_slices(results_json):
+    log = ["Step 1", 'quote " and \\ backslash', {"nested": [1, 2]}, 3, ""]
+    with ResultView(results_json) as rv:
+        assert len(rv.log) == 5
+        assert list(rv.log) == log
+        assert rv.log[-1] == "" and rv.log[1] == log[1]
+        assert rv.log[-2:] == log[-2:] and rv.log[::2] == log[::2] and rv.log[10:] == []
+        with pytest.raises(IndexError):
+            rv.log[5]
+
+
+def test_only_canonical_int_keys_become_ints(tmp_path):
+    path = tmp_path / "results.json"
+    keys = ["1", "1_0", " 2", "+3", "04", "-0", "-5", "\\u0036", "x", str(2**70)]
+    body = ", ".join(f'"{k}": {i}' for i, k in enumerate(keys))
+    path.write_text(f'{{"test_name": "k", "measurements": {{{body}}}, "log": []}}', encoding="utf-8")
+    with ResultView(path) as rv:
+        assert dict(rv.measurements.items()) == {1: 0, "1_0": 1, " 2": 2, "+3": 3, "04": 4, "-0": 5, -5: 6, 6: 7, "x": 8, 2**70: 9}
+        assert 10 not in rv.measurements
+    # The sidecar keeps the same keys.
+    with ResultView(path) as rv:
+        assert rv.measurements["1_0"] == 1 and rv.measurements[6] == 7 and rv.measurements[2**70] == 9
+
+
+def test_sidecar_is_reused_until_the_file_changes(results_json, monkeypatch):
+    ResultView(results_json).close()
+    assert index_path_for(results_json).is_file()
+
+    builds = []
+    real = result_view.build_index
+    monkeypatch.setattr(result_view, "build_index", lambda p: builds.append(p) or real(p))
+    with ResultView(results_json) as rv:
+        assert rv.measurements[1] == 1.5
+    assert builds == []
+
+    res = Result.from_json_file(str(results_json))
+    res.measurements[1] = 2.5
+    res.measurements[5] = 5
+    res.save(results_json)
+    with ResultView(results_json) as rv:
+        assert rv.measurements[1] == 2.5 and rv.measurements[5] == 5
+    assert builds == [results_json]
+
+
+def test_stale_or_corrupt_sidecars_are_ignored(results_json):
+    ResultView(results_json).close()
+    sidecar = index_path_for(results_json)
+    for data in (b"", b"RPRI", b"XXXX" + sidecar.read_bytes()[4:], sidecar.read_bytes() + b"\0" * 8):
+        sidecar.write_bytes(data)
+        assert result_view.read_index(results_json) is None
+        with ResultView(results_json) as rv:
+            assert rv.measurements[1] == 1.5
+        assert result_view.read_index(results_json) is not None
+
+
+def test_without_sidecar(results_json):
+    with ResultView(results_json, write_sidecar=False) as rv:
+        assert rv.verdicts[2] == "FAIL"
+    assert not index_path_for(results_json).exists()
+
+
+@pytest.mark.parametrize("text", ['{"measurements": {"1": 1', "", '{"log": [1, 2'])
+def test_truncated_files_are_rejected(tmp_path, text):
+    path = tmp_path / "results.json"
+    path.write_text(text, encoding="utf-8")
+    with pytest.raises(ResultIndexError):
+        ResultView(path)
+
+
+def test_overall_is_recomputed_when_missing(tmp_path):
+    path = tmp_path / "results.json"
+    path.write_text(json.dumps({"test_name": "o", "verdicts": {"1": "PASS", "2": "FAIL"}}), encoding="utf-8")
+    with ResultView(path) as rv:
+        assert rv.overall == "FAIL"
+        assert len(rv.log) == 0 and rv.evidence == []
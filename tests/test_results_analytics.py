@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from rules_packager_base.results_analytics import ResultsScanError, scan_results
+
+
+def _write_run(root, name, data):
+    run = root / name
+    run.mkdir(parents=True)
+    (run / "results.json").write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_verdicts_are_filed_under_the_measurements_their_criteria_refer_to(tmp_path):
+    criteria = {
+        "3": {"type": "gt_abs_expr", "refs": [1, 2], "limit": 0.0},
+        "4": {"type": "range_abs", "ref": 3, "lower": 0.0, "upper": 10.0},
+    }
+    _write_run(tmp_path, "a", {
+        "measurements": {"1": 5.0, "2": 1.0, "3": 4.0},
+        "verdicts": {"3": "FAIL", "4": "PASS"},
+        "criteria": criteria,
+    })
+    table = scan_results(tmp_path, cache=False)
+    stats = table.stats()
+    assert sorted(stats) == [1, 2, 3]  # no phantom row for rule 4
+    assert stats[3].yield_ == 1.0
+    assert stats[3].n_pass == 1 and stats[3].n_fail == 0
+    assert stats[1].yield_ == 0.0 and stats[2].yield_ == 0.0
+    assert (stats[3].lsl, stats[3].usl) == (0.0, 10.0)
+
+
+def test_verdict_without_a_criterion_falls_back_to_its_own_id(tmp_path):
+    _write_run(tmp_path, "a", {"measurements": {"7": 1.0}, "verdicts": {"7": "PASS", "8": "FAIL"}})
+    stats = scan_results(tmp_path, cache=False).stats()
+    assert list(stats) == [7]
+    assert stats[7].n_pass == 1
+
+
+def test_non_integer_ids_raise_scan_error(tmp_path):
+    _write_run(tmp_path, "a", {"measurements": {"x": 1.0}, "verdicts": {}})
+    with pytest.raises(ResultsScanError):
+        scan_results(tmp_path, cache=False)
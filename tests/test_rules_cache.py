@@ -0,0 +1,79 @@
+import json
+import os
+import warnings
+
+import pytest
+
+from rules_packager_base.driver_links import build_llm_context
+from rules_packager_base.rules_cache import CachedDoc, RuleDocCache
+
+
+def _doc(n, fill="x"):
+    return CachedDoc(sha256=f"{n:064x}", content=fill * n, doc_id=f"d{n}", title=None)
+
+
+def test_hit_requires_matching_stat_and_survives_reopen(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    with RuleDocCache(path) as cache:
+        cache.put("/a.md", 3, 111, _doc(3))
+    with RuleDocCache(path) as cache:
+        assert cache.get("/a.md", 3, 111) == _doc(3)
+        assert cache.get_meta("/a.md", 3, 111) == (_doc(3).sha256, "d3", None)
+        assert cache.get("/a.md", 3, 112) is None
+        assert cache.get("/a.md", 4, 111) is None
+        assert cache.get("/b.md", 3, 111) is None
+
+
+def test_evicts_least_recently_used_past_max_bytes(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    with RuleDocCache(path) as cache:
+        cache.put("/a.md", 4, 1, _doc(4))
+        cache.put("/b.md", 4, 1, _doc(4))
+    with RuleDocCache(path, max_bytes=8) as cache:
+        assert cache.get("/a.md", 4, 1) is not None
+        cache.put("/c.md", 4, 1, _doc(4))
+    with RuleDocCache(path) as cache:
+        assert cache.get("/a.md", 4, 1) is not None
+        assert cache.get("/b.md", 4, 1) is None
+        assert cache.get("/c.md", 4, 1) is not None
+
+
+def test_discards_unreadable_cache_file(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    path.write_bytes(b"not a database" * 100)
+    with pytest.warns(UserWarning, match="Discarding unreadable rule doc cache"):
+        cache = RuleDocCache(path)
+    with cache:
+        assert cache.get("/a.md", 1, 1) is None
+        cache.put("/a.md", 1, 1, _doc(1))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        with RuleDocCache(path) as cache:
+            assert cache.get("/a.md", 1, 1) == _doc(1)
+
+
+def test_loader_serves_unchanged_stat_from_cache(tmp_path):
+    pack = tmp_path / "pack"
+    pack.mkdir()
+    md = pack / "a.md"
+    md.write_text("---\ndoc_id: one\n---\n# One\n", encoding="utf-8")
+    (pack / "rules_index.json").write_text(json.dumps({"files": [{"name": "a.md"}]}), encoding="utf-8")
+    registry = tmp_path / "registry.json"
+    registry.write_text(
+        json.dumps({"packs": [{"id": "p", "enabled": True, "rules": {"source": {"type": "path", "path": "pack"}, "rules_index": "rules_index.json"}}]}),
+        encoding="utf-8",
+    )
+    cache_path = tmp_path / "cache.sqlite"
+
+    def load():
+        return build_llm_context(registry_path=registry, cache_path=cache_path, workers=2)
+
+    first = load()
+    st = md.stat()
+    # Same size and mtime: the cached doc is served without reading the file.
+    md.write_text("---\ndoc_id: two\n---\n# Two\n", encoding="utf-8")
+    os.utime(md, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert load() == first
+
+    os.utime(md, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    assert [d.doc_id for d in load()] == ["two"]
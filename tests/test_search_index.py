@@ -0,0 +1,74 @@
+import pytest
+
+from rules_packager_base.search_index import search, tokenize, write_search_index
+from rules_packager_base.section_index import SectionIndexError, write_section_index
+
+
+DOCS = {
+    "a.md": "# Voltage\n\n## Measure\n\nUse MEAS:VOLT? to read the voltage.\n\n## Limits\n\nCheck voltage limits.\n",
+    "b.md": "# Current\n\n## Measure\n\nUse MEAS:CURR? to read the current.\n",
+    "c.md": "# Misc\n\nNothing about it.\n",
+}
+
+
+def _collect(rules_dir, docs):
+    for name, text in docs.items():
+        (rules_dir / name).write_text(text, encoding="utf-8")
+    manifest = [{"index": i, "filename": name, "doc_id": name[:-3], "source": "pack:p"} for i, name in enumerate(docs, 1)]
+    write_section_index(rules_dir, manifest)
+    return write_search_index(rules_dir)
+
+
+@pytest.fixture
+def rules_dir(tmp_path):
+    assert _collect(tmp_path, DOCS) == 3
+    return tmp_path
+
+
+def test_tokenize_splits_scpi_and_placeholders():
+    assert tokenize("MEAS:VOLT? ${V_OUT} Größe") == ["meas", "volt", "v_out", "grösse"]
+
+
+def test_ranks_sections_by_bm25(rules_dir):
+    # Same term frequency everywhere, so shorter sections rank higher.
+    hits = search(rules_dir, "voltage")
+    assert [(h.doc_id, h.heading_path) for h in hits] == [
+        ("a", ("Voltage",)),
+        ("a", ("Voltage", "Limits")),
+        ("a", ("Voltage", "Measure")),
+    ]
+    assert hits[0].score > 0 and [h.score for h in hits] == sorted((h.score for h in hits), reverse=True)
+
+    hits = search(rules_dir, "meas:curr")
+    assert (hits[0].doc_id, hits[0].heading_path) == ("b", ("Current", "Measure"))
+
+
+def test_ties_follow_manifest_order_and_limit_applies(rules_dir):
+    hits = search(rules_dir, "use read")
+    assert [h.doc_id for h in hits] == ["a", "b"]
+    assert hits[0].score == hits[1].score
+    assert [h.doc_id for h in search(rules_dir, "use read", limit=1)] == ["a"]
+    assert search(rules_dir, "?!") == [] and search(rules_dir, "voltage", limit=0) == []
+
+
+def test_doc_id_filter_and_text(rules_dir):
+    (hit,) = search(rules_dir, "measure", doc_id="b", with_text=True)
+    assert hit.text == "## Measure\n\nUse MEAS:CURR? to read the current.\n"
+    assert hit.text.encode("utf-8") == (rules_dir / "b.md").read_bytes()[hit.start : hit.end]
+    assert search(rules_dir, "measure")[0].text is None
+
+
+def test_only_changed_docs_are_reindexed(rules_dir):
+    assert _collect(rules_dir, DOCS) == 0
+    changed = dict(DOCS, **{"c.md": "# Misc\n\nNow it mentions voltage.\n"})
+    assert _collect(rules_dir, changed) == 1
+    assert ("c", ("Misc",)) in [(h.doc_id, h.heading_path) for h in search(rules_dir, "voltage")]
+
+
+def test_search_index_out_of_step_with_sections_is_stale(rules_dir):
+    (rules_dir / "c.md").write_text("# Misc\n\n## New\n\nMore sections now.\n", encoding="utf-8")
+    write_section_index(rules_dir, [{"index": 1, "filename": "c.md", "doc_id": "c"}])
+    with pytest.raises(SectionIndexError, match="Search index is stale"):
+        search(rules_dir, "sections")
+    with pytest.raises(SectionIndexError, match="No search index"):
+        search(rules_dir / "missing", "x")
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from rules_packager_base.section_index import SectionIndexError, query_sections, write_section_index
+
+
+DOC = (
+    "---\ndoc_id: a\n---\n"
+    "# Überblick\n\nIntro — ünïcode.\n\n"
+    "## Setup\n\nInstall.\n\n"
+    "### Setup details\n\n```\n## not a heading\n```\n\n"
+    "## Usage\n\nRun it.\n"
+)
+
+
+@pytest.fixture
+def rules_dir(tmp_path):
+    (tmp_path / "a.md").write_bytes(DOC.encode("utf-8"))
+    (tmp_path / "b.md").write_bytes(b"# B\r\n\r\n## Setup\r\n\r\nCRLF body.\r\n")
+    manifest = [
+        {"index": 1, "filename": "a.md", "doc_id": "a", "source": "pack:p"},
+        {"index": 2, "filename": "b.md", "doc_id": "b", "source": "pack:p"},
+        {"index": 3, "filename": "a.md", "doc_id": "a-alias", "source": "pack:q"},
+    ]
+    write_section_index(tmp_path, manifest)
+    return tmp_path
+
+
+def test_doc_id_returns_whole_doc(rules_dir):
+    (hit,) = query_sections(rules_dir, doc_id="b")
+    assert hit.text == "# B\r\n\r\n## Setup\r\n\r\nCRLF body.\r\n"
+    assert (hit.filename, hit.heading_path, hit.start) == ("b.md", (), 0)
+
+
+def test_heading_query_spans_subsections_in_manifest_order(rules_dir):
+    hits = query_sections(rules_dir, heading="setup")
+    assert [(h.doc_id, h.heading_path) for h in hits] == [
+        ("a", ("Überblick", "Setup")),
+        ("b", ("B", "Setup")),
+        ("a-alias", ("Überblick", "Setup")),
+    ]
+    assert hits[0].text == "## Setup\n\nInstall.\n\n### Setup details\n\n```\n## not a heading\n```\n\n"
+    assert hits[1].text == "## Setup\r\n\r\nCRLF body.\r\n"
+    raw = (rules_dir / "a.md").read_bytes()
+    assert raw[hits[0].start : hits[0].end].decode("utf-8") == hits[0].text
+
+
+def test_heading_query_without_subsections(rules_dir):
+    hits = query_sections(rules_dir, doc_id="a", heading="SETUP", include_subsections=False)
+    assert [h.heading_path for h in hits] == [("Überblick", "Setup"), ("Überblick", "Setup", "Setup details")]
+    assert hits[0].text == "## Setup\n\nInstall.\n\n"
+    assert query_sections(rules_dir, heading="not a heading") == []
+
+
+def test_shared_file_is_indexed_once(rules_dir):
+    idx = json.loads((rules_dir / "sections.json").read_text(encoding="utf-8"))
+    assert sorted(idx["files"]) == ["a.md", "b.md"]
+    assert [d["doc_id"] for d in idx["docs"]] == ["a", "b", "a-alias"]
+
+
+def test_rewritten_index_is_picked_up(rules_dir):
+    (rules_dir / "c.md").write_text("# C\n\n## Setup\n\nNew.\n", encoding="utf-8")
+    write_section_index(rules_dir, [{"index": 1, "filename": "c.md", "doc_id": "c"}])
+    assert [h.doc_id for h in query_sections(rules_dir, heading="setup")] == ["c"]
+
+
+def test_unchanged_index_is_not_rewritten(rules_dir):
+    path = rules_dir / "sections.json"
+    manifest = [{"index": 1, "filename": f, "doc_id": d, "source": "pack:p"} for f, d in (("a.md", "a"), ("b.md", "b"))]
+    write_section_index(rules_dir, manifest)
+    mtime = path.stat().st_mtime_ns
+    write_section_index(rules_dir, manifest)
+    assert path.stat().st_mtime_ns == mtime
+
+
+def test_missing_or_stale_index_is_reported(rules_dir, tmp_path_factory):
+    with pytest.raises(SectionIndexError, match="No section index"):
+        query_sections(tmp_path_factory.mktemp("empty"))
+
+    (rules_dir / "b.md").write_text("# B\n\nshorter\n", encoding="utf-8")
+    with pytest.raises(SectionIndexError, match="stale"):
+        query_sections(rules_dir, doc_id="b")
+
+
+def test_same_size_edit_that_breaks_utf8_is_reported_as_stale(rules_dir):
+    # Same size, so only the decode can notice: the old offsets now start inside "Ü".
+    raw = (rules_dir / "a.md").read_bytes()
+    (rules_dir / "a.md").write_bytes(raw[:4] + raw[7:] + b"xyz")
+    with pytest.raises(SectionIndexError, match="stale"):
+        query_sections(rules_dir, doc_id="a", heading="Überblick", include_subsections=False)
@@ -0,0 +1,80 @@
+import math
+
+import pytest
+
+from rules_packager_base.test_helpers import parse_quantities, parse_quantity
+
+
+@pytest.mark.parametrize("text", ["inf V", "-inf mV", "nan V", "infinity A", "NaN ms", "inf", "Infinity", "1_000 V"])
+@pytest.mark.parametrize("cache", [True, False])
+def test_parse_quantity_rejects_non_numbers(text, cache):
+    with pytest.raises(ValueError):
+        parse_quantity(text, cache=cache)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("2.40V", 2.40),
+        ("10 ms", 0.010),
+        ("4,7 kΩ", 4700.0),
+        ("4.7kOhm", 4700.0),
+        ("220 ohms", 220.0),
+        ("12.5MHz", 12.5e6),
+        ("1.5 kW", 1500.0),
+        ("250 mW", 0.25),
+        ("10n", 10e-9),
+        ("3 dB", 3.0),
+    ],
+)
+def test_parse_quantity_units(text, expected):
+    assert parse_quantity(text) == pytest.approx(expected)
+
+
+def test_parse_quantity_overflow_is_still_inf():
+    assert parse_quantity("1e999 V") == math.inf
+
+
+def test_parse_quantity_unknown_time_prefix():
+    with pytest.raises(ValueError):
+        parse_quantity("10 qs")
+
+
+def _expected(items):
+    out = []
+    for item in items:
+        if isinstance(item, (int, float)) and not isinstance(item, bool):
+            out.append((float(item), False))
+            continue
+        try:
+            out.append((parse_quantity(item), False))
+        except (ValueError, TypeError, AttributeError):
+            out.append((math.nan, True))
+    return out
+
+
+def _same(a, b):
+    return (math.isnan(a) and math.isnan(b)) or a == b
+
+
+@pytest.mark.parametrize(
+    "items",
+    [
+        ["1.0", "2.5", "-3e2"],
+        ["12.3mV", "12.4mV", "1,5mV"],
+        ["12.3mV", "12.4 mV", "inf mV"],
+        ["inf mV"],
+        ["nan", "1", "2"],
+        ["1e999 V", "2 V"],
+        ["1 V", "2 mV", "3 kΩ", "4 MHz", "oops", "", "10 qs"],
+        ["1_0 V", "2 V"],
+        ["1 V", None, 2, 2.5, True],
+        [],
+    ],
+)
+def test_parse_quantities_matches_parse_quantity(items):
+    parsed, errors = parse_quantities(items)
+    assert len(parsed) == len(errors) == len(items)
+    for got, err, (want, want_err) in zip(parsed, errors, _expected(items)):
+        assert bool(err) == want_err
+        assert _same(float(got), want)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Micro-benchmark parse_quantity against the previous (regex-per-call) implementation.
+
+Usage:
+  python tools/bench_parse_quantity.py                # default sample mix
+  python tools/bench_parse_quantity.py -n 200000 --distinct 500
+
+The sample mix imitates instrument logs: a limited set of distinct strings
+("12.3mV", "4.7 kΩ", "1.25e-3 A", ...) repeated many times. Before timing, every
+sample is checked to parse to the same value as the old implementation, except
+for units the old code ignored (Hz, W, Ω).
+"""
+
+from __future__ import annotations
+
+import argparse
+import pathlib
+import random
+import re
+import sys
+import timeit
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+
+_SI = {"y":1e-24,"z":1e-21,"a":1e-18,"f":1e-15,"p":1e-12,"n":1e-9,"u":1e-6,"µ":1e-6,"m":1e-3,
+       "":1.0,"k":1e3,"K":1e3,"M":1e6,"G":1e9,"T":1e12,"P":1e15,"E":1e18,"Z":1e21,"Y":1e24}
+
+
+def legacy_parse_quantity(s: str, default_unit: str = "V") -> float:
+    # Verbatim copy of parse_quantity before the lookup-table rewrite.
+    s = s.strip().replace(",", ".")
+    m = re.fullmatch(r"\s*([+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)\s*([a-zA-ZµΩOhms]*)\s*", s)
+    if not m:
+        raise ValueError("Invalid numeric input")
+    val = float(m.group(1))
+    unit = (m.group(2) or "").replace("Ohms","Ω").replace("ohms","Ω").replace("Ohm","Ω").replace("ohm","Ω")
+    if unit in _SI:
+        return val * _SI[unit]
+    if unit.endswith("V"):
+        pre = unit[:-1]
+        if pre in _SI:
+            val *= _SI[pre]
+        return val
+    if unit.endswith("A"):
+        pre = unit[:-1]
+        if pre in _SI:
+            val *= _SI[pre]
+        return val
+    if unit.endswith("s") or unit.endswith("S"):
+        pre = unit[:-1]
+        if pre == "":
+            return val
+        if pre in _SI:
+            return val * _SI[pre]
+        raise ValueError("Unrecognized time unit")
+    return val
+
+
+_NEW_UNITS = re.compile(r"(Hz|W|Ω|[Oo]hms?)$")
+
+
+def _samples(n: int, distinct: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    units = ["V", "mV", "uV", "µV", "A", "mA", "s", "ms", "us", "ns", "", "m", "k",
+             "Hz", "kHz", "MHz", "W", "mW", "Ω", "kΩ", "kOhm", "Mohms", "dB", "Vpk"]
+    pool: list[str] = []
+    for _ in range(distinct):
+        num = f"{rng.uniform(-1000, 1000):.{rng.randint(0, 4)}f}"
+        if rng.random() < 0.1:
+            num = f"{rng.uniform(0, 10):.3e}"
+        pool.append(num + rng.choice(["", " "]) + rng.choice(units))
+    return [rng.choice(pool) for _ in range(n)]
+
+
+def _check(samples: list[str], parse) -> None:
+    for s in set(samples):
+        try:
+            new = parse(s)
+        except ValueError as e:
+            new = e.__class__
+        try:
+            old = legacy_parse_quantity(s)
+        except ValueError as e:
+            old = e.__class__
+        if old != new and not _NEW_UNITS.search(s.strip()):
+            raise SystemExit(f"Mismatch for {s!r}: legacy={old!r} new={new!r}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark parse_quantity")
+    ap.add_argument("-n", type=int, default=100_000, help="Number of strings to parse per run")
+    ap.add_argument("--distinct", type=int, default=1000, help="Number of distinct strings in the mix")
+    ap.add_argument("--repeat", type=int, default=5, help="Timing runs; the best is reported")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    sys.path.insert(0, str(ROOT / "src"))
+    from rules_packager_base.test_helpers import _parse_quantity_cached, parse_quantity
+
+    samples = _samples(args.n, args.distinct, args.seed)
+    _check(samples, lambda s: parse_quantity(s, cache=False))
+
+    def run(fn, **kw):
+        def loop():
+            for s in samples:
+                fn(s, **kw)
+        return min(timeit.repeat(loop, number=1, repeat=args.repeat))
+
+    legacy = run(legacy_parse_quantity)
+    uncached = run(parse_quantity, cache=False)
+    _parse_quantity_cached.cache_clear()
+    cached = run(parse_quantity)
+
+    print(f"{args.n} strings, {args.distinct} distinct")
+    for name, t in (("legacy", legacy), ("table", uncached), ("table+lru", cached)):
+        print(f"  {name:<10} {t * 1e3:8.1f} ms  {t / args.n * 1e9:7.0f} ns/call  x{legacy / t:4.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,11 +2,19 @@
 from __future__ import annotations
 
 import argparse
+import base64
+import concurrent.futures
+import dataclasses
+import fnmatch
 import hashlib
 import json
+import os
 import re
+import shutil
 import subprocess
 import sys
+import tempfile
+import zipfile
 from pathlib import Path
 from typing import Any
 
@@ -41,6 +49,8 @@ def _clean_output_dir(out_dir: Path) -> None:
     for p in out_dir.glob("*.md"):
         p.unlink(missing_ok=True)
     (out_dir / "manifest.json").unlink(missing_ok=True)
+    (out_dir / "sections.json").unlink(missing_ok=True)
+    (out_dir / "search_index.json").unlink(missing_ok=True)
 
 
 def _clean_wheels_dir(out_dir: Path) -> None:
@@ -134,43 +144,193 @@ if __name__ == "__main__":
         )
 
 
-def collect_rules(*, registry_path: Path, out_dir: Path, overwrite: bool, sha_check: str) -> None:
+def _atomic_write_text(path: Path, text: str) -> None:
+    # Write next to the target and rename over it so readers (GUI watchers,
+    # rsync) never observe a half-written file.
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _read_manifest(out_dir: Path) -> list[dict[str, Any]]:
+    try:
+        data = _load_json(out_dir / "manifest.json")
+    except (OSError, ValueError):
+        return []
+    if not isinstance(data, list):
+        return []
+    return [e for e in data if isinstance(e, dict)]
+
+
+def _sync_output_dir(
+    out_dir: Path,
+    contents: dict[str, str],
+    manifest: list[dict[str, object]],
+) -> None:
+    """Bring out_dir in line with manifest, touching only what changed."""
+    old_sha = {
+        str(e.get("filename")): e.get("sha256")
+        for e in _read_manifest(out_dir)
+    }
+
+    added: list[str] = []
+    changed: list[str] = []
+    unchanged = 0
+    seen: set[str] = set()
+
+    for ent in manifest:
+        filename = str(ent["filename"])
+        if filename in seen:
+            continue  # deduplicated alias sharing a file
+        seen.add(filename)
+        path = out_dir / filename
+        if old_sha.get(filename) == ent["sha256"] and path.is_file():
+            unchanged += 1
+            continue
+        _atomic_write_text(path, contents[filename])
+        (changed if filename in old_sha else added).append(filename)
+
+    # Only remove files we own.
+    removed: list[str] = []
+    for p in sorted(out_dir.glob("*.md")):
+        if p.name not in contents:
+            p.unlink(missing_ok=True)
+            removed.append(p.name)
+
+    manifest_text = json.dumps(manifest, indent=2, ensure_ascii=False)
+    manifest_path = out_dir / "manifest.json"
+    try:
+        manifest_same = manifest_path.read_text(encoding="utf-8") == manifest_text
+    except OSError:
+        manifest_same = False
+    if not manifest_same:
+        _atomic_write_text(manifest_path, manifest_text)
+
+    for name in added:
+        print(f"  + {name}")
+    for name in changed:
+        print(f"  ~ {name}")
+    for name in removed:
+        print(f"  - {name}")
+    print(
+        f"Sync: {len(added)} added, {len(changed)} changed, {len(removed)} removed, "
+        f"{unchanged} unchanged"
+    )
+
+
+def _doc_filename(doc: Any, taken: set[str]) -> str:
+    # Named after the doc itself, not its position, so adding or dropping a doc
+    # (e.g. under --max-tokens) does not rename the others and --sync stays incremental.
+    # "index" in manifest.json keeps the order.
+    doc_id = doc.doc_id or f"no-doc-id-{doc.sha256[:8]}"
+    stem = f"{_slug(doc.source)}_{_slug(doc_id)}"
+    filename = f"{stem}.md"
+    if filename in taken:
+        filename = f"{stem}_{doc.sha256[:8]}.md"
+        n = 2
+        while filename in taken:
+            filename = f"{stem}_{doc.sha256[:8]}-{n}.md"
+            n += 1
+    taken.add(filename)
+    return filename
+
+
+def collect_rules(
+    *,
+    registry_path: Path,
+    out_dir: Path,
+    overwrite: bool,
+    sha_check: str,
+    jobs: int = 1,
+    cache_dir: Path | None = None,
+    sync: bool = False,
+    rules_versions: dict[str, str] | None = None,
+    dedup: bool = False,
+    max_tokens: int | None = None,
+) -> None:
     _ensure_import_paths(_project_root())
     from rules_packager_base.driver_links import build_llm_context  # type: ignore[import-not-found]  # noqa: E402
+    from rules_packager_base.search_index import write_search_index  # type: ignore[import-not-found]  # noqa: E402
+    from rules_packager_base.section_index import write_section_index  # type: ignore[import-not-found]  # noqa: E402
 
-    if out_dir.exists():
+    if sync:
+        # Incremental mode manages an existing folder in place; no --overwrite needed.
+        out_dir.mkdir(parents=True, exist_ok=True)
+    elif out_dir.exists():
         if not overwrite:
-            raise SystemExit(f"Output folder already exists: {out_dir} (use --overwrite)")
+            raise SystemExit(f"Output folder already exists: {out_dir} (use --overwrite or --sync)")
         _clean_output_dir(out_dir)
     else:
         out_dir.mkdir(parents=True, exist_ok=True)
 
-    docs = build_llm_context(registry_path=registry_path, sha_check=sha_check)
+    docs = build_llm_context(
+        registry_path=registry_path,
+        sha_check=sha_check,
+        workers=jobs,
+        cache_path=(cache_dir / "rule_docs.sqlite3") if cache_dir is not None else None,
+        rules_versions=rules_versions,
+        max_tokens=max_tokens,
+    )
 
     manifest: list[dict[str, object]] = []
+    contents: dict[str, str] = {}
+    first_by_sha: dict[str, str] = {}
+    taken: set[str] = set()
 
     for i, d in enumerate(docs, start=1):
-        doc_id = d.doc_id or f"no-doc-id-{d.sha256[:8]}"
-        filename = f"{i:03d}_{_slug(d.source)}_{_slug(doc_id)}.md"
-        (out_dir / filename).write_text(d.content, encoding="utf-8")
-
-        manifest.append(
-            {
-                "index": i,
-                "filename": filename,
-                "source": d.source,
-                "origin": d.origin,
-                "relpath": d.relpath,
-                "doc_id": d.doc_id,
-                "title": d.title,
-                "sha256": d.sha256,
-            }
-        )
-
-    _write_json(out_dir / "manifest.json", manifest)
-
-    print(f"Wrote {len(docs)} documents to {out_dir}")
+        filename = _doc_filename(d, taken)
+
+        # Byte-identical docs are aliases of the first one; with dedup they also
+        # point at its file instead of getting their own copy.
+        is_alias = d.sha256 in first_by_sha
+        canonical = first_by_sha.setdefault(d.sha256, filename)
+        if dedup:
+            filename = canonical
+        contents[filename] = d.content
+
+        ent: dict[str, object] = {
+            "index": i,
+            "filename": filename,
+            "source": d.source,
+            "origin": d.origin,
+            "relpath": d.relpath,
+            "doc_id": d.doc_id,
+            "title": d.title,
+            "sha256": d.sha256,
+            "n_bytes": d.n_bytes,
+            "n_tokens": d.n_tokens,
+            "priority": d.priority,
+        }
+        if d.sections is not None:
+            ent["sections"] = list(d.sections)
+        if is_alias:
+            ent["alias_of"] = canonical
+        manifest.append(ent)
+
+    if sync:
+        _sync_output_dir(out_dir, contents, manifest)
+    else:
+        for filename, content in contents.items():
+            (out_dir / filename).write_text(content, encoding="utf-8")
+        _write_json(out_dir / "manifest.json", manifest)
+
+    # Heading -> byte range lookup over the files just written (query_sections).
+    write_section_index(out_dir, manifest)
+    # BM25 postings; only docs whose sha256 changed are re-tokenized.
+    reindexed = write_search_index(out_dir)
+
+    aliases = sum(1 for e in manifest if "alias_of" in e)
+    print(f"Wrote {len(docs)} documents to {out_dir}" + (f" ({aliases} aliases)" if aliases else ""))
+    if max_tokens is not None:
+        trimmed = sum(1 for d in docs if d.sections is not None)
+        used = sum(d.n_tokens for d in docs)
+        print(f"Token budget: ~{used} of {max_tokens} tokens used ({trimmed} docs trimmed to sections)")
     print(f"Manifest: {out_dir / 'manifest.json'}")
+    print(f"Section index: {out_dir / 'sections.json'}")
+    print(f"Search index: {out_dir / 'search_index.json'} ({reindexed} docs reindexed)")
 
 
 def _find_project_root_from_package_dir(package_dir: Path) -> Path:
@@ -224,6 +384,403 @@ def _run(cmd: list[str]) -> None:
         raise RuntimeError(f"Command failed ({p.returncode}): {' '.join(cmd)}")
 
 
+_FINGERPRINT_SKIP_DIRS = {".git", "build", "dist", "output", "__pycache__", ".venv", "venv", ".tox", ".nox"}
+_BUILD_CONFIG_FILES = ("pyproject.toml", "setup.py", "setup.cfg", "MANIFEST.in")
+
+
+def _project_source_files(project_root: Path) -> list[str]:
+    """Relative paths (posix) of the files that make up a project's wheel.
+
+    The build configuration plus, for projects the in-process builder can plan,
+    exactly the package sources and package data it would ship (new modules
+    count before they are committed). Other projects fall back to the files git
+    tracks, or to walking the tree when git is unavailable; either way VCS,
+    build, cache and output folders are skipped. Scratch files and generated
+    output never change the fingerprint.
+    """
+    rels = {f for f in _BUILD_CONFIG_FILES if (project_root / f).is_file()}
+    rels.add("pyproject.toml")
+
+    plan = _pure_wheel_plan(project_root)
+    if plan is not None:
+        rels.update(Path(os.path.relpath(src, project_root)).as_posix() for _arc, src in plan.files)
+        return sorted(rels)
+
+    try:
+        p = subprocess.run(
+            ["git", "-C", str(project_root), "ls-files", "-z", "--cached", "--", "."],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        tracked = [r for r in p.stdout.decode("utf-8", errors="surrogateescape").split("\0") if r]
+    except (OSError, subprocess.CalledProcessError):
+        tracked = []
+        for dirpath, dirnames, filenames in os.walk(project_root):
+            dirnames[:] = [
+                d for d in dirnames if d not in _FINGERPRINT_SKIP_DIRS and not d.endswith(".egg-info")
+            ]
+            for fn in filenames:
+                if not fn.endswith((".pyc", ".pyo")):
+                    tracked.append((Path(dirpath) / fn).relative_to(project_root).as_posix())
+    rels.update(
+        r for r in tracked
+        if not any(part in _FINGERPRINT_SKIP_DIRS or part.endswith(".egg-info") for part in r.split("/")[:-1])
+    )
+    return sorted(rels)
+
+
+def _project_fingerprint(project_root: Path, builder: str = "auto") -> str:
+    """Content hash of a project's sources plus the interpreter and builder mode building it."""
+    h = hashlib.sha256()
+    h.update(f"wheel-cache-v1\0{sys.implementation.cache_tag}\0{builder}\0".encode())
+    for rel in _project_source_files(project_root):
+        fp = project_root / rel
+        h.update(rel.encode("utf-8", errors="surrogateescape") + b"\0")
+        if fp.is_file():
+            h.update(hashlib.sha256(fp.read_bytes()).digest())
+        else:
+            # Deleted-but-tracked files and submodule entries.
+            h.update(b"-")
+    return h.hexdigest()
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _wheel_cache_fetch(entry: Path, wheel_dir: Path) -> bool:
+    wheels = sorted(entry.glob("*.whl")) if entry.is_dir() else []
+    if not wheels:
+        return False
+    wheel_dir.mkdir(parents=True, exist_ok=True)
+    for whl in wheels:
+        _link_or_copy(whl, wheel_dir / whl.name)
+    # mtime of the entry folder is its LRU timestamp.
+    os.utime(entry)
+    return True
+
+
+def _wheel_cache_store(wheel_dir: Path, entry: Path) -> None:
+    wheels = sorted(wheel_dir.glob("*.whl"))
+    if not wheels:
+        return
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=f".{entry.name}.", dir=entry.parent))
+    try:
+        for whl in wheels:
+            _link_or_copy(whl, tmp / whl.name)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _wheel_cache_evict(cache: Path, max_bytes: int) -> None:
+    entries: list[tuple[float, int, Path]] = []
+    for entry in cache.iterdir() if cache.is_dir() else []:
+        if not entry.is_dir() or entry.name.startswith("."):
+            continue
+        size = sum(f.stat().st_size for f in entry.glob("*.whl"))
+        entries.append((entry.stat().st_mtime, size, entry))
+
+    total = sum(size for _mtime, size, _entry in entries)
+    for _mtime, size, entry in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+
+
+# --- In-process wheels for simple pure-Python setuptools projects -------------------
+
+_PURE_PROJECT_KEYS = {
+    "name",
+    "version",
+    "description",
+    "requires-python",
+    "authors",
+    "maintainers",
+    "dependencies",
+    "optional-dependencies",
+    "keywords",
+    "classifiers",
+    "urls",
+}
+_PURE_SETUPTOOLS_KEYS = {"package-dir", "packages", "package-data", "include-package-data", "zip-safe"}
+_ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+
+@dataclasses.dataclass(frozen=True)
+class _PureWheelPlan:
+    name: str
+    version: str
+    metadata: str
+    top_level: list[str]
+    files: list[tuple[str, Path]]  # (archive path, source file)
+
+
+def _glob_to_fnmatch_filter(patterns: list[str]) -> Any:
+    return lambda name: any(fnmatch.fnmatchcase(name, pat) for pat in patterns)
+
+
+def _find_packages(where: Path, include: list[str], exclude: list[str]) -> list[str]:
+    # Mirrors setuptools' find_namespace_packages(), the default for
+    # [tool.setuptools.packages.find] in pyproject.toml.
+    is_included = _glob_to_fnmatch_filter(include)
+    is_excluded = _glob_to_fnmatch_filter(exclude)
+    found: list[str] = []
+    stack = [(where, "")]
+    while stack:
+        d, prefix = stack.pop()
+        for child in sorted(d.iterdir(), reverse=True):
+            if not child.is_dir() or "." in child.name:
+                continue
+            pkg = f"{prefix}{child.name}"
+            if is_included(pkg) and not is_excluded(pkg):
+                found.append(pkg)
+            if f"{pkg}*" in exclude or f"{pkg}.*" in exclude:
+                continue
+            stack.append((child, f"{pkg}."))
+    return sorted(found)
+
+
+def _package_path(project_root: Path, package_dir: dict[str, str], pkg: str) -> Path:
+    parts = pkg.split(".")
+    for i in range(len(parts), 0, -1):
+        prefix = ".".join(parts[:i])
+        if prefix in package_dir:
+            return project_root / package_dir[prefix] / Path(*parts[i:])
+    return project_root / package_dir.get("", ".") / Path(*parts)
+
+
+def _metadata_text(project: dict[str, Any]) -> str:
+    lines = [
+        "Metadata-Version: 2.1",
+        f"Name: {project['name']}",
+        f"Version: {project['version']}",
+    ]
+    if project.get("description"):
+        lines.append(f"Summary: {project['description']}")
+    for field, header in (("authors", "Author"), ("maintainers", "Maintainer")):
+        people = project.get(field) or []
+        names = [p["name"] for p in people if "name" in p and "email" not in p]
+        emails = [
+            f"{p['name']} <{p['email']}>" if "name" in p else p["email"]
+            for p in people
+            if "email" in p
+        ]
+        if names:
+            lines.append(f"{header}: {', '.join(names)}")
+        if emails:
+            lines.append(f"{header}-email: {', '.join(emails)}")
+    if project.get("keywords"):
+        lines.append(f"Keywords: {','.join(project['keywords'])}")
+    for c in project.get("classifiers") or []:
+        lines.append(f"Classifier: {c}")
+    for label, url in (project.get("urls") or {}).items():
+        lines.append(f"Project-URL: {label}, {url}")
+    if project.get("requires-python"):
+        lines.append(f"Requires-Python: {project['requires-python']}")
+    for req in project.get("dependencies") or []:
+        lines.append(f"Requires-Dist: {req}")
+    for extra, reqs in (project.get("optional-dependencies") or {}).items():
+        lines.append(f"Provides-Extra: {extra}")
+        for req in reqs:
+            marker = f'extra == "{extra}"'
+            lines.append(f"Requires-Dist: {req}; {marker}" if ";" not in req else f"Requires-Dist: {req} and {marker}")
+    return "\n".join(lines) + "\n"
+
+
+def _pure_wheel_plan(project_root: Path) -> _PureWheelPlan | None:
+    """Describe the wheel of a trivially buildable project, or None to use pip.
+
+    Only static pyproject.toml projects using setuptools with explicit package
+    discovery, no setup.py/setup.cfg/MANIFEST.in and no build plugins qualify.
+    """
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        return None
+
+    if any((project_root / f).exists() for f in ("setup.py", "setup.cfg", "MANIFEST.in")):
+        return None
+    try:
+        pyproject = tomllib.loads((project_root / "pyproject.toml").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+    build_system = pyproject.get("build-system") or {}
+    if build_system.get("build-backend") != "setuptools.build_meta":
+        return None
+    for req in build_system.get("requires") or []:
+        if re.split(r"[\s<>=!~;\[]", req, maxsplit=1)[0].lower() not in ("setuptools", "wheel"):
+            return None
+
+    project = pyproject.get("project") or {}
+    if not set(project) <= _PURE_PROJECT_KEYS or "name" not in project or "version" not in project:
+        return None
+    if not re.fullmatch(r"\d+(\.\d+)*", str(project["version"])):
+        return None  # leave version normalization to the real backend
+
+    st = (pyproject.get("tool") or {}).get("setuptools") or {}
+    if not set(st) <= _PURE_SETUPTOOLS_KEYS:
+        return None
+    package_dir: dict[str, str] = dict(st.get("package-dir") or {})
+
+    packages = st.get("packages")
+    if isinstance(packages, list):
+        pkgs = sorted(packages)
+    elif isinstance(packages, dict) and set(packages) == {"find"}:
+        find = packages["find"]
+        if find.get("namespaces", True) is not True:
+            return None
+        pkgs = sorted(
+            {
+                pkg
+                for where in find.get("where") or ["."]
+                for pkg in _find_packages(
+                    project_root / where,
+                    list(find.get("include") or ["*"]),
+                    list(find.get("exclude") or []),
+                )
+            }
+        )
+    else:
+        return None  # setuptools auto-discovery: let the backend decide
+    if not pkgs:
+        return None
+
+    package_data: dict[str, list[str]] = st.get("package-data") or {}
+    files: dict[str, Path] = {}
+    for pkg in pkgs:
+        pkg_path = _package_path(project_root, package_dir, pkg)
+        if not pkg_path.is_dir():
+            return None
+        arc_dir = pkg.replace(".", "/")
+        for f in pkg_path.glob("*.py"):
+            files[f"{arc_dir}/{f.name}"] = f
+        patterns = list(package_data.get("*", [])) + list(package_data.get(pkg, []))
+        for pat in patterns:
+            for f in pkg_path.glob(pat):
+                if f.is_file() and "__pycache__" not in f.parts:
+                    files[f"{arc_dir}/{f.relative_to(pkg_path).as_posix()}"] = f
+
+    return _PureWheelPlan(
+        name=str(project["name"]),
+        version=str(project["version"]),
+        metadata=_metadata_text(project),
+        top_level=sorted({p.split(".")[0] for p in pkgs}),
+        files=sorted(files.items()),
+    )
+
+
+def _write_pure_wheel(plan: _PureWheelPlan, wheel_dir: Path) -> Path:
+    dist = re.sub(r"[-_.]+", "_", plan.name).lower()
+    dist_info = f"{dist}-{plan.version}.dist-info"
+    wheel_path = wheel_dir / f"{dist}-{plan.version}-py3-none-any.whl"
+
+    generated = {
+        f"{dist_info}/METADATA": plan.metadata.encode("utf-8"),
+        f"{dist_info}/WHEEL": (
+            "Wheel-Version: 1.0\n"
+            "Generator: rules_packager generate_all\n"
+            "Root-Is-Purelib: true\n"
+            "Tag: py3-none-any\n"
+        ).encode("utf-8"),
+        f"{dist_info}/top_level.txt": "".join(f"{t}\n" for t in plan.top_level).encode("utf-8"),
+    }
+
+    record: list[str] = []
+
+    def _add(zf: zipfile.ZipFile, arcname: str, data: bytes) -> None:
+        # Fixed timestamps/permissions keep the wheel byte-for-byte reproducible.
+        info = zipfile.ZipInfo(arcname, date_time=_ZIP_EPOCH)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        zf.writestr(info, data)
+        digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b"=").decode()
+        record.append(f"{arcname},sha256={digest},{len(data)}")
+
+    tmp = wheel_path.with_name(wheel_path.name + ".part")
+    with zipfile.ZipFile(tmp, "w") as zf:
+        for arcname, src in plan.files:
+            _add(zf, arcname, src.read_bytes())
+        for arcname, data in generated.items():
+            _add(zf, arcname, data)
+        record.append(f"{dist_info}/RECORD,,")
+        info = zipfile.ZipInfo(f"{dist_info}/RECORD", date_time=_ZIP_EPOCH)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        zf.writestr(info, "\n".join(record) + "\n")
+    os.replace(tmp, wheel_path)
+    return wheel_path
+
+
+def _build_wheel(project_root: Path, *, label: str, build_dir: Path, capture: bool) -> None:
+    """Build one project's wheel into build_dir/wheels.
+
+    pip and the build backend get build_dir/tmp as their temp folder, so
+    concurrent builds never share scratch space.
+    """
+    wheel_dir = build_dir / "wheels"
+    tmp_dir = build_dir / "tmp"
+    wheel_dir.mkdir(parents=True, exist_ok=True)
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    env = dict(os.environ)
+    for var in ("TMPDIR", "TEMP", "TMP"):
+        env[var] = str(tmp_dir)
+
+    cmd = [
+        sys.executable,
+        "-m",
+        "pip",
+        "wheel",
+        "--no-deps",
+        "--wheel-dir",
+        str(wheel_dir),
+        str(project_root),
+    ]
+
+    try:
+        if capture:
+            p = subprocess.run(
+                cmd,
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                errors="replace",
+            )
+            # Print the whole build at once so parallel builds do not interleave.
+            prefix = f"[{label}] "
+            print(
+                f"{prefix}Building wheel: {project_root}\n"
+                + "".join(prefix + line + "\n" for line in (p.stdout or "").splitlines()),
+                end="",
+                flush=True,
+            )
+        else:
+            print(f"Building wheel: {project_root}")
+            p = subprocess.run(cmd, env=env)
+        if p.returncode != 0:
+            raise RuntimeError(f"[{label}] Command failed ({p.returncode}): {' '.join(cmd)}")
+    finally:
+        # Cleanup common build artifacts so the repo doesn't get polluted.
+        # Project roots are unique, so no two builds clean the same folders.
+        for artifact in ("build", "dist"):
+            a = project_root / artifact
+            if a.exists() and a.is_dir():
+                shutil.rmtree(a)
+        for egginfo in project_root.glob("*.egg-info"):
+            if egginfo.is_dir():
+                shutil.rmtree(egginfo)
+
+
 def build_selected_wheels(
     *,
     registry_path: Path,
@@ -231,19 +788,16 @@ def build_selected_wheels(
     overwrite: bool,
     ensure_pip: bool,
     only_binary: bool,
+    jobs: int = 1,
+    cache_dir: Path | None = None,
+    rebuild: bool = False,
+    cache_max_bytes: int = 512 * 1024 * 1024,
+    builder: str = "auto",
 ) -> None:
     print(f"Wheel output folder: {out_dir}")
 
-    if out_dir.exists() and overwrite:
-        _clean_wheels_dir(out_dir)
-
-    if ensure_pip:
-        _ensure_pip()
-
-    if not _pip_available():
-        print("ERROR: pip is not available for this Python interpreter.")
-        print("Rerun with: --ensure-pip")
-        raise SystemExit(1)
+    if jobs < 0:
+        raise SystemExit(f"--wheel-jobs must be >= 0 (got {jobs})")
 
     _ensure_import_paths(_project_root())
     from rules_packager_base.driver_links import load_registry  # type: ignore[import-not-found]  # noqa: E402
@@ -253,7 +807,7 @@ def build_selected_wheels(
     if not isinstance(packs, list):
         raise SystemExit("Registry missing 'packs' list")
 
-    selected_project_roots: list[Path] = []
+    selected_project_roots: list[tuple[Path, str]] = []
 
     # Enabled packs must explicitly declare wheel.enabled=true for wheel building.
     for pack in packs:
@@ -305,16 +859,17 @@ def build_selected_wheels(
         if project_root is None:
             raise SystemExit(f"Could not resolve project root for enabled pack {pack_id!r}")
 
-        selected_project_roots.append(project_root)
+        selected_project_roots.append((project_root, str(pack_id)))
 
-    # De-dup
+    # De-dup (several packs may live in the same project).
     uniq_roots: list[Path] = []
-    seen = set()
-    for r in selected_project_roots:
+    labels: dict[str, list[str]] = {}
+    for r, pack_id in selected_project_roots:
         rr = str(r.resolve())
-        if rr not in seen:
-            seen.add(rr)
+        if rr not in labels:
+            labels[rr] = []
             uniq_roots.append(r)
+        labels[rr].append(pack_id)
 
     out_dir.mkdir(parents=True, exist_ok=True)
 
@@ -322,31 +877,87 @@ def build_selected_wheels(
     for project_root in uniq_roots:
         print(f"- {project_root}")
 
-    for project_root in uniq_roots:
-        print(f"Building wheel: {project_root}")
-        _run(
-            [
-                sys.executable,
-                "-m",
-                "pip",
-                "wheel",
-                "--no-deps",
-                "--wheel-dir",
-                str(out_dir),
-                str(project_root),
-            ]
-        )
-
-        # Cleanup common build artifacts so the repo doesn't get polluted.
-        import shutil
-
-        for artifact in ("build", "dist"):
-            p = project_root / artifact
-            if p.exists() and p.is_dir():
-                shutil.rmtree(p)
-        for egginfo in project_root.glob("*.egg-info"):
-            if egginfo.is_dir():
-                shutil.rmtree(egginfo)
+    # Every build writes into its own staging folder; wheels are only moved into
+    # out_dir once all builds succeeded, so a failure never leaves a partial set.
+    staging = Path(tempfile.mkdtemp(prefix=".wheels-staging-", dir=out_dir.parent))
+    try:
+        builds = [
+            (project_root, ",".join(labels[str(project_root.resolve())]), staging / f"{n:03d}")
+            for n, project_root in enumerate(uniq_roots)
+        ]
+
+        wheel_cache = (cache_dir / "wheels") if cache_dir is not None else None
+        fingerprints: dict[Path, str] = {}
+        misses: list[tuple[Path, str, Path]] = []
+        for project_root, label, build_dir in builds:
+            if wheel_cache is None:
+                misses.append((project_root, label, build_dir))
+                continue
+            fp = _project_fingerprint(project_root, builder)
+            fingerprints[build_dir] = fp
+            if not rebuild and _wheel_cache_fetch(wheel_cache / fp, build_dir / "wheels"):
+                print(f"[{label}] Wheel cache hit ({fp[:12]}): {project_root}")
+            else:
+                misses.append((project_root, label, build_dir))
+
+        # Simple pure-Python projects are zipped in-process; pip is only the fallback.
+        pip_builds: list[tuple[Path, str, Path]] = []
+        for project_root, label, build_dir in misses:
+            plan = _pure_wheel_plan(project_root) if builder == "auto" else None
+            if plan is None:
+                pip_builds.append((project_root, label, build_dir))
+                continue
+            (build_dir / "wheels").mkdir(parents=True, exist_ok=True)
+            whl = _write_pure_wheel(plan, build_dir / "wheels")
+            print(f"[{label}] Built wheel in-process: {whl.name}")
+
+        if pip_builds:
+            if ensure_pip:
+                _ensure_pip()
+
+            if not _pip_available():
+                print("ERROR: pip is not available for this Python interpreter.")
+                print("Rerun with: --ensure-pip")
+                raise SystemExit(1)
+
+        failures: list[str] = []
+        if jobs == 1:
+            for project_root, label, build_dir in pip_builds:
+                try:
+                    _build_wheel(project_root, label=label, build_dir=build_dir, capture=False)
+                except RuntimeError as e:
+                    failures.append(str(e))
+                    break
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=jobs or None) as executor:
+                futures = {
+                    executor.submit(_build_wheel, project_root, label=label, build_dir=build_dir, capture=True): label
+                    for project_root, label, build_dir in pip_builds
+                }
+                for fut in concurrent.futures.as_completed(futures):
+                    try:
+                        fut.result()
+                    except RuntimeError as e:
+                        failures.append(str(e))
+
+        if failures:
+            for msg in failures:
+                print(f"ERROR: {msg}")
+            raise SystemExit(f"Wheel build failed for {len(failures)} project(s); {out_dir} was not updated")
+
+        if wheel_cache is not None:
+            for _root, _label, build_dir in misses:
+                _wheel_cache_store(build_dir / "wheels", wheel_cache / fingerprints[build_dir])
+            _wheel_cache_evict(wheel_cache, cache_max_bytes)
+
+        # Only now that every build succeeded is the previous set replaced.
+        if overwrite:
+            _clean_wheels_dir(out_dir)
+        for _root, _label, build_dir in builds:
+            for whl in sorted((build_dir / "wheels").glob("*.whl")):
+                os.replace(whl, out_dir / whl.name)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
 
     # Optional: write a helper requirements.txt that installs from this folder.
     # - Use --find-links . so it works after copying the folder elsewhere.
@@ -387,12 +998,41 @@ def main(argv: list[str] | None = None) -> int:
         action="store_true",
         help="Collect selected rule documents into output/config/rules/",
     )
+    ap.add_argument(
+        "--sync",
+        action="store_true",
+        help=(
+            "Update collected rules in place: only rewrite changed docs (atomically), "
+            "remove stale ones and print a summary"
+        ),
+    )
+    ap.add_argument(
+        "--max-tokens",
+        type=int,
+        default=None,
+        help=(
+            "Fit the collected rules into an estimated token budget: docs (or their '## ' sections) "
+            "are picked by the priority declared in each pack's rules_index.json"
+        ),
+    )
+    ap.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Store byte-identical docs once; aliases in manifest.json point at the shared file",
+    )
     ap.add_argument(
         "--rules-out",
         default=str(project_root / "output" / "config" / "rules"),
         help="Output folder for collected rules",
     )
 
+    ap.add_argument(
+        "--rules-version",
+        action="append",
+        default=[],
+        metavar="PACK=VERSION",
+        help="Collect a specific rules version for a pack (repeatable; default: the index's default_version)",
+    )
     ap.add_argument(
         "--sha-check",
         choices=["off", "warn", "error"],
@@ -402,6 +1042,22 @@ def main(argv: list[str] | None = None) -> int:
             "Use 'error' for strict checking."
         ),
     )
+    ap.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Load rule packs/docs on N worker threads (default: 1 = serial, 0 = auto)",
+    )
+    ap.add_argument(
+        "--cache-dir",
+        default=str(project_root / "output" / ".cache"),
+        help="Folder for persistent build caches (default: output/.cache)",
+    )
+    ap.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the persistent caches",
+    )
 
     ap.add_argument(
         "--build-wheels",
@@ -418,6 +1074,32 @@ def main(argv: list[str] | None = None) -> int:
         action="store_true",
         help="Write requirements.txt with --only-binary :all: (fail if deps have no wheels)",
     )
+    ap.add_argument(
+        "--wheel-jobs",
+        type=int,
+        default=1,
+        help="Build up to N wheels concurrently (default: 1 = serial, 0 = auto)",
+    )
+    ap.add_argument(
+        "--wheel-builder",
+        choices=["auto", "pip"],
+        default="auto",
+        help=(
+            "auto: zip simple pure-Python setuptools projects in-process and use pip for the rest; "
+            "pip: always run pip wheel (default: auto)"
+        ),
+    )
+    ap.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Ignore cached wheels and rebuild every project (the cache is still refreshed)",
+    )
+    ap.add_argument(
+        "--wheel-cache-max-mb",
+        type=int,
+        default=512,
+        help="Size cap of the wheel cache under --cache-dir (default: 512)",
+    )
     ap.add_argument(
         "--wheels-out",
         default=str(project_root / "output" / "config" / "wheels"),
@@ -446,6 +1128,12 @@ def main(argv: list[str] | None = None) -> int:
     args = ap.parse_args(argv)
 
     registry_path = Path(args.registry)
+    cache_dir: Path | None = None if args.no_cache else Path(args.cache_dir)
+
+    _ensure_import_paths(project_root)
+    from rules_packager_base.driver_links import parse_rules_version_args  # type: ignore[import-not-found]  # noqa: E402
+
+    rules_versions = parse_rules_version_args(list(args.rules_version))
 
     project_out: Path | None = Path(args.project_out) if args.project_out else None
     if project_out is not None:
@@ -473,6 +1161,12 @@ def main(argv: list[str] | None = None) -> int:
             out_dir=Path(args.rules_out),
             overwrite=bool(args.overwrite),
             sha_check=str(args.sha_check),
+            jobs=int(args.jobs),
+            cache_dir=cache_dir,
+            sync=bool(args.sync),
+            rules_versions=rules_versions,
+            dedup=bool(args.dedup),
+            max_tokens=args.max_tokens,
         )
         did_something = True
 
@@ -483,6 +1177,11 @@ def main(argv: list[str] | None = None) -> int:
             overwrite=bool(args.overwrite),
             ensure_pip=bool(args.ensure_pip),
             only_binary=bool(args.only_binary),
+            jobs=int(args.wheel_jobs),
+            cache_dir=cache_dir,
+            rebuild=bool(args.rebuild),
+            cache_max_bytes=int(args.wheel_cache_max_mb) * 1024 * 1024,
+            builder=str(args.wheel_builder),
         )
         did_something = True
 
@@ -493,6 +1192,12 @@ def main(argv: list[str] | None = None) -> int:
             out_dir=Path(args.rules_out),
             overwrite=bool(args.overwrite),
             sha_check=str(args.sha_check),
+            jobs=int(args.jobs),
+            cache_dir=cache_dir,
+            sync=bool(args.sync),
+            rules_versions=rules_versions,
+            dedup=bool(args.dedup),
+            max_tokens=args.max_tokens,
         )
         build_selected_wheels(
             registry_path=registry_path,
@@ -500,6 +1205,11 @@ def main(argv: list[str] | None = None) -> int:
             overwrite=bool(args.overwrite),
             ensure_pip=bool(getattr(args, "ensure_pip", False)),
             only_binary=bool(getattr(args, "only_binary", False)),
+            jobs=int(args.wheel_jobs),
+            cache_dir=cache_dir,
+            rebuild=bool(args.rebuild),
+            cache_max_bytes=int(args.wheel_cache_max_mb) * 1024 * 1024,
+            builder=str(args.wheel_builder),
         )
         return 0
 
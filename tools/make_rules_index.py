@@ -1,25 +1,39 @@
 #!/usr/bin/env python3
-"""Generate rules_index.json with SHA-256 checksums for .md files in a rules version folder.
+"""Generate rules_index.json with SHA-256 checksums for .md files in the rules version folders.
 
 Writes to:
   src/rules_packager_base/rules/rules_index.json
 
 Usage:
-  python tools/make_rules_index.py            # auto-detect latest version
-  python tools/make_rules_index.py 0.5.0      # explicitly choose version
+  python tools/make_rules_index.py            # all versions, default = latest
+  python tools/make_rules_index.py 0.5.0      # all versions, default = 0.5.0
+  python tools/make_rules_index.py --schema 1 0.5.0                 # legacy single-version index
+  python tools/make_rules_index.py --all-packs                      # every path pack in drivers_registry.json
+  python tools/make_rules_index.py --all-packs --registry other.json
+
+Hashing is incremental: a sidecar stat record (.rules_index.stat.json next to the
+index) remembers size/mtime_ns/sha256 per file, so unchanged files are not
+rehashed. The index itself is only rewritten when its content changes.
 """
 
 from __future__ import annotations
 
+import argparse
+import concurrent.futures
+import dataclasses
 import hashlib
 import json
+import os
 import pathlib
 import re
 import sys
+from typing import Any
 
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 RULES_ROOT = ROOT / "src" / "rules_packager_base" / "rules"
 
+_STAT_RECORD_NAME = ".rules_index.stat.json"
+
 
 def _sha256(fp: pathlib.Path) -> str:
     h = hashlib.sha256()
@@ -34,34 +48,268 @@ def _version_key(s: str):
     return [int(x) if x.isdigit() else x for x in re.split(r"(\d+)", s)]
 
 
-def _detect_latest_version() -> str:
-    vers = [p.name for p in RULES_ROOT.iterdir() if p.is_dir()]
+def _version_dirs(rules_root: pathlib.Path) -> list[str]:
+    return sorted((p.name for p in rules_root.iterdir() if p.is_dir()), key=_version_key)
+
+
+def _detect_latest_version(rules_root: pathlib.Path = RULES_ROOT) -> str:
+    vers = _version_dirs(rules_root)
     if not vers:
-        raise SystemExit(f"No rules versions found in: {RULES_ROOT}")
-    return sorted(vers, key=_version_key)[-1]
+        raise SystemExit(f"No rules versions found in: {rules_root}")
+    return vers[-1]
+
+
+def _read_json(path: pathlib.Path) -> Any:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
 
 
-def main() -> None:
-    ver = sys.argv[1] if len(sys.argv) > 1 else _detect_latest_version()
-    version_dir = RULES_ROOT / ver
+@dataclasses.dataclass
+class _IndexJob:
+    index_path: pathlib.Path
+    version: str | None  # default version; None: flat layout, docs live next to the index
+    schema: int = 2
+    # Version folder (None for flat layouts) -> .md files in it.
+    files: dict[str | None, list[pathlib.Path]] = dataclasses.field(default_factory=dict)
+    stat_record: dict[str, list[Any]] = dataclasses.field(default_factory=dict)
+    existing: dict[str, Any] = dataclasses.field(default_factory=dict)
 
-    if not version_dir.exists():
-        raise SystemExit(f"Error: Rules folder not found: {version_dir}")
+    @property
+    def stat_path(self) -> pathlib.Path:
+        return self.index_path.parent / _STAT_RECORD_NAME
 
-    files = sorted(
-        [p for p in version_dir.iterdir() if p.is_file() and p.suffix == ".md"],
+    def all_files(self) -> list[pathlib.Path]:
+        return [f for fs in self.files.values() for f in fs]
+
+
+def _md_files(doc_dir: pathlib.Path) -> list[pathlib.Path]:
+    if not doc_dir.exists():
+        raise SystemExit(f"Error: Rules folder not found: {doc_dir}")
+    return sorted(
+        [p for p in doc_dir.iterdir() if p.is_file() and p.suffix == ".md"],
         key=lambda p: p.name,
     )
 
-    idx = {
-        "driver_version": ver,
-        "rules_version": ver,
-        "files": [{"name": f.name, "sha256": _sha256(f)} for f in files],
+
+def _prepare(job: _IndexJob) -> None:
+    rules_dir = job.index_path.parent
+    if job.version is None:
+        job.files = {None: _md_files(rules_dir)}
+    elif job.schema == 1:
+        job.files = {job.version: _md_files(rules_dir / job.version)}
+    else:
+        versions = _version_dirs(rules_dir)
+        if job.version not in versions:
+            raise SystemExit(f"Error: Rules folder not found: {rules_dir / job.version}")
+        job.files = {v: _md_files(rules_dir / v) for v in versions}
+
+    existing = _read_json(job.index_path)
+    job.existing = existing if isinstance(existing, dict) else {}
+    record = _read_json(job.stat_path)
+    job.stat_record = record if isinstance(record, dict) else {}
+
+
+def _stat_key(job: _IndexJob, fp: pathlib.Path) -> str:
+    return fp.relative_to(job.index_path.parent).as_posix()
+
+
+def _cached_sha(job: _IndexJob, fp: pathlib.Path, st: os.stat_result) -> str | None:
+    rec = job.stat_record.get(_stat_key(job, fp))
+    if isinstance(rec, list) and len(rec) == 3 and rec[0] == st.st_size and rec[1] == st.st_mtime_ns:
+        return str(rec[2])
+    return None
+
+
+def _old_entries(existing: dict[str, Any], version: str | None) -> dict[str, dict[str, Any]]:
+    files = None
+    versions = existing.get("versions")
+    if version is not None and isinstance(versions, dict) and isinstance(versions.get(version), dict):
+        files = versions[version].get("files")
+    elif version is None or existing.get("rules_version") == version:
+        files = existing.get("files")
+    return {
+        e["name"]: e
+        for e in files or []
+        if isinstance(e, dict) and isinstance(e.get("name"), str)
     }
 
-    out_path = RULES_ROOT / "rules_index.json"
-    out_path.write_text(json.dumps(idx, indent=2), encoding="utf-8")
-    print(f"wrote {out_path}")
+
+def _file_entries(job: _IndexJob, version: str | None, shas: dict[pathlib.Path, str]) -> list[dict[str, Any]]:
+    # Keep any extra per-file keys (e.g. hand-written metadata) from the previous index.
+    old_entries = _old_entries(job.existing, version)
+    files = []
+    for f in job.files[version]:
+        ent = dict(old_entries.get(f.name, {}))
+        ent["name"] = f.name
+        ent["sha256"] = shas[f]
+        files.append(ent)
+    return files
+
+
+def _build_index(job: _IndexJob, shas: dict[pathlib.Path, str]) -> dict[str, Any]:
+    idx: dict[str, Any] = {}
+    if job.version is None:
+        for k in ("driver_version", "rules_version"):
+            if k in job.existing:
+                idx[k] = job.existing[k]
+        idx["files"] = _file_entries(job, None, shas)
+        return idx
+
+    if job.schema == 1:
+        idx["driver_version"] = job.version
+        idx["rules_version"] = job.version
+        idx["files"] = _file_entries(job, job.version, shas)
+        return idx
+
+    # v2: every version folder, plus the v1 keys mirroring default_version so
+    # loaders that only know the single-version layout keep working.
+    versions = {v: {"files": _file_entries(job, v, shas)} for v in job.files}
+    idx["schema_version"] = 2
+    idx["driver_version"] = job.version
+    idx["rules_version"] = job.version
+    idx["default_version"] = job.version
+    idx["files"] = versions[job.version]["files"]
+    idx["versions"] = versions
+    return idx
+
+
+def _write_if_changed(path: pathlib.Path, text: str) -> bool:
+    try:
+        if path.read_text(encoding="utf-8") == text:
+            return False
+    except OSError:
+        pass
+    path.write_text(text, encoding="utf-8")
+    return True
+
+
+def run_jobs(jobs: list[_IndexJob], *, workers: int | None = None) -> int:
+    """Index every job in one pass; returns how many index files were rewritten."""
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(_prepare, jobs))
+
+        shas: dict[pathlib.Path, str] = {}
+        stats: dict[pathlib.Path, os.stat_result] = {}
+        to_hash: list[pathlib.Path] = []
+        for job in jobs:
+            for f in job.all_files():
+                st = f.stat()
+                stats[f] = st
+                cached = _cached_sha(job, f, st)
+                if cached is None:
+                    to_hash.append(f)
+                else:
+                    shas[f] = cached
+
+        # Hash every changed file of every pack on one shared pool.
+        shas.update(zip(to_hash, executor.map(_sha256, to_hash)))
+
+    changed = 0
+    for job in jobs:
+        text = json.dumps(_build_index(job, shas), indent=2)
+        if _write_if_changed(job.index_path, text):
+            changed += 1
+            print(f"wrote {job.index_path}")
+        else:
+            print(f"unchanged {job.index_path}")
+
+        record = {
+            _stat_key(job, f): [stats[f].st_size, stats[f].st_mtime_ns, shas[f]]
+            for f in job.all_files()
+        }
+        _write_if_changed(job.stat_path, json.dumps(record, indent=2, sort_keys=True))
+
+    print(f"hashed {len(to_hash)} of {len(stats)} file(s)")
+    return changed
+
+
+def _registry_jobs(registry_path: pathlib.Path, schema: int) -> list[_IndexJob]:
+    sys.path.insert(0, str(ROOT / "src"))
+    from rules_packager_base.driver_links import RulesLoadError, load_registry  # noqa: E402
+
+    try:
+        packs = load_registry(registry_path).get("packs")
+    except RulesLoadError as e:
+        raise SystemExit(f"Error: {e}")
+    if not isinstance(packs, list):
+        raise SystemExit(f"Invalid registry (missing 'packs' list): {registry_path}")
+
+    jobs: list[_IndexJob] = []
+    seen: set[pathlib.Path] = set()
+    for pack in packs:
+        if not isinstance(pack, dict):
+            continue
+        rules = pack.get("rules") or {}
+        src = rules.get("source") or {}
+        rules_index = rules.get("rules_index")
+        if src.get("type") != "path" or not isinstance(rules_index, str):
+            print(f"skip {pack.get('id')!r}: only path sources can be indexed")
+            continue
+
+        root = pathlib.Path(src.get("path", ""))
+        if not root.is_absolute():
+            root = registry_path.parent / root
+        index_path = (root / rules_index).resolve()
+        if index_path in seen:
+            continue
+        if not index_path.parent.is_dir():
+            print(f"skip {pack.get('id')!r}: rules folder not found: {index_path.parent}")
+            continue
+        seen.add(index_path)
+
+        vers = _version_dirs(index_path.parent)
+        jobs.append(
+            _IndexJob(
+                index_path=index_path,
+                version=vers[-1] if vers else None,
+                schema=schema,
+            )
+        )
+    return jobs
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Generate rules_index.json for rule packs")
+    ap.add_argument("version", nargs="?", default=None, help="Default rules version folder (default: latest)")
+    ap.add_argument(
+        "--all-packs",
+        action="store_true",
+        help="Index every path pack listed in the registry (default_version = latest of each)",
+    )
+    ap.add_argument(
+        "--registry",
+        default=str(ROOT / "drivers_registry.json"),
+        help="Registry used with --all-packs (default: drivers_registry.json)",
+    )
+    ap.add_argument(
+        "--schema",
+        type=int,
+        choices=[1, 2],
+        default=2,
+        help=(
+            "Index format: 2 lists every version folder with default_version = the chosen/latest one; "
+            "1 writes the legacy single-version index (default: 2)"
+        ),
+    )
+    ap.add_argument(
+        "--jobs",
+        type=int,
+        default=0,
+        help="Hash files on N worker threads (default: 0 = auto)",
+    )
+    args = ap.parse_args(argv)
+
+    if args.all_packs:
+        if args.version:
+            raise SystemExit("Error: a version cannot be combined with --all-packs")
+        jobs = _registry_jobs(pathlib.Path(args.registry), args.schema)
+    else:
+        ver = args.version or _detect_latest_version()
+        jobs = [_IndexJob(index_path=RULES_ROOT / "rules_index.json", version=ver, schema=args.schema)]
+
+    run_jobs(jobs, workers=args.jobs or None)
 
 
 if __name__ == "__main__":